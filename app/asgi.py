@@ -0,0 +1,338 @@
+"""Asyncio (ASGI) entry point.
+
+Serves the same Flask application, blueprints and services as wsgi.py, but
+connection handling runs on an asyncio event loop: request bodies are received
+and responses are sent without holding a thread, and only the application
+code itself (including note file reads and writes) runs in a bounded thread
+pool. A single process can therefore keep thousands of slow clients connected
+while using a handful of threads.
+
+Run with uvicorn:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+
+The todo change feed (/todos/changes and /todos/changes/stream) is served
+natively on the event loop, so waiting long-poll and SSE clients cost no
+thread at all.
+
+Run `python asgi.py` to use the `asgi` section of auth_config.yml:
+
+    asgi:
+      host: 0.0.0.0
+      port: 8000
+      threads: 32      # Worker threads running application code
+"""
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import parse_qs
+from main import build_app
+from middleware.access_log import get_access_log_instance
+from services.change_feed import ChangeFeed
+from services.todo_service import TodoService
+from utils.errors import ERRORS, ENCODED_ERRORS
+
+class AsyncApp:
+    """ASGI application running a Flask application on a thread pool."""
+
+    CHUNK_SIZE = 64 * 1024  # Block size used when streaming files to clients
+    CHANGES_PATH = "/todos/changes"
+    CHANGES_STREAM_PATH = "/todos/changes/stream"
+
+    def __init__(self, flask_app, max_threads=32, max_body_size=None):
+        self.flask_app = flask_app
+        self.max_body_size = max_body_size
+        self.executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="asgi-worker")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        try:
+            body = await self._read_body(receive)
+        except _ClientDisconnected:
+            return
+        if body is None:
+            await self._send_simple(send, 413, ENCODED_ERRORS["request_too_large"])
+            return
+
+        loop = asyncio.get_running_loop()
+        environ = self._build_environ(scope, body)
+
+        if scope["method"] == "GET" and scope["path"] in (self.CHANGES_PATH, self.CHANGES_STREAM_PATH):
+            feed, log_info = await loop.run_in_executor(self.executor, self._authorized_change_feed, environ)
+            if feed is not None:
+                # These responses bypass Flask's after_request hooks, so they are logged here
+                status, size = 200, None
+                try:
+                    if scope["path"] == self.CHANGES_PATH:
+                        status, size = await self._changes_long_poll(feed, environ, send)
+                    else:
+                        await self._changes_stream(feed, environ, receive, send)
+                finally:
+                    get_access_log_instance().record(log_info, status, size)
+                return
+            # Not authorized: let Flask produce the error response below
+
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [(name.lower().encode("latin1"), value.encode("latin1")) for name, value in headers]
+
+        # Application code (routing, auth, services, file I/O) runs on the pool
+        iterable = await loop.run_in_executor(self.executor, self.flask_app, environ, start_response)
+        try:
+            chunks = iter(iterable)
+            first = await loop.run_in_executor(self.executor, next, chunks, None)
+            await send({"type": "http.response.start", "status": response["status"], "headers": response["headers"]})
+
+            chunk = first
+            while chunk is not None:
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                chunk = await loop.run_in_executor(self.executor, next, chunks, None)
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            close = getattr(iterable, "close", None)
+            if close is not None:
+                await loop.run_in_executor(self.executor, close)
+
+    def _authorized_change_feed(self, environ):
+        """Run the request hooks (authentication) and return the caller's change feed.
+
+        Returns:
+            tuple: (ChangeFeed, access log info), or (None, None) if a request
+                   hook rejected the request
+        """
+        with self.flask_app.request_context(environ):
+            if self.flask_app.preprocess_request() is not None:
+                return None, None
+            return TodoService.get_change_feed(), get_access_log_instance().request_info()
+
+    async def _changes_long_poll(self, feed, environ, send):
+        """Async counterpart of TodoService.get_changes.
+
+        Returns:
+            tuple: (status, body size) of the response
+        """
+        query = parse_qs(environ["QUERY_STRING"])
+        try:
+            since = int(query["since"][0]) if "since" in query else None
+            timeout = float(query.get("timeout", [TodoService.DEFAULT_POLL_TIMEOUT])[0])
+        except ValueError:
+            since, timeout = None, TodoService.DEFAULT_POLL_TIMEOUT
+        timeout = max(0, min(timeout, TodoService.MAX_POLL_TIMEOUT))
+        pretty = query.get("pretty", [""])[0].lower() in ("1", "true")
+
+        if since is None:
+            return 200, await self._send_json(send, 200, {"changes": [], "last_seq": feed.last_seq}, pretty)
+
+        changes = feed.changes_since(since)
+        if changes == [] and timeout > 0:
+            await self._wait_for_change(feed, since, timeout)
+            changes = feed.changes_since(since)
+
+        if changes is None:
+            return 410, await self._send_json(send, 410, {
+                "code": "changes_expired",
+                "error": ERRORS["changes_expired"][1],
+                "last_seq": feed.last_seq
+            }, pretty)
+        return 200, await self._send_json(send, 200, {"changes": changes, "last_seq": changes[-1]["seq"] if changes else since}, pretty)
+
+    async def _changes_stream(self, feed, environ, receive, send):
+        """Async counterpart of TodoService.stream_changes."""
+        try:
+            since = int(environ.get("HTTP_LAST_EVENT_ID") or parse_qs(environ["QUERY_STRING"])["since"][0])
+        except (KeyError, ValueError):
+            since = feed.last_seq
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream; charset=utf-8"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": b"retry: 3000\n\n", "more_body": True})
+
+        disconnected = asyncio.ensure_future(self._wait_for_disconnect(receive))
+        try:
+            while not disconnected.done():
+                changes = feed.changes_since(since)
+                if changes is None:
+                    since = feed.last_seq
+                    changes = [{"seq": since, "op": "reset", "id": None, "todo": None}]
+                if changes:
+                    events = "".join(ChangeFeed.format_event(entry) for entry in changes)
+                    since = changes[-1]["seq"]
+                    await send({"type": "http.response.body", "body": events.encode(), "more_body": True})
+                elif not await self._wait_for_change(feed, since, TodoService.KEEPALIVE_INTERVAL, disconnected):
+                    if not disconnected.done():
+                        await send({"type": "http.response.body", "body": b": keep-alive\n\n", "more_body": True})
+        finally:
+            disconnected.cancel()
+
+    @staticmethod
+    async def _wait_for_change(feed, since, timeout, cancelled=None):
+        """Wait without a thread until the feed moves past `since`.
+
+        Returns:
+            bool: True if a change arrived, False on timeout or cancellation
+        """
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+
+        def listener():
+            try:
+                loop.call_soon_threadsafe(changed.set)
+            except RuntimeError:
+                pass  # Event loop already closed
+
+        feed.add_listener(listener)
+        try:
+            if feed.last_seq != since:
+                return True
+            waiter = asyncio.ensure_future(changed.wait())
+            pending = {waiter} | ({cancelled} if cancelled is not None else set())
+            await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            return changed.is_set()
+        finally:
+            feed.remove_listener(listener)
+
+    @staticmethod
+    async def _wait_for_disconnect(receive):
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    async def _send_json(self, send, status, payload, pretty=False):
+        """Send a JSON response and return its body size."""
+        body = (self.flask_app.json.dumps(payload, indent=2 if pretty else None) + "\n").encode("utf-8")
+        await self._send_simple(send, status, body)
+        return len(body)
+
+    async def _read_body(self, receive):
+        """Receive the full request body without blocking a thread.
+
+        Returns:
+            bytes: The request body, or None if it exceeds max_body_size
+        """
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise _ClientDisconnected()
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if self.max_body_size is not None and size > self.max_body_size:
+                return None
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    @staticmethod
+    async def _send_simple(send, status, body):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def _build_environ(self, scope, body):
+        """Translate an ASGI HTTP scope into a WSGI environ."""
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin1"),
+            "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+            "QUERY_STRING": scope["query_string"].decode("latin1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": client[0],
+            "REMOTE_PORT": str(client[1]),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+            "wsgi.file_wrapper": partial(_FileWrapper, min_block_size=self.CHUNK_SIZE),
+        }
+        for name, value in scope.get("headers", []):
+            name = name.decode("latin1").upper().replace("-", "_")
+            value = value.decode("latin1")
+            if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                key = name
+            else:
+                key = f"HTTP_{name}"
+            if key in environ:
+                # Repeated headers are joined; cookies use their own separator
+                value = f"{environ[key]}{'; ' if key == 'HTTP_COOKIE' else ','}{value}"
+            environ[key] = value
+        return environ
+
+class _ClientDisconnected(Exception):
+    """Raised when the client goes away before sending its full request."""
+
+class _FileWrapper:
+    """Iterate a file in fixed-size blocks; each block is read on the thread pool."""
+    def __init__(self, file, block_size=8192, min_block_size=0):
+        self.file = file
+        self.block_size = max(block_size, min_block_size)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        data = self.file.read(self.block_size)
+        if not data:
+            raise StopIteration
+        return data
+
+    def close(self):
+        self.file.close()
+
+def create_asgi_app(flask_app):
+    """Wrap a Flask application created by create_app() for ASGI servers."""
+    settings = flask_app.config['settings'].get('asgi', {})
+    return AsyncApp(
+        flask_app,
+        max_threads=settings.get('threads', 32),
+        max_body_size=flask_app.config.get('MAX_CONTENT_LENGTH')
+    )
+
+flask_app = build_app()
+app = create_asgi_app(flask_app)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    settings = flask_app.config['settings'].get('asgi', {})
+    uvicorn.run(app, host=settings.get('host', "0.0.0.0"), port=settings.get('port', 8000))
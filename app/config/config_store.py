@@ -0,0 +1,295 @@
+import os
+import threading
+from types import MappingProxyType
+import yaml
+from flask import g, has_app_context
+from config.auth_config import AuthConfig
+from services.jwt_keyring import check_algorithm
+
+# Settings that must be non-negative numbers when present, as (section, key)
+NUMERIC_SETTINGS = (
+    ("server", "max_content_length"),
+    ("profiling", "sample_rate"),
+    ("profiling", "interval_ms"),
+    ("access_log", "queue_size"),
+    ("access_log", "batch_size"),
+    ("access_log", "flush_interval_ms"),
+    ("change_feed", "capacity"),
+    ("change_feed", "max_waiting"),
+    ("change_feed", "stream_max_seconds"),
+    ("tenants", "max_todos"),
+    ("tenants", "max_tenants"),
+    ("cache", "max_entries"),
+    ("cache", "max_bytes"),
+    ("idempotency", "ttl_seconds"),
+    ("idempotency", "max_entries"),
+    ("sessions", "ttl_seconds"),
+    ("refresh_tokens", "ttl_seconds"),
+    ("jwt", "rotation_overlap_seconds"),
+    ("config", "reload_interval_seconds"),
+    ("jobs", "workers"),
+    ("jobs", "retention_seconds"),
+    ("notes", "io_workers"),
+)
+
+# Numeric settings that must be at least 1 (thread counts, sizes and intervals that cannot be 0)
+POSITIVE_SETTINGS = frozenset((
+    ("access_log", "queue_size"),
+    ("access_log", "batch_size"),
+    ("access_log", "flush_interval_ms"),
+    ("change_feed", "max_waiting"),
+    ("change_feed", "stream_max_seconds"),
+    ("tenants", "max_tenants"),
+    ("jobs", "workers"),
+    ("notes", "io_workers"),
+))
+
+# Settings holding secrets (strings), left out of ConfigSnapshot.to_dict()
+SECRET_SETTINGS = (
+    ("admin", "token"),
+    ("profiling", "header_token"),
+)
+
+def _freeze(value):
+    """Return a read-only copy of parsed YAML data."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _thaw(value):
+    """Return a plain (JSON serializable) copy of frozen data."""
+    if isinstance(value, MappingProxyType):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+class ConfigSnapshot:
+    """One immutable version of the configuration.
+
+    Snapshots are replaced as a whole, never modified, so a request that
+    reads the current snapshot once sees a consistent configuration even
+    while a reload is published. The AuthConfig of a published snapshot
+    must not be mutated either.
+    """
+
+    __slots__ = ("auth", "settings", "version")
+
+    def __init__(self, auth, settings, version=0):
+        object.__setattr__(self, "auth", auth)
+        object.__setattr__(self, "settings", _freeze(dict(settings)))
+        object.__setattr__(self, "version", version)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ConfigSnapshot is immutable")
+
+    def to_dict(self):
+        """Describe the snapshot without revealing secrets."""
+        settings = _thaw(self.settings)
+        for section, key in SECRET_SETTINGS:
+            if key in settings.get(section, {}):
+                settings[section][key] = "***"
+        return {
+            "version": self.version,
+            "auth_method": self.auth.auth_method.value,
+            "settings": settings,
+        }
+
+def parse_config(data):
+    """Validate a parsed auth_config.yml document.
+
+    Args:
+        data: Result of yaml.safe_load
+
+    Returns:
+        tuple: (AuthConfig, settings dict of the non-auth sections)
+
+    Raises:
+        ValueError: If the document is invalid
+    """
+    data = data or {}
+    if not isinstance(data, dict):
+        raise ValueError("auth_config.yml must contain a mapping of sections")
+
+    auth = AuthConfig()
+    auth.update_from_dict({"auth": data.get("auth") or {}})
+
+    settings = {}
+    for name, section in data.items():
+        if name == "auth":
+            continue
+        if not isinstance(section, dict):
+            raise ValueError(f"Section '{name}' must be a mapping")
+        settings[name] = section
+
+    validate_settings(settings)
+    return auth, settings
+
+def validate_settings(settings):
+    """Check the values of NUMERIC_SETTINGS, SECRET_SETTINGS and the JWT algorithm in the non-auth sections.
+
+    Raises:
+        ValueError: If a value is not a number or is out of range, a secret
+            is not a string, or the JWT algorithm is unsupported or
+            unavailable
+    """
+    for section, key in NUMERIC_SETTINGS:
+        value = settings.get(section, {}).get(key)
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            raise ValueError(f"Setting '{section}.{key}' must be a non-negative number, got {value!r}")
+        if value < 1 and (section, key) in POSITIVE_SETTINGS:
+            raise ValueError(f"Setting '{section}.{key}' must be at least 1, got {value!r}")
+    for section, key in SECRET_SETTINGS:
+        value = settings.get(section, {}).get(key)
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"Setting '{section}.{key}' must be a string")
+    if 'algorithm' in settings.get('jwt', {}):
+        check_algorithm(settings['jwt']['algorithm'])
+
+class ConfigStore:
+    """Holds the current ConfigSnapshot and publishes new ones.
+
+    Readers call get() and use the returned snapshot. Publishing swaps the
+    reference atomically and then notifies listeners with the old and new
+    snapshots; publications are serialized, so listeners see them in order.
+    With a path, reload() (or the watcher thread started by watch()) picks
+    up edits to the file after validating them.
+    """
+
+    def __init__(self, snapshot, path=None):
+        self.current = snapshot
+        self.path = path
+        self.listeners = []  # Called as listener(old, new) after each publication
+        self._lock = threading.RLock()
+        self._stamp = self._file_stamp()
+        self._file_auth = self._read_file_auth()  # Auth section of the file as last loaded
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def get(self):
+        """Return the current snapshot."""
+        return self.current
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def publish(self, auth=None, settings=None):
+        """Publish a snapshot with a new auth config and/or new settings.
+
+        Args:
+            auth (AuthConfig, optional): New auth config; keeps the current one if None
+            settings (dict, optional): New settings; keeps the current ones if None
+
+        Returns:
+            ConfigSnapshot: The published snapshot
+        """
+        with self._lock:
+            old = self.current
+            new = ConfigSnapshot(
+                auth if auth is not None else old.auth,
+                settings if settings is not None else old.settings,
+                old.version + 1
+            )
+            self.current = new
+            for listener in self.listeners:
+                listener(old, new)
+        return new
+
+    def reload(self, force=False):
+        """Publish the configuration file if it changed since it was last loaded.
+
+        The auth section is only applied when it changed in the file, so an
+        override made through POST /auth/reset survives edits to other
+        sections. Invalid files are reported and ignored.
+
+        Args:
+            force (bool): Reload even if the file looks unchanged
+
+        Returns:
+            tuple: (published snapshot or None, error message or None)
+        """
+        if self.path is None:
+            return None, "No configuration file"
+        with self._lock:
+            stamp = self._file_stamp()
+            if stamp == self._stamp and not force:
+                return None, None
+            self._stamp = stamp
+            try:
+                with open(self.path, 'r') as f:
+                    data = yaml.safe_load(f)
+                auth, settings = parse_config(data)
+            except (OSError, yaml.YAMLError, ValueError) as e:
+                print(f"Error reloading {self.path}, keeping the current configuration: {e}")
+                return None, str(e)
+
+            file_auth = (data or {}).get("auth") or {}
+            auth_changed = file_auth != self._file_auth
+            self._file_auth = file_auth
+            snapshot = self.publish(auth if auth_changed else None, settings)
+        print(f"Configuration reloaded from {self.path} (version {snapshot.version})")
+        return snapshot, None
+
+    def watch(self, interval=2.0):
+        """Poll the configuration file for changes in a background thread."""
+        if self._watcher is not None or self.path is None or interval <= 0:
+            return
+        self._watcher = threading.Thread(target=self._watch_loop, args=(interval,), name="config-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch_loop(self, interval):
+        while not self._stop.wait(interval):
+            self.reload()
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path) if self.path else None
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size) if stat else None
+
+    def _read_file_auth(self):
+        try:
+            with open(self.path, 'r') as f:
+                return (yaml.safe_load(f) or {}).get("auth") or {}
+        except (OSError, TypeError, AttributeError, yaml.YAMLError):
+            return {}
+
+# Global configuration store instance
+_global_config_store = None
+
+def get_config_store():
+    """Get the global configuration store."""
+    return _global_config_store
+
+def current_config():
+    """Return the configuration snapshot of the current request.
+
+    The first call in a request (or other application context, such as a
+    background job) reads the store and keeps the snapshot in `g`. The auth
+    middleware, routes and services all read the configuration through this
+    function, so they agree on one version for the whole request even if a
+    reload is published while it runs.
+
+    Returns:
+        ConfigSnapshot: The snapshot pinned to the current context, or the
+                        store's current snapshot outside of a context
+    """
+    if not has_app_context():
+        return _global_config_store.get()
+    snapshot = g.get('config_snapshot')
+    if snapshot is None:
+        snapshot = g.config_snapshot = _global_config_store.get()
+    return snapshot
+
+def set_config_store(store):
+    """Set the global configuration store."""
+    global _global_config_store
+    _global_config_store = store
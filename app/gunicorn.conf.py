@@ -0,0 +1,46 @@
+"""Gunicorn configuration for serving the Todo API in production.
+
+Settings are read from the optional `server` section of auth_config.yml and
+can be overridden with environment variables:
+
+    server:
+      bind: 0.0.0.0:8000          # WEB_BIND
+      workers: 1                  # WEB_WORKERS
+      threads: 8                  # WEB_THREADS
+      keepalive: 5                # WEB_KEEPALIVE (seconds)
+      timeout: 30                 # WEB_TIMEOUT (seconds)
+      graceful_timeout: 30        # WEB_GRACEFUL_TIMEOUT (seconds)
+      max_requests: 0             # WEB_MAX_REQUESTS (0 disables worker recycling)
+      limit_request_line: 8190    # WEB_LIMIT_REQUEST_LINE (bytes)
+      limit_request_fields: 100   # WEB_LIMIT_REQUEST_FIELDS
+      limit_request_field_size: 8190  # WEB_LIMIT_REQUEST_FIELD_SIZE (bytes)
+      max_content_length: 16777216    # Request body limit, enforced by Flask
+
+Todos, users and tokens live in process memory, so every worker process holds
+its own copy. Keep `workers` at 1 and scale with `threads` unless clients are
+pinned to a worker; each thread serves one request at a time.
+"""
+import os
+from utils.config import load_settings
+
+_server = load_settings().get('server', {})
+
+def _setting(name, default):
+    value = os.environ.get(f"WEB_{name.upper()}", _server.get(name, default))
+    return type(default)(value) if default is not None else value
+
+bind = _setting('bind', "0.0.0.0:8000")
+workers = _setting('workers', 1)
+worker_class = "gthread"
+threads = _setting('threads', 8)
+keepalive = _setting('keepalive', 5)
+timeout = _setting('timeout', 30)
+graceful_timeout = _setting('graceful_timeout', 30)
+max_requests = _setting('max_requests', 0)
+max_requests_jitter = max_requests // 10
+limit_request_line = _setting('limit_request_line', 8190)
+limit_request_fields = _setting('limit_request_fields', 100)
+limit_request_field_size = _setting('limit_request_field_size', 8190)
+
+accesslog = None
+errorlog = "-"
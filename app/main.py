@@ -3,22 +3,42 @@ from routes.todos import todos_bp
 from routes.errors import errors_bp
 from routes.docs import docs_bp
 from routes.notes import notes_bp
-from routes.auth import auth_bp, init_auth_routes
+from routes.auth import auth_bp
+from routes.admin import admin_bp
+from routes.jobs import jobs_bp
 from middleware.auth_middleware import AuthMiddleware, set_auth_middleware_instance
-from utils.config import load_config, load_initial_todos, load_initial_users
+from middleware.profiling_middleware import ProfilingMiddleware, set_profiling_middleware_instance, get_profiling_middleware_instance
+from middleware.access_log import AccessLogMiddleware, set_access_log_instance, get_access_log_instance
+from middleware.idempotency import IdempotencyCache, set_idempotency_cache_instance, get_idempotency_cache_instance
+from middleware.session_interface import ServerSideSessionInterface
+from utils.config import load_config, load_settings, load_initial_todos, load_initial_users, get_config_path
+from config.config_store import ConfigStore, ConfigSnapshot, set_config_store, validate_settings
 from utils.auth import setup_auth_config
-from services.auth_service import init_auth_service, add_user
+from utils.json_provider import FastJSONProvider
+from services.auth_service import (
+    sync_jwt_keyring, add_user, set_session_store, set_refresh_token_store,
+    reset_auth_service, apply_auth_settings,
+)
+from services.refresh_token_store import RefreshTokenStore
+from services.session_store import create_session_store
+from services.todo_service import TodoService
+from services.job_queue import create_job_queue, set_job_queue_instance
+from services.note_io import NoteIO, set_note_io_instance
 from flasgger import Swagger
 import secrets
 
+# Settings sections that are only read at startup
+RESTART_SECTIONS = ("server", "asgi", "change_feed", "jobs", "notes")
+
 def create_app(auth_config):
     """Create and configure the Flask application.
 
     This function:
     1. Creates a new Flask instance
     2. Configures app settings and secrets
-    3. Sets up authentication middleware
+    3. Sets up access logging, profiling, idempotency and authentication middleware
     4. Registers blueprints with their URL prefixes
+    5. Watches auth_config.yml and applies validated changes at runtime
 
     Args:
         auth_config: Authentication configuration object
@@ -27,13 +47,22 @@ def create_app(auth_config):
         Flask: Configured Flask application instance
     """
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)  # Compact output (orjson if installed); ?pretty=1 indents
 
     # Configure application settings
-    app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
     app.config['SECRET_KEY'] = secrets.token_hex(32)  # Generate secure random secret key
     app.config['auth_config'] = auth_config
     app.config['initial_todos'] = load_initial_todos()  # Load initial todos from config file
 
+    # Hold the configuration as an immutable snapshot that reloads replace as a whole
+    settings = load_settings()
+    validate_settings(settings)  # Reloads are validated the same way before they are applied
+    config_store = ConfigStore(ConfigSnapshot(auth_config, settings), get_config_path())
+    set_config_store(config_store)
+    app.config['settings'] = config_store.get().settings  # Optional non-auth sections of auth_config.yml
+    app.config['MAX_CONTENT_LENGTH'] = app.config['settings'].get('server', {}).get(
+        'max_content_length', 16 * 1024 * 1024)  # Reject larger request bodies with 413
+
     # Configure Swagger
     template = {
         "swagger": "2.0",
@@ -53,9 +82,41 @@ def create_app(auth_config):
 
     Swagger(app, template=template)
 
-    # Set up authentication
-    init_auth_routes(auth_config)
-    auth_middleware = AuthMiddleware(auth_config)
+    # Log every request as a JSON line, written in batches by a background thread
+    # (registered first so latencies include profiling and authentication)
+    access_log = AccessLogMiddleware(app.config['settings'].get('access_log'))
+    access_log.init_app(app)
+    set_access_log_instance(access_log)
+
+    # Set up request profiling (registered before authentication so it covers it)
+    profiling_middleware = ProfilingMiddleware(app.config['settings'].get('profiling'))
+    profiling_middleware.init_app(app)
+    set_profiling_middleware_instance(profiling_middleware)
+
+    # Set up replay of responses to retried writes (Idempotency-Key header)
+    idempotency_settings = app.config['settings'].get('idempotency', {})
+    set_idempotency_cache_instance(IdempotencyCache(
+        ttl_seconds=idempotency_settings.get('ttl_seconds', 86400),
+        max_entries=idempotency_settings.get('max_entries', 10000)
+    ))
+
+    # Keep sessions on the server; the cookie only carries the session id
+    session_store = create_session_store(app.config['settings'].get('sessions'))
+    set_session_store(session_store)
+    app.session_interface = ServerSideSessionInterface(session_store)
+    set_refresh_token_store(RefreshTokenStore(
+        app.config['settings'].get('refresh_tokens', {}).get('ttl_seconds', 30 * 24 * 3600)
+    ))
+    sync_jwt_keyring(config_store.get())  # Keys that sign and verify access tokens
+
+    # Run heavy operations requested with ?async=1 in the background
+    set_job_queue_instance(create_job_queue(app, app.config['settings'].get('jobs')))
+
+    # Cap the number of note file operations on the disk at once
+    set_note_io_instance(NoteIO(app.config['settings'].get('notes', {}).get('io_workers', 4)))
+
+    # Set up authentication; the middleware reads the auth config of each request's snapshot
+    auth_middleware = AuthMiddleware()
 
     # Store the middleware instance globally for runtime updates
     set_auth_middleware_instance(auth_middleware)
@@ -63,7 +124,8 @@ def create_app(auth_config):
     # Define routes that require authentication
     protected_blueprints = {
         todos_bp: "/todos",  # Todo management endpoints
-        notes_bp: "/notes"   # Note management endpoints
+        notes_bp: "/notes",  # Note management endpoints
+        jobs_bp: "/jobs"     # Background job status
     }
 
     # Register protected routes with authentication middleware
@@ -71,34 +133,93 @@ def create_app(auth_config):
         auth_middleware.protect_blueprint(blueprint)
         app.register_blueprint(blueprint, url_prefix=url_prefix)
 
+    # Register admin routes, which check admin.token instead of user authentication
+    app.register_blueprint(admin_bp, url_prefix="/admin")  # Profiling and diagnostics endpoints
+
     # Register public routes (no authentication required)
     app.register_blueprint(auth_bp, url_prefix="/auth")  # Authentication endpoints
     app.register_blueprint(docs_bp, url_prefix="/docs")  # API documentation
     app.register_blueprint(errors_bp)  # Error handlers (no prefix needed)
 
+    # Apply configuration changes (file edits and POST /auth/reset) to the running app
+    config_store.add_listener(lambda old, new: apply_config(app, old, new))
+    config_store.watch(app.config['settings'].get('config', {}).get('reload_interval_seconds', 2))
+
     return app
 
+def _startup_settings(snapshot, name):
+    """Return the settings of a section that are only read at startup."""
+    section = snapshot.settings.get(name, {})
+    return {key: value for key, value in section.items() if (name, key) != ("server", "max_content_length")}
+
+def apply_config(app, old, new):
+    """Apply a newly published configuration snapshot to the running application.
+
+    Auth changes are applied like POST /auth/reset. Limits, TTLs and cache
+    sizes take effect immediately; changes to sections that are only read at
+    startup are reported as needing a restart.
+
+    Args:
+        app: The Flask application
+        old (ConfigSnapshot): The previous snapshot
+        new (ConfigSnapshot): The published snapshot
+    """
+    if new.auth is not old.auth:
+        app.config['auth_config'] = new.auth
+        reset_auth_service(old.auth, new)
+
+    if new.settings is old.settings:
+        return
+
+    settings = new.settings
+    app.config['settings'] = settings
+    app.config['MAX_CONTENT_LENGTH'] = settings.get('server', {}).get('max_content_length', 16 * 1024 * 1024)
+    get_profiling_middleware_instance().configure(settings.get('profiling'))
+    get_access_log_instance().configure(settings.get('access_log'))
+    idempotency_settings = settings.get('idempotency', {})
+    idempotency_cache = get_idempotency_cache_instance()
+    idempotency_cache.ttl = idempotency_settings.get('ttl_seconds', 86400)
+    idempotency_cache.max_entries = idempotency_settings.get('max_entries', 10000)
+    apply_auth_settings(settings)
+    with app.app_context():
+        TodoService.apply_settings(settings)
+
+    changed = [name for name in RESTART_SECTIONS if _startup_settings(old, name) != _startup_settings(new, name)]
+    if changed:
+        print(f"Changes to {changed} take effect after a restart")
+
 def seed_users():
     for user_data in load_initial_users():
         if not add_user(user_data["username"], user_data["password"]):
             print(f"Error: Failed to add user on init")
 
-if __name__ == "__main__":
-    try:
-        # Load authentication configuration from config file
-        auth_method, secret = load_config()
+def build_app():
+    """Build the application from auth_config.yml and the initial data files.
+
+    Shared by the development server below and the production entry point
+    in wsgi.py.
+
+    Returns:
+        Flask: Configured Flask application instance
+
+    Raises:
+        ValueError: If the authentication configuration or a setting is invalid
+    """
+    # Load authentication configuration from config file
+    auth_method, secret = load_config()
 
-        # Set up authentication based on configuration
-        auth_config = setup_auth_config(auth_method, secret)
-        seed_users()
+    # Set up authentication based on configuration
+    auth_config = setup_auth_config(auth_method, secret)
+    seed_users()
 
-        # Initialize auth service
-        init_auth_service(auth_config)
+    # Create and configure the application
+    return create_app(auth_config)
 
-        # Create and configure the application
-        app = create_app(auth_config)
+if __name__ == "__main__":
+    try:
+        app = build_app()
 
-        # Start the server
+        # Start the development server (use wsgi.py with gunicorn in production)
         app.run(host="0.0.0.0", port=8000)  # Listen on all interfaces, port 8000
     except ValueError as e:
         print(f"Error: {e}")
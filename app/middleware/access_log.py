@@ -0,0 +1,207 @@
+import sys
+import threading
+import time
+from collections import deque
+from flask import request, g
+from utils.auth import get_current_identity
+from utils.json_provider import encode
+
+class AccessLogWriter:
+    """Write access log records as JSON lines from a background thread.
+
+    Requests only append their record to a bounded in-memory queue. A writer
+    thread encodes and writes the queued records in batches, when a batch
+    fills up or every `flush_interval` seconds. When the queue is full (the
+    disk cannot keep up) new records are dropped and counted rather than
+    blocking requests.
+    """
+
+    def __init__(self, path="access.log", queue_size=10000, batch_size=256, flush_interval=1.0):
+        self.path = path  # "-" writes to standard output
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = deque()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._closed = False
+        self._thread = threading.Thread(target=self._write_loop, name="access-log-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, record):
+        """Queue a record for writing; never blocks on I/O.
+
+        Returns:
+            bool: False if the record was dropped because the queue is full
+        """
+        with self._lock:
+            if len(self.queue) >= self.queue_size or self._closed:
+                self.dropped += 1
+                return False
+            self.queue.append(record)
+            self.enqueued += 1
+            if len(self.queue) >= self.batch_size:
+                self._ready.notify()
+        return True
+
+    def close(self, timeout=5.0):
+        """Stop the writer thread after it wrote the queued records."""
+        with self._lock:
+            self._closed = True
+            self._ready.notify()
+        self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "path": self.path,
+                "queued": len(self.queue),
+                "queue_size": self.queue_size,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "batches": self.batches,
+                "errors": self.errors,
+            }
+
+    def _take_batch(self):
+        """Wait for a full batch or the flush interval and take up to batch_size records."""
+        with self._lock:
+            if len(self.queue) < self.batch_size and not self._closed:
+                self._ready.wait(self.flush_interval)
+            count = min(len(self.queue), self.batch_size)
+            return [self.queue.popleft() for _ in range(count)], self._closed
+
+    def _write_loop(self):
+        stream = None
+        while True:
+            batch, closed = self._take_batch()
+            if batch:
+                data = b"".join(encode(record) + b"\n" for record in batch)
+                try:
+                    if stream is None:
+                        stream = sys.stdout.buffer if self.path == "-" else open(self.path, "ab")
+                    stream.write(data)
+                    stream.flush()
+                    written, errors = len(batch), 0
+                except (OSError, ValueError) as e:
+                    print(f"Error writing access log to {self.path}: {e}")
+                    written, errors = 0, 1
+                with self._lock:
+                    self.written += written
+                    self.errors += errors
+                    self.batches += 1
+            elif closed:
+                break
+        if stream is not None and self.path != "-":
+            stream.close()
+
+class AccessLogMiddleware:
+    """Record one structured access log entry per request.
+
+    Each entry has the time, method, matched route, path, status, latency,
+    authenticated identity and response size. Entries are handed to an
+    AccessLogWriter, so requests never wait for the log file.
+    """
+
+    def __init__(self, settings=None):
+        self.writer = None
+        self.configure(settings)
+
+    def configure(self, settings=None):
+        """Apply the `access_log` settings; safe to call while requests are served.
+
+        A new writer is started when the path or queue sizes change; the
+        previous one finishes writing its queued records in the background.
+        """
+        settings = settings or {}
+        self.enabled = bool(settings.get('enabled', False))
+        options = (
+            settings.get('path', 'access.log'),
+            int(settings.get('queue_size', 10000)),
+            int(settings.get('batch_size', 256)),
+            float(settings.get('flush_interval_ms', 1000)) / 1000,
+        )
+
+        old = self.writer
+        if not self.enabled:
+            self.writer = None
+        elif old is None or (old.path, old.queue_size, old.batch_size, old.flush_interval) != options:
+            self.writer = AccessLogWriter(*options)
+        if old is not None and old is not self.writer:
+            threading.Thread(target=old.close, name="access-log-close", daemon=True).start()
+
+    def init_app(self, app):
+        """Register the request hooks on the application"""
+        app.before_request(self._start_request)
+        app.after_request(self._log_request)
+
+    def _start_request(self):
+        if self.writer is not None:
+            g.access_log_started = time.perf_counter()
+        return None
+
+    def _log_request(self, response):
+        self.record(self.request_info(), response.status_code, response.content_length)
+        return response
+
+    def request_info(self):
+        """Capture the current request's part of its entry, before the response is sent.
+
+        Returns:
+            dict: Info for record(), or None if the request is not logged
+        """
+        started = g.pop('access_log_started', None)
+        if started is None:
+            return None
+        return {
+            "method": request.method,
+            "route": request.url_rule.rule if request.url_rule else None,
+            "path": request.path,
+            "identity": get_current_identity(),
+            "started": started,
+        }
+
+    def record(self, info, status, size):
+        """Queue the entry of a finished request.
+
+        Args:
+            info (dict): Result of request_info(), or None to log nothing
+            status (int): Response status
+            size (int): Response size in bytes, or None for streamed responses
+        """
+        writer = self.writer
+        if writer is None or info is None:
+            return
+        writer.submit({
+            "time": time.time(),
+            "method": info["method"],
+            "route": info["route"],
+            "path": info["path"],
+            "status": status,
+            "latency_ms": round((time.perf_counter() - info["started"]) * 1000, 3),
+            "identity": info["identity"],
+            "bytes": size,
+        })
+
+    def stats(self):
+        """Return the writer's queue and drop counters."""
+        writer = self.writer
+        return {"enabled": self.enabled, **(writer.stats() if writer is not None else {})}
+
+# Global access log instance used by the admin routes
+_global_access_log_instance = None
+
+def get_access_log_instance():
+    """Get the global access log middleware instance."""
+    return _global_access_log_instance
+
+def set_access_log_instance(instance):
+    """Set the global access log middleware instance."""
+    global _global_access_log_instance
+    _global_access_log_instance = instance
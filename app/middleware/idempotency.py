@@ -0,0 +1,147 @@
+import hashlib
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import request, current_app, Response
+from utils.auth import get_current_identity
+from utils.errors import error_response
+
+class IdempotencyCache:
+    """Bounded, TTL-expiring store of responses to requests with an Idempotency-Key.
+
+    Entries are keyed by tenant and key and remember a fingerprint of the
+    original request, so a retry replays the original response while reuse
+    of a key for a different request is rejected.
+    """
+
+    IN_PROGRESS = object()  # Placeholder response while the first request runs
+
+    def __init__(self, ttl_seconds=86400, max_entries=10000):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # Maps (tenant, key) to [expires_at, fingerprint, response], oldest first
+        self.expiry = []  # Heap of (expires_at, (tenant, key)); stale items are skipped when popped
+        self._lock = threading.Lock()
+
+    def begin(self, tenant, key, fingerprint):
+        """Claim a key for a new request, or return what is already stored for it.
+
+        Returns:
+            tuple: ("new", None), ("replay", (status, body, headers)),
+                   ("in_progress", None) or ("mismatch", None)
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self.entries.get((tenant, key))
+            if entry is None:
+                self.entries[(tenant, key)] = [now + self.ttl, fingerprint, self.IN_PROGRESS]
+                heapq.heappush(self.expiry, (now + self.ttl, (tenant, key)))
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                return "new", None
+            if entry[1] != fingerprint:
+                return "mismatch", None
+            if entry[2] is self.IN_PROGRESS:
+                return "in_progress", None
+            return "replay", entry[2]
+
+    def complete(self, tenant, key, status, body, headers):
+        with self._lock:
+            entry = self.entries.get((tenant, key))
+            if entry is not None:
+                entry[2] = (status, body, headers)
+
+    def abort(self, tenant, key):
+        """Release a key whose request failed, so that it can be retried."""
+        with self._lock:
+            self.entries.pop((tenant, key), None)
+
+    def _expire(self, now):
+        """Drop expired entries, earliest expiry first. Called with the lock held.
+
+        Entries evicted or aborted early leave their heap item behind; a key
+        stored again since then has a different expiry and is kept.
+        """
+        while self.expiry and self.expiry[0][0] <= now:
+            expires_at, full_key = heapq.heappop(self.expiry)
+            entry = self.entries.get(full_key)
+            if entry is not None and entry[0] == expires_at:
+                del self.entries[full_key]
+        if len(self.expiry) > 2 * len(self.entries) + 64:  # Mostly entries evicted early; rebuild
+            self.expiry = [(entry[0], full_key) for full_key, entry in self.entries.items()]
+            heapq.heapify(self.expiry)
+
+# Global idempotency cache instance
+_global_idempotency_cache = None
+
+def get_idempotency_cache_instance():
+    """Get the global idempotency cache instance."""
+    return _global_idempotency_cache
+
+def set_idempotency_cache_instance(instance):
+    """Set the global idempotency cache instance."""
+    global _global_idempotency_cache
+    _global_idempotency_cache = instance
+
+REPLAYED_HEADERS = ("Content-Type", "Location", "X-Total-Count")
+MAX_KEY_LENGTH = 255
+
+def _request_fingerprint():
+    """Hash the method, path and payload of the current request."""
+    digest = hashlib.sha256(f"{request.method} {request.full_path}\n".encode())
+    if request.mimetype == 'multipart/form-data':
+        for name, value in sorted(request.form.items(multi=True)):
+            digest.update(f"{name}={value}\n".encode())
+        for name, file in sorted(request.files.items(multi=True), key=lambda item: item[0]):
+            digest.update(f"{name}:{file.filename}\n".encode())
+            digest.update(file.stream.read())
+            file.stream.seek(0)
+    else:
+        digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+def idempotent(view):
+    """Make a write endpoint safe to retry with an Idempotency-Key header.
+
+    The first request with a key runs normally and its response is stored.
+    Repeats with the same key and payload get the stored response (with an
+    Idempotent-Replayed header) without running the view again. Server errors
+    are not stored, so those requests can be retried.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        cache = get_idempotency_cache_instance()
+        if not key or cache is None:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return error_response("idempotency_key_too_long", f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+
+        tenant = get_current_identity()
+        state, stored = cache.begin(tenant, key, _request_fingerprint())
+        if state == "mismatch":
+            return error_response("idempotency_key_reused")
+        if state == "in_progress":
+            return error_response("idempotency_key_in_progress")
+        if state == "replay":
+            status, body, headers = stored
+            response = Response(body, status=status, headers=headers)
+            response.headers["Idempotent-Replayed"] = "true"
+            return response
+
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except Exception:
+            cache.abort(tenant, key)
+            raise
+
+        if response.status_code >= 500 or response.is_streamed:
+            cache.abort(tenant, key)
+        else:
+            headers = {name: response.headers[name] for name in REPLAYED_HEADERS if name in response.headers}
+            cache.complete(tenant, key, response.status_code, response.get_data(), headers)
+        return response
+    return wrapper
@@ -0,0 +1,181 @@
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from flask import request, g
+
+class EndpointProfile:
+    """Aggregated profiling data for a single endpoint."""
+    def __init__(self):
+        self.requests = 0
+        self.total_seconds = 0.0
+        self.samples = 0
+        self.stacks = Counter()  # Maps collapsed stack strings to sample counts
+
+    def to_dict(self):
+        return {
+            "requests": self.requests,
+            "total_ms": round(self.total_seconds * 1000, 3),
+            "avg_ms": round(self.total_seconds * 1000 / self.requests, 3) if self.requests else 0.0,
+            "samples": self.samples,
+        }
+
+class ProfilingMiddleware:
+    """Sample the call stacks of a fraction of requests and aggregate them per endpoint.
+
+    A request is profiled when profiling is enabled and it falls within
+    `sample_rate`, or when it carries the privileged `X-Profile` header matching
+    the configured `header_token`. While at least one request is being profiled,
+    a background thread walks the stacks of the profiled request threads every
+    `interval_ms` milliseconds and records them in collapsed (flamegraph) form.
+    """
+
+    HEADER = 'X-Profile'
+
+    def __init__(self, settings=None):
+        self.configure(settings)
+
+        self.profiles = {}  # Maps endpoint names to EndpointProfile objects
+        self._active = {}  # Maps thread idents of profiled requests to endpoint names
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._sampler = None
+
+    def configure(self, settings=None):
+        """Apply the `profiling` settings; safe to call while requests are served."""
+        settings = settings or {}
+        self.enabled = bool(settings.get('enabled', False))
+        self.sample_rate = float(settings.get('sample_rate', 0.01))
+        self.interval = float(settings.get('interval_ms', 5)) / 1000
+        self.header_token = settings.get('header_token')
+        self.max_stacks = int(settings.get('max_stacks_per_endpoint', 5000))
+
+    def init_app(self, app):
+        """Register the request hooks on the application"""
+        app.before_request(self._start_request)
+        app.teardown_request(self._finish_request)
+
+    def _should_profile(self):
+        token = request.headers.get(self.HEADER)
+        # Compared as bytes: compare_digest rejects str values with non-ASCII characters
+        if token and self.header_token and hmac.compare_digest(token.encode(), self.header_token.encode()):
+            return True
+        return self.enabled and random.random() < self.sample_rate
+
+    def _start_request(self):
+        if not self._should_profile():
+            return None
+
+        endpoint = f"{request.method} {request.url_rule.rule if request.url_rule else '<unmatched>'}"
+        g.profiling_endpoint = endpoint
+        g.profiling_started = time.perf_counter()
+
+        with self._lock:
+            self._active[threading.get_ident()] = endpoint
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_loop, name="profiling-sampler", daemon=True)
+                self._sampler.start()
+            self._wakeup.notify()
+        return None
+
+    def _finish_request(self, exc=None):
+        endpoint = g.pop('profiling_endpoint', None)
+        if endpoint is None:
+            return
+
+        elapsed = time.perf_counter() - g.pop('profiling_started')
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+            profile = self.profiles.setdefault(endpoint, EndpointProfile())
+            profile.requests += 1
+            profile.total_seconds += elapsed
+
+    def _sample_loop(self):
+        """Background loop sampling the stacks of all profiled request threads."""
+        while True:
+            with self._lock:
+                while not self._active:
+                    self._wakeup.wait()
+                active = dict(self._active)
+
+            frames = sys._current_frames()
+            collected = []
+            for ident, endpoint in active.items():
+                frame = frames.get(ident)
+                if frame is not None:
+                    collected.append((endpoint, self._collapse(frame)))
+            del frames
+
+            with self._lock:
+                for endpoint, stack in collected:
+                    profile = self.profiles.setdefault(endpoint, EndpointProfile())
+                    profile.samples += 1
+                    if stack in profile.stacks or len(profile.stacks) < self.max_stacks:
+                        profile.stacks[stack] += 1
+
+            time.sleep(self.interval)
+
+    @staticmethod
+    def _collapse(frame):
+        """Render a frame chain as a root-first, semicolon separated stack."""
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        names.reverse()
+        return ";".join(name.replace(";", ",") for name in names)
+
+    def summary(self):
+        """Return per-endpoint request counts, timings and sample counts."""
+        with self._lock:
+            endpoints = {endpoint: profile.to_dict() for endpoint, profile in self.profiles.items()}
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "interval_ms": self.interval * 1000,
+            "endpoints": endpoints,
+        }
+
+    def collapsed_stacks(self, endpoint=None):
+        """Return profiling data in the collapsed stack format used by flamegraph tools.
+
+        Args:
+            endpoint (str, optional): Restrict output to one endpoint (e.g. "GET /todos").
+                When omitted, stacks of all endpoints are returned with the
+                endpoint name as their root frame.
+
+        Returns:
+            str: One "frame;frame;frame count" line per distinct stack
+        """
+        with self._lock:
+            if endpoint is not None:
+                profile = self.profiles.get(endpoint)
+                stacks = list(profile.stacks.items()) if profile else []
+            else:
+                stacks = [
+                    (f"{name};{stack}", count)
+                    for name, profile in self.profiles.items()
+                    for stack, count in profile.stacks.items()
+                ]
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def reset(self):
+        """Discard all collected profiling data."""
+        with self._lock:
+            self.profiles.clear()
+
+# Global profiling instance used by the admin routes
+_global_profiling_instance = None
+
+def get_profiling_middleware_instance():
+    """Get the global profiling middleware instance."""
+    return _global_profiling_instance
+
+def set_profiling_middleware_instance(instance):
+    """Set the global profiling middleware instance."""
+    global _global_profiling_instance
+    _global_profiling_instance = instance
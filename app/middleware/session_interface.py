@@ -0,0 +1,106 @@
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Session data loaded from a SessionStore; `sid` is None until first saved.
+
+    Like Flask's SecureCookieSession, it records whether it was read or
+    written (`accessed`), so only responses that depend on the session get
+    a `Vary: Cookie` header.
+    """
+
+    def __init__(self, initial=None, sid=None):
+        def on_update(session):
+            session.modified = True
+            session.accessed = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.modified = False
+        self.accessed = False
+        self.new_sid = False
+
+    def __getitem__(self, key):
+        self.accessed = True
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.accessed = True
+        return super().get(key, default)
+
+    def setdefault(self, key, default=None):
+        self.accessed = True
+        return super().setdefault(key, default)
+
+    def regenerate(self):
+        """Move the session to a fresh id when it is saved (e.g. on login)."""
+        self.new_sid = True
+        self.modified = True
+        self.accessed = True
+
+class ServerSideSessionInterface(SessionInterface):
+    """Keep Flask session data in a SessionStore instead of a signed cookie.
+
+    The cookie only carries the session id, so loading a session is a single
+    store lookup with no deserialization or signature check, and a session
+    can be revoked on the server by deleting it from the store.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            data = self.store.get(sid)
+            if data is not None:
+                return ServerSession(data, sid)
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        # A cleared session is revoked on the server and its cookie removed
+        if not session:
+            if session.modified:
+                if session.sid is not None:
+                    self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       samesite=samesite, httponly=httponly)
+                response.vary.add("Cookie")
+            return
+
+        if not session.modified:
+            return
+
+        if session.new_sid and session.sid is not None:
+            self.store.delete(session.sid)
+            session.sid = None
+
+        if session.sid is None:
+            session.sid = self.store.create(session)
+        elif not self.store.save(session.sid, session):
+            # Revoked while the request was running; do not bring it back
+            response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                   samesite=samesite, httponly=httponly)
+            return
+
+        response.set_cookie(
+            name,
+            session.sid,
+            max_age=self.store.ttl,
+            httponly=httponly,
+            domain=domain,
+            path=path,
+            secure=secure,
+            samesite=samesite,
+        )
+        response.vary.add("Cookie")
@@ -1,16 +1,53 @@
+import time
+from utils.json_provider import encode
+
 class Todo:
     """A class representing a single TODO item."""
-    def __init__(self, id, title, done=False, description=None):
-        self.id = id
-        self.title = title
-        self.done = done
-        self.description = description
+    FIELDS = ("id", "title", "done", "description", "created_at", "updated_at", "tags")
+
+    def __init__(self, id, title, done=False, description=None, created_at=None, updated_at=None, tags=()):
+        created_at = created_at if created_at is not None else time.time()  # Unix timestamps
+        # Set the fields directly: a new todo has no encoded form to drop (see __setattr__)
+        self.__dict__.update(
+            id=id,
+            title=title,
+            done=done,
+            description=description,
+            created_at=created_at,
+            updated_at=updated_at if updated_at is not None else created_at,
+            tags=tuple(tags),  # Immutable, so the store's tag index cannot be bypassed
+            _json=None,
+        )
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in Todo.FIELDS:
+            object.__setattr__(self, "_json", None)  # Drop the encoded form on any change
 
-    def to_dict(self):
-        """Convert the TODO item to a dictionary."""
+    def to_dict(self, fields=None):
+        """Convert the TODO item to a dictionary.
+
+        Args:
+            fields (iterable, optional): Only include these fields (see FIELDS)
+        """
+        if fields is not None:
+            return {field: getattr(self, field) for field in fields}
         return {
             "id": self.id,
             "title": self.title,
             "done": self.done,
             "description": self.description,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "tags": list(self.tags),
         }
+
+    def to_json(self):
+        """Return the compact JSON encoding of to_dict(), cached until a field changes.
+
+        Returns:
+            bytes: Encoded JSON object
+        """
+        if self._json is None:
+            self._json = encode(self.to_dict())
+        return self._json
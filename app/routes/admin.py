@@ -0,0 +1,174 @@
+import hmac
+from flask import Blueprint, request, jsonify, Response
+from middleware.profiling_middleware import get_profiling_middleware_instance
+from middleware.access_log import get_access_log_instance
+from services.todo_service import TodoService
+from services.auth_service import get_jwt_keys, rotate_jwt_key
+from config.config_store import get_config_store, current_config
+from utils.errors import error_response
+
+admin_bp = Blueprint("admin", __name__)
+
+@admin_bp.before_request
+def require_admin_token():
+    """Guard the admin routes with their own credential.
+
+    They rotate keys, reload configuration and expose diagnostics, so they
+    are not open to every authenticated user (or to everyone when
+    authentication is disabled): they stay disabled until `admin.token` is
+    set, and then require it in the X-Admin-Token header.
+    """
+    admin_token = current_config().settings.get('admin', {}).get('token')
+    if not admin_token:
+        return error_response("admin_disabled")
+    token = request.headers.get('X-Admin-Token')
+    if not token:
+        return error_response("admin_token_required")
+    if not hmac.compare_digest(token.encode(), admin_token.encode()):
+        return error_response("invalid_admin_token")
+    return None
+
+@admin_bp.route("/profiling", methods=["GET"])
+def profiling_summary():
+    """Get aggregated profiling data per endpoint
+    ---
+    tags:
+      - admin
+    responses:
+      200:
+        description: Profiling configuration and per-endpoint request, timing and sample counts
+    """
+    return jsonify(get_profiling_middleware_instance().summary()), 200
+
+@admin_bp.route("/profiling/collapsed", methods=["GET"])
+def profiling_collapsed():
+    """Get sampled stacks in collapsed format, ready for flamegraph tools
+    ---
+    tags:
+      - admin
+    parameters:
+      - name: endpoint
+        in: query
+        type: string
+        required: false
+        description: Restrict output to one endpoint, e.g. "GET /todos"
+    produces:
+      - text/plain
+    responses:
+      200:
+        description: One "frame;frame;frame count" line per distinct stack
+    """
+    endpoint = request.args.get("endpoint", type=str)
+    return Response(
+        get_profiling_middleware_instance().collapsed_stacks(endpoint),
+        mimetype='text/plain'
+    ), 200
+
+@admin_bp.route("/profiling", methods=["DELETE"])
+def profiling_reset():
+    """Discard all collected profiling data
+    ---
+    tags:
+      - admin
+    responses:
+      204:
+        description: Profiling data cleared
+    """
+    get_profiling_middleware_instance().reset()
+    return '', 204
+
+@admin_bp.route("/cache", methods=["GET"])
+def cache_stats():
+    """Get hit-rate metrics of the todo listing cache
+    ---
+    tags:
+      - admin
+    responses:
+      200:
+        description: Cache size, hits, misses, hit rate, evictions and invalidations, plus the number of coalesced misses
+    """
+    service = TodoService.get_instance()
+    stats = service.listing_cache.stats()
+    stats["coalescing"] = service.listing_flights.stats()
+    return jsonify(stats), 200
+
+@admin_bp.route("/access-log", methods=["GET"])
+def access_log_stats():
+    """Get the access log writer's queue and drop counters
+    ---
+    tags:
+      - admin
+    responses:
+      200:
+        description: Whether access logging is enabled, the log path, queued, written and dropped records, batches and write errors
+    """
+    return jsonify(get_access_log_instance().stats()), 200
+
+@admin_bp.route("/jwt/keys", methods=["GET"])
+def jwt_keys():
+    """List the keys accepted for JWT access tokens
+    ---
+    tags:
+      - admin
+    responses:
+      200:
+        description: Key ids, algorithms, which key signs new tokens and when retired keys stop verifying
+      400:
+        description: JWT authentication is not configured
+    """
+    return get_jwt_keys()
+
+@admin_bp.route("/jwt/rotate", methods=["POST"])
+def jwt_rotate():
+    """Start signing access tokens with a new key
+    ---
+    tags:
+      - admin
+    parameters:
+      - name: body
+        in: body
+        required: false
+        schema:
+          type: object
+          properties:
+            algorithm:
+              type: string
+              enum: [HS256, RS256, EdDSA]
+              description: Algorithm of the new key (RS256 and EdDSA need the cryptography package). Defaults to the current one
+    responses:
+      200:
+        description: New key id and the keys now accepted; tokens signed with the previous key remain valid during the overlap window
+      400:
+        description: JWT authentication is not configured or the algorithm is unsupported
+    """
+    data = request.get_json(silent=True) or {}
+    return rotate_jwt_key(data.get("algorithm"))
+
+@admin_bp.route("/config", methods=["GET"])
+def config_snapshot():
+    """Get the configuration currently in effect (without secrets)
+    ---
+    tags:
+      - admin
+    responses:
+      200:
+        description: Snapshot version, authentication method and settings
+    """
+    return jsonify(get_config_store().get().to_dict()), 200
+
+@admin_bp.route("/config/reload", methods=["POST"])
+def config_reload():
+    """Reload auth_config.yml now instead of waiting for the file watcher
+    ---
+    tags:
+      - admin
+    responses:
+      200:
+        description: The configuration in effect after the reload
+      400:
+        description: The file is invalid; the previous configuration stays in effect
+    """
+    snapshot, error = get_config_store().reload(force=True)
+    if error:
+        return error_response("invalid_config", f"Invalid configuration: {error}")
+    return jsonify(snapshot.to_dict()), 200
@@ -1,26 +1,21 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify
 from config.auth_config import AuthMethod, AuthConfig
-from middleware.auth_middleware import reset_auth_middleware
+from config.config_store import get_config_store, current_config
 from services.auth_service import (
     signup_user,
-    validate_refresh_token,
-    generate_jwt_token,
-    refresh_tokens,
+    refresh_jwt,
     login_jwt,
     login_session,
     logout_jwt,
     logout_session,
+    logout_all_sessions,
+    logout_all_jwt,
     reset_users,
-    reset_auth_service,
 )
+from services.job_queue import wants_async, submit_job
+from utils.errors import error_response
 
-# --- Configuration ---
 auth_bp = Blueprint("auth", __name__)  # Flask blueprint for auth routes
-auth_config = None  # Global configuration object set during initialization
-
-def init_auth_routes(config: AuthConfig):
-    global auth_config
-    auth_config = config
 
 # --- Authentication Routes ---
 @auth_bp.route("/signup", methods=["POST"])
@@ -29,8 +24,8 @@ def signup():
     Register a new user
     Expects JSON: {"username": "user", "password": "pass"}
     """
-    if auth_config.auth_method == AuthMethod.API_KEY:
-        return jsonify({"error": "Signup not available with API key authentication"}), 400
+    if current_config().auth.auth_method == AuthMethod.API_KEY:
+        return error_response("auth_method_unsupported", "Signup not available with API key authentication")
 
     data = request.get_json()
     return signup_user(data)
@@ -41,17 +36,18 @@ def login():
     Authenticate user and return tokens (JWT) or create session
     Expects JSON: {"username": "user", "password": "pass"}
     """
-    if auth_config.auth_method == AuthMethod.API_KEY:
-        return jsonify({"error": "Login not available with API key authentication"}), 400
+    auth_method = current_config().auth.auth_method
+    if auth_method == AuthMethod.API_KEY:
+        return error_response("auth_method_unsupported", "Login not available with API key authentication")
 
     data = request.get_json()
     if not data or "username" not in data or "password" not in data:
-        return jsonify({"error": "Username and password are required"}), 400
+        return error_response("credentials_required")
 
     username = data["username"]
     password = data["password"]
 
-    if auth_config.auth_method == AuthMethod.JWT:
+    if auth_method == AuthMethod.JWT:
         return login_jwt(username, password)
 
     return login_session(username, password)
@@ -63,49 +59,58 @@ def logout():
     For JWT: Requires Authorization header with Bearer token and refresh_token in JSON body
     For Session: No additional requirements
     """
-    if auth_config.auth_method == AuthMethod.API_KEY:
-        return jsonify({"error": "Logout not available with API key authentication"}), 400
+    auth_method = current_config().auth.auth_method
+    if auth_method == AuthMethod.API_KEY:
+        return error_response("auth_method_unsupported", "Logout not available with API key authentication")
 
-    if auth_config.auth_method == AuthMethod.JWT:
+    if auth_method == AuthMethod.JWT:
         auth_header = request.headers.get('Authorization')
         if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({"error": "Access token is required in Authorization header"}), 401
+            return error_response("access_token_required")
         access_token = auth_header.split(' ')[1]
 
         if not request.is_json:
-            return jsonify({"error": "Request must be JSON"}), 415
+            return error_response("json_required")
 
         data = request.get_json()
         refresh_token = data.get("refresh_token")
         if not refresh_token:
-            return jsonify({"error": "Refresh token is required in request body"}), 400
+            return error_response("refresh_token_required")
 
         return logout_jwt(access_token, refresh_token)
 
     return logout_session()
 
+@auth_bp.route("/logout-all", methods=["POST"])
+def logout_all():
+    """
+    End all sessions of the current user, on every device
+    For JWT: Requires Authorization header with Bearer token; revokes all refresh tokens of the user
+    For Session: Revokes all sessions of the user
+    Returns: Number of sessions or refresh tokens revoked
+    """
+    auth_method = current_config().auth.auth_method
+    if auth_method not in (AuthMethod.JWT, AuthMethod.SESSION):
+        return error_response("auth_method_unsupported", "Logout of all sessions is only available with JWT or session authentication")
+
+    if auth_method == AuthMethod.JWT:
+        auth_header = request.headers.get('Authorization')
+        if not auth_header or not auth_header.startswith('Bearer '):
+            return error_response("access_token_required")
+        return logout_all_jwt(auth_header.split(' ')[1])
+
+    return logout_all_sessions()
+
 @auth_bp.route("/refresh", methods=["POST"])
 def refresh_token():
     """
     Get new access token using refresh token
     Expects JSON: {"refresh_token": "token"}
-    Returns: New access token and refresh token pair
+    Returns: New access token and refresh token pair. The old refresh token
+    is used up; presenting it again revokes all tokens from the same login.
     """
-    data = request.get_json()
-    refresh_token = data.get("refresh_token")
-    username = validate_refresh_token(refresh_token)
-    if not username:
-        return jsonify({"error": "Invalid refresh token"}), 401
-
-    access_token, new_refresh_token = generate_jwt_token(username)
-
-    if refresh_token in refresh_tokens:
-        del refresh_tokens[refresh_token]
-
-    return jsonify({
-        "access_token": access_token,
-        "refresh_token": new_refresh_token
-    }), 200
+    data = request.get_json(silent=True) or {}
+    return refresh_jwt(data.get("refresh_token"))
 
 @auth_bp.route("/reset", methods=["POST"])
 def reset_config():
@@ -118,7 +123,9 @@ def reset_config():
     description: |
       Updates the authentication configuration without restarting the server or
       modifying the original auth_config.yml file. All existing tokens and sessions
-      are invalidated for security reasons.
+      are invalidated for security reasons, except that a new JWT secret rotates the
+      signing key and keeps existing tokens valid. The override stays in effect
+      until the auth section of auth_config.yml is edited.
     parameters:
       - in: body
         name: config
@@ -195,38 +202,31 @@ def reset_config():
     """
 
     if not request.is_json:
-        return jsonify({"error": "Request must be JSON"}), 415
+        return error_response("json_required")
 
     try:
         new_config = request.get_json()
 
         # Validate configuration format
         if not isinstance(new_config, dict) or 'auth' not in new_config:
-            return jsonify({
-                "error": "Invalid configuration format. Expected: {'auth': {'method': '...', ...}}"
-            }), 400
-
-        # Update the global auth configuration
-        auth_config.update_from_dict(new_config)
+            return error_response("invalid_config", "Invalid configuration format. Expected: {'auth': {'method': '...', ...}}")
 
-        # Update the Flask app configuration
-        current_app.config['auth_config'] = auth_config
+        # Build a new configuration rather than modifying the one in use
+        new_auth_config = AuthConfig()
+        new_auth_config.update_from_dict(new_config)
 
-        # Reset auth service with new configuration
-        reset_auth_service(auth_config)
-
-        # Reset auth middleware with new configuration
-        reset_auth_middleware(auth_config)
+        # Publish it; the app, auth service, middleware and routes switch over together
+        get_config_store().publish(auth=new_auth_config)
 
         return jsonify({
             "message": "Authentication configuration updated successfully",
-            "new_config": auth_config.to_dict()
+            "new_config": new_auth_config.to_dict()
         }), 200
 
     except ValueError as e:
-        return jsonify({"error": str(e)}), 400
+        return error_response("invalid_config", str(e))
     except Exception as e:
-        return jsonify({"error": f"Failed to update configuration: {str(e)}"}), 500
+        return error_response("config_update_failed", f"Failed to update configuration: {str(e)}")
 
 @auth_bp.route("/reset-users", methods=["POST"])
 def reset_users_endpoint():
@@ -238,7 +238,8 @@ def reset_users_endpoint():
     description: |
       Replaces all existing users with data from an uploaded JSON file.
       The original initial_users.json file remains unchanged.
-      All existing authentication tokens and sessions are cleared for security.
+      Refresh tokens and sessions of users that are removed or whose password
+      changes are revoked for security.
 
       The uploaded file should be in the same format as initial_users.json:
       {
@@ -257,6 +258,11 @@ def reset_users_endpoint():
         type: file
         required: true
         description: JSON file containing users data
+      - name: async
+        in: query
+        type: boolean
+        required: false
+        description: Run the reset (passwords are hashed in parallel) as a background job and return 202 with the job to poll at /jobs/{job_id}
     responses:
       200:
         description: Users reset successfully
@@ -277,6 +283,8 @@ def reset_users_endpoint():
             filename:
               type: string
               example: "my_users.json"
+      202:
+        description: Reset queued as a job; poll the URL in the Location header for its progress and result
       400:
         description: Invalid file format or data
         schema:
@@ -297,34 +305,42 @@ def reset_users_endpoint():
 
     # Check if file was uploaded
     if 'file' not in request.files:
-        return jsonify({"error": "No file provided. Please upload a JSON file."}), 400
+        return error_response("file_required")
 
     file = request.files['file']
 
     # Check if file was actually selected
     if file.filename == '':
-        return jsonify({"error": "No file selected. Please select a JSON file."}), 400
+        return error_response("file_not_selected")
 
     # Check file extension
     if not file.filename.lower().endswith('.json'):
-        return jsonify({"error": "Invalid file type. Please upload a JSON file."}), 400
+        return error_response("invalid_file_type")
 
     try:
         # Read file content
         file_content = file.read().decode('utf-8')
+    except UnicodeDecodeError:
+        return error_response("invalid_file_encoding")
+    except Exception as e:
+        return error_response("file_processing_failed", f"Failed to process file: {str(e)}")
+
+    if wants_async():
+        return submit_job("users_reset", None, _reset_users_from_file, file_content, file.filename)
+    return _reset_users_from_file(file_content, file.filename)
 
-        # Reset users with file content
+def _reset_users_from_file(file_content, filename):
+    """Reset users with the content of an uploaded file, naming the file in the response"""
+    try:
         response, status_code = reset_users(file_content)
 
         # Add filename to successful response
         if status_code == 200:
             response_data = response.get_json()
-            response_data['filename'] = file.filename
+            response_data['filename'] = filename
             return jsonify(response_data), status_code
 
         return response, status_code
 
-    except UnicodeDecodeError:
-        return jsonify({"error": "Invalid file encoding. Please ensure the file is UTF-8 encoded."}), 400
     except Exception as e:
-        return jsonify({"error": f"Failed to process file: {str(e)}"}), 500
+        return error_response("file_processing_failed", f"Failed to process file: {str(e)}")
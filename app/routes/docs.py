@@ -1,6 +1,7 @@
 import os
 from flask import Blueprint, current_app, json, Response
 from config.auth_config import AuthMethod
+from utils.json_provider import wants_pretty
 
 docs_bp = Blueprint("docs", __name__)
 
@@ -31,7 +32,7 @@ def api_docs():
         docs["authentication"] = auth_docs
     
     return Response(
-        json.dumps(docs, sort_keys=False, indent=2) + "\n",
+        json.dumps(docs, sort_keys=False, indent=2 if wants_pretty() else None) + "\n",
         mimetype='application/json'
     ), 200
 
@@ -1,24 +1,30 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, request
+from werkzeug.exceptions import NotFound
+from utils.errors import error_response
+from utils.json_provider import encode, wants_pretty
 
 errors_bp = Blueprint("errors", __name__)
 
+# The default 404 body with the request path spliced in, so unknown URLs
+# (e.g. from scanners) cost one small string encode
+_NOT_FOUND_PREFIX = b'{"code":"not_found","endpoint":'
+_NOT_FOUND_SUFFIX = b',"error":' + encode(str(NotFound())) + b'}\n'
+
 @errors_bp.app_errorhandler(404)
 def handle_not_found_error(error):
-    return jsonify({
-        "error": str(error),
-        "endpoint": request.path
-    }), 404
+    if error.description == NotFound.description and not wants_pretty():
+        body = _NOT_FOUND_PREFIX + encode(request.path) + _NOT_FOUND_SUFFIX
+        return Response(body, status=404, mimetype="application/json")
+    return error_response("not_found", str(error), endpoint=request.path)
 
 @errors_bp.app_errorhandler(400)
 def handle_bad_request_error(error):
-    return jsonify({
-        "error": str(error),
-        "endpoint": request.path
-    }), 400
+    return error_response("bad_request", str(error), endpoint=request.path)
+
+@errors_bp.app_errorhandler(413)
+def handle_request_too_large_error(error):
+    return error_response("request_too_large", str(error), endpoint=request.path)
 
 @errors_bp.app_errorhandler(500)
 def handle_internal_server_error(error):
-    return jsonify({
-        "error": str(error),
-        "endpoint": request.path
-    }), 500
+    return error_response("internal_error", str(error), endpoint=request.path)
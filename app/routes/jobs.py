@@ -0,0 +1,29 @@
+from flask import Blueprint, jsonify
+from services.job_queue import get_job_queue_instance
+from utils.auth import get_current_identity
+from utils.errors import error_response
+
+jobs_bp = Blueprint("jobs", __name__)
+
+@jobs_bp.route("/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Get the progress and result of a background job
+    ---
+    tags:
+      - jobs
+    parameters:
+      - name: job_id
+        in: path
+        type: string
+        required: true
+        description: Job id returned by a request sent with ?async=1
+    responses:
+      200:
+        description: Job status (queued, running, succeeded or failed), progress from 0 to 1 and, once finished, the status and body the request would have returned
+      404:
+        description: Job not found, expired or submitted by another user
+    """
+    job = get_job_queue_instance().get(job_id)
+    if job is None or job.owner not in (None, get_current_identity()):
+        return error_response("job_not_found")
+    return jsonify(job.to_dict()), 200
@@ -1,5 +1,6 @@
 from flask import Blueprint, request
 from services.note_service import NoteService
+from services.job_queue import wants_async
 
 notes_bp = Blueprint("notes", __name__)
 
@@ -15,6 +16,11 @@ def upload_note():
         type: file
         required: true
         description: Text file to upload. Must be .txt format, max size 1MB
+      - name: async
+        in: query
+        type: boolean
+        required: false
+        description: Write the note in a background job and return 202 with the job to poll at /jobs/{job_id}
     responses:
       201:
         description: Note created successfully
@@ -27,10 +33,12 @@ def upload_note():
             note_name:
               type: string
               description: Name of the uploaded note
+      202:
+        description: Note validated and queued to be written; poll the URL in the Location header
       400:
         description: Invalid request - empty file or wrong format
     """
-    return NoteService.upload_note(request)
+    return NoteService.upload_note(request, background=wants_async())
 
 @notes_bp.route("/<note_name>", methods=["GET"])
 def download_note(note_name):
@@ -44,18 +52,66 @@ def download_note(note_name):
         type: string
         required: true
         description: Name of the note to download
+      - name: lines
+        in: query
+        type: string
+        required: false
+        description: Only return these lines, as a 1-based inclusive range (e.g. 10-20, 5 or 100-)
+      - name: head
+        in: query
+        type: integer
+        required: false
+        description: Only return the first N lines
     responses:
       200:
-        description: Note file content
+        description: Note file content, or the requested lines with X-Total-Lines and X-Lines headers
         content:
           text/plain:
             schema:
               type: string
+      400:
+        description: Invalid line range
       404:
         description: Note not found
     """
+    if 'lines' in request.args or 'head' in request.args:
+        return NoteService.read_note_lines(note_name, request.args)
     return NoteService.download_note(note_name)
 
+@notes_bp.route("/<note_name>/meta", methods=["GET"])
+def get_note_metadata(note_name):
+    """Get the size and line count of a note without downloading it
+    ---
+    tags:
+      - notes
+    parameters:
+      - name: note_name
+        in: path
+        type: string
+        required: true
+        description: Name of the note
+    responses:
+      200:
+        description: Note metadata
+        schema:
+          type: object
+          properties:
+            note_name:
+              type: string
+            size:
+              type: integer
+              description: Size in bytes
+            lines:
+              type: integer
+              description: Number of lines
+            modified_at:
+              type: number
+              description: Time of the last upload (Unix timestamp)
+      404:
+        description: Note not found
+    """
+    return NoteService.get_note_metadata(note_name)
+
 @notes_bp.route("/<note_name>", methods=["DELETE"])
 def delete_note(note_name):
     """Delete an existing note by its name
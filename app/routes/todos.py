@@ -1,11 +1,15 @@
 from flask import Blueprint, request, jsonify
 from services.todo_service import TodoService
+from middleware.idempotency import idempotent
+from services.job_queue import wants_async, submit_job
+from utils.auth import get_current_identity
+from utils.errors import error_response
 
 todos_bp = Blueprint("todos", __name__)
 
 @todos_bp.route("", methods=["GET"])
 def get_all_todos():
-    """Get all todos with optional filtering and pagination
+    """Get all todos with optional filtering, sorting, projection and pagination
     ---
     tags:
       - todos
@@ -20,6 +24,46 @@ def get_all_todos():
         type: string
         required: false
         description: Filter by TODO item title prefix
+      - name: sort
+        in: query
+        type: string
+        required: false
+        description: Order by id, title, done, created_at or updated_at (prefix with '-' for descending). Defaults to creation order
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Comma-separated fields to return (id, title, done, description, created_at, updated_at, tags)
+      - name: created_since
+        in: query
+        type: string
+        required: false
+        description: Only todos created at or after this time (Unix timestamp or ISO 8601 date)
+      - name: created_before
+        in: query
+        type: string
+        required: false
+        description: Only todos created before this time (Unix timestamp or ISO 8601 date)
+      - name: updated_since
+        in: query
+        type: string
+        required: false
+        description: Only todos updated at or after this time, for incremental sync (Unix timestamp or ISO 8601 date)
+      - name: updated_before
+        in: query
+        type: string
+        required: false
+        description: Only todos updated before this time (Unix timestamp or ISO 8601 date)
+      - name: tags
+        in: query
+        type: string
+        required: false
+        description: Comma-separated tags; only todos with all of them
+      - name: any_tags
+        in: query
+        type: string
+        required: false
+        description: Comma-separated tags; only todos with at least one of them
       - name: page
         in: query
         type: integer
@@ -32,7 +76,7 @@ def get_all_todos():
         description: Number of items per page
     responses:
       200:
-        description: List of todo items
+        description: List of todo items. Paginated responses carry the number of matching todos in the X-Total-Count header
         schema:
           type: array
           items:
@@ -50,6 +94,17 @@ def get_all_todos():
               description:
                 type: string
                 description: Detailed todo description
+              created_at:
+                type: number
+                description: Creation time (Unix timestamp)
+              updated_at:
+                type: number
+                description: Time of the last change (Unix timestamp)
+              tags:
+                type: array
+                items:
+                  type: string
+                description: The todo tags
     """
     return TodoService.get_all_todos(request)
 
@@ -83,18 +138,35 @@ def get_todo(todo_id):
             description:
               type: string
               description: Detailed todo description
+            created_at:
+              type: number
+              description: Creation time (Unix timestamp)
+            updated_at:
+              type: number
+              description: Time of the last change (Unix timestamp)
+            tags:
+              type: array
+              items:
+                type: string
+              description: The todo tags
       404:
         description: Todo not found
     """
     return TodoService.get_todo(todo_id)
 
 @todos_bp.route("", methods=["POST"])
+@idempotent
 def add_todo():
     """Add a new TODO item
     ---
     tags:
       - todos
     parameters:
+      - name: Idempotency-Key
+        in: header
+        type: string
+        required: false
+        description: Unique key that makes retries of this request safe; repeats replay the original response
       - name: body
         in: body
         required: true
@@ -112,6 +184,11 @@ def add_todo():
             description:
               type: string
               description: Detailed TODO item description
+            tags:
+              type: array
+              items:
+                type: string
+              description: Tags (up to 20, each 1-50 characters without commas). Defaults to none
     responses:
       201:
         description: Created todo item
@@ -130,8 +207,23 @@ def add_todo():
             description:
               type: string
               description: Detailed todo description
+            created_at:
+              type: number
+              description: Creation time (Unix timestamp)
+            updated_at:
+              type: number
+              description: Time of the last change (Unix timestamp)
+            tags:
+              type: array
+              items:
+                type: string
+              description: The todo tags
       400:
-        description: Invalid request - missing title
+        description: Invalid request - missing title, non-boolean done or invalid tags
+      409:
+        description: A request with the same Idempotency-Key is still being processed
+      422:
+        description: The Idempotency-Key was already used with a different request
     """
     return TodoService.add_todo(request)
 
@@ -166,6 +258,11 @@ def edit_todo(todo_id):
             description:
               type: string
               description: Detailed TODO item description
+            tags:
+              type: array
+              items:
+                type: string
+              description: Tags. The current tags are kept if omitted
     responses:
       200:
         description: Updated todo item
@@ -180,8 +277,12 @@ def edit_todo(todo_id):
               type: boolean
             description:
               type: string
+            tags:
+              type: array
+              items:
+                type: string
       400:
-        description: Invalid request (missing required fields)
+        description: Invalid request (missing required fields, non-boolean done or invalid tags)
       404:
         description: Todo not found
     """
@@ -214,6 +315,11 @@ def patch_todo(todo_id):
             description:
               type: string
               description: Detailed TODO item description
+            tags:
+              type: array
+              items:
+                type: string
+              description: Tags, replacing the current ones
     responses:
       200:
         description: Updated todo item
@@ -228,8 +334,12 @@ def patch_todo(todo_id):
               type: boolean
             description:
               type: string
+            tags:
+              type: array
+              items:
+                type: string
       400:
-        description: Invalid request (empty body)
+        description: Invalid request (empty body, non-boolean done or invalid tags)
       404:
         description: Todo not found
     """
@@ -255,7 +365,125 @@ def delete_todo(todo_id):
     """
     return TodoService.delete_todo(todo_id)
 
+@todos_bp.route("/stats", methods=["GET"])
+def get_stats():
+    """Get todo counts without downloading the list
+    ---
+    tags:
+      - todos
+    parameters:
+      - name: prefix
+        in: query
+        type: array
+        items:
+          type: string
+        collectionFormat: multi
+        required: false
+        description: Title prefixes to count (case-insensitive, repeatable)
+      - name: tag
+        in: query
+        type: array
+        items:
+          type: string
+        collectionFormat: multi
+        required: false
+        description: Tags to count (repeatable)
+    responses:
+      200:
+        description: Todo counts
+        schema:
+          type: object
+          properties:
+            total:
+              type: integer
+            done:
+              type: integer
+            pending:
+              type: integer
+            prefixes:
+              type: object
+              description: Total, done and pending counts per requested prefix
+            tags:
+              type: object
+              description: Total, done and pending counts per requested tag
+    """
+    return TodoService.get_stats(request)
+
+@todos_bp.route("/changes", methods=["GET"])
+def get_changes():
+    """Long-poll for changes to the todo list
+    ---
+    tags:
+      - todos
+    description: |
+      Returns the creates, updates, deletes and resets recorded after the
+      sequence number `since`, waiting up to `timeout` seconds for the next
+      change when there is none yet. Call without `since` to get the current
+      `last_seq`, then pass the returned `last_seq` on the next call.
+      When too many clients are already waiting, the response comes back
+      immediately with a Retry-After header instead of waiting.
+    parameters:
+      - name: since
+        in: query
+        type: integer
+        required: false
+        description: Last sequence number the client has seen
+      - name: timeout
+        in: query
+        type: number
+        required: false
+        description: Seconds to wait for a change (default 25, max 60)
+    responses:
+      200:
+        description: Changes after `since`, oldest first
+        schema:
+          type: object
+          properties:
+            changes:
+              type: array
+              items:
+                type: object
+                properties:
+                  seq:
+                    type: integer
+                  op:
+                    type: string
+                    enum: [create, update, delete, reset]
+                  id:
+                    type: integer
+                  todo:
+                    type: object
+            last_seq:
+              type: integer
+      410:
+        description: The requested changes are no longer retained; re-fetch /todos and continue from last_seq
+    """
+    return TodoService.get_changes(request)
+
+@todos_bp.route("/changes/stream", methods=["GET"])
+def stream_changes():
+    """Stream changes to the todo list as Server-Sent Events
+    ---
+    tags:
+      - todos
+    produces:
+      - text/event-stream
+    parameters:
+      - name: since
+        in: query
+        type: integer
+        required: false
+        description: Sequence number to start after (defaults to the Last-Event-ID header, then to now)
+    responses:
+      200:
+        description: Event stream with one event per change; a 'reset' event means the client must re-fetch /todos
+      503:
+        description: Too many clients are waiting for changes; retry later
+    """
+    return TodoService.stream_changes(request)
+
 @todos_bp.route("/reset", methods=["POST"])
+@idempotent
 def reset_todos():
     """Reset todos with data from uploaded JSON file
     ---
@@ -281,11 +509,21 @@ def reset_todos():
     consumes:
       - multipart/form-data
     parameters:
+      - name: Idempotency-Key
+        in: header
+        type: string
+        required: false
+        description: Unique key that makes retries of this request safe; repeats replay the original response
       - in: formData
         name: file
         type: file
         required: true
         description: JSON file containing todos data
+      - name: async
+        in: query
+        type: boolean
+        required: false
+        description: Run the reset as a background job and return 202 with the job to poll at /jobs/{job_id}
     responses:
       200:
         description: Todos reset successfully
@@ -304,6 +542,8 @@ def reset_todos():
             filename:
               type: string
               example: "my_todos.json"
+      202:
+        description: Reset queued as a job; poll the URL in the Location header for its progress and result
       400:
         description: Invalid file format or data
         schema:
@@ -312,6 +552,10 @@ def reset_todos():
             error:
               type: string
               example: "Invalid JSON format: Expecting ',' delimiter"
+      409:
+        description: A request with the same Idempotency-Key is still being processed
+      422:
+        description: The Idempotency-Key was already used with a different request
       415:
         description: No file provided
         schema:
@@ -324,34 +568,42 @@ def reset_todos():
 
     # Check if file was uploaded
     if 'file' not in request.files:
-        return jsonify({"error": "No file provided. Please upload a JSON file."}), 400
+        return error_response("file_required")
 
     file = request.files['file']
 
     # Check if file was actually selected
     if file.filename == '':
-        return jsonify({"error": "No file selected. Please select a JSON file."}), 400
+        return error_response("file_not_selected")
 
     # Check file extension
     if not file.filename.lower().endswith('.json'):
-        return jsonify({"error": "Invalid file type. Please upload a JSON file."}), 400
+        return error_response("invalid_file_type")
 
     try:
         # Read file content
         file_content = file.read().decode('utf-8')
+    except UnicodeDecodeError:
+        return error_response("invalid_file_encoding")
+    except Exception as e:
+        return error_response("file_processing_failed", f"Failed to process file: {str(e)}")
+
+    if wants_async():
+        return submit_job("todos_reset", get_current_identity(), _reset_todos_from_file, file_content, file.filename)
+    return _reset_todos_from_file(file_content, file.filename)
 
-        # Reset todos with file content
+def _reset_todos_from_file(file_content, filename):
+    """Reset todos with the content of an uploaded file, naming the file in the response"""
+    try:
         response, status_code = TodoService.reset_todos(file_content)
 
         # Add filename to successful response
         if status_code == 200:
             response_data = response.get_json()
-            response_data['filename'] = file.filename
+            response_data['filename'] = filename
             return jsonify(response_data), status_code
 
         return response, status_code
 
-    except UnicodeDecodeError:
-        return jsonify({"error": "Invalid file encoding. Please ensure the file is UTF-8 encoded."}), 400
     except Exception as e:
-        return jsonify({"error": f"Failed to process file: {str(e)}"}), 500
+        return error_response("file_processing_failed", f"Failed to process file: {str(e)}")
@@ -1,23 +1,93 @@
 import jwt
 import json
 import datetime
-import secrets
-from config.auth_config import AuthConfig
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config.auth_config import AuthMethod
+from config.config_store import current_config
 from models.user import User
-from flask import session, jsonify, request
+from services.session_store import SessionStore
+from services.refresh_token_store import RefreshTokenStore, RefreshTokenReused
+from services.jwt_keyring import JWTKeyring
+from services.job_queue import report_progress
+from flask import session, jsonify
+from utils.errors import error_response
 
 # --- Configuration ---
-auth_config = None  # Global configuration object set during initialization
+# The configuration itself is read per request with current_config(). The JWT
+# keyring is state derived from it, synced to each newer snapshot.
+jwt_keyring = None  # Signing and verification keys while JWT authentication is configured
+_keyring_version = -1  # Version of the config snapshot the keyring was last synced to
+_keyring_source = None  # (secret, algorithm) configured in that snapshot
+_keyring_lock = threading.Lock()
 
-def init_auth_service(config: AuthConfig):
-    global auth_config
-    auth_config = config
+def apply_auth_settings(settings):
+    """Apply reloaded settings to the session and refresh token stores.
+
+    New TTLs apply to sessions and tokens created from now on.
+    """
+    session_store.ttl = settings.get('sessions', {}).get('ttl_seconds', 86400)
+    refresh_token_store.ttl = settings.get('refresh_tokens', {}).get('ttl_seconds', 30 * 24 * 3600)
+
+def sync_jwt_keyring(snapshot):
+    """Bring the JWT keyring in line with a configuration snapshot newer than the last one synced.
+
+    JWT authentication gets a keyring signing with the configured secret (or
+    a key pair for the configured RS256/EdDSA algorithm); a new secret or
+    algorithm rotates to a new key, keeping the previous one for the overlap
+    window. Other methods have no keyring. Older snapshots, still used by
+    requests that started before a reload, leave the keyring unchanged.
+
+    Raises:
+        ValueError: If the configured algorithm is unsupported
+    """
+    global jwt_keyring, _keyring_version, _keyring_source
+    with _keyring_lock:
+        if snapshot.version <= _keyring_version:
+            return
+        auth = snapshot.auth
+        jwt_settings = snapshot.settings.get('jwt', {})
+        algorithm = jwt_settings.get('algorithm', 'HS256')
+        overlap = jwt_settings.get('rotation_overlap_seconds', 900)
+        if auth.auth_method != AuthMethod.JWT:
+            jwt_keyring = None
+        elif jwt_keyring is None:
+            jwt_keyring = JWTKeyring(auth.jwt_secret, algorithm, overlap)
+        else:
+            jwt_keyring.overlap = overlap
+            if (auth.jwt_secret, algorithm) != _keyring_source:
+                key = jwt_keyring.rotate(algorithm, auth.jwt_secret)
+                print(f"Auth service rotated to JWT signing key {key.kid}")
+        _keyring_version = snapshot.version
+        _keyring_source = (auth.jwt_secret, algorithm)
+
+def get_jwt_keyring():
+    """Return the JWT keyring for the current request's configuration, or None without JWT authentication."""
+    snapshot = current_config()
+    if snapshot.auth.auth_method != AuthMethod.JWT:
+        return None
+    if snapshot.version > _keyring_version:
+        sync_jwt_keyring(snapshot)  # A request read a reload before its listeners ran
+    return jwt_keyring
 
 # --- Storage ---
 users = []  # In-memory storage for user objects
-refresh_tokens = {}  # Maps refresh tokens to usernames
+refresh_token_store = RefreshTokenStore()  # Refresh tokens with rotation and per-user index, replaced at startup
 blacklisted_tokens = set()  # Set of invalidated access tokens
-invalidated_sessions = set()  # Set of invalidated session IDs
+session_store = SessionStore()  # Server-side sessions, replaced by set_session_store() at startup
+# Password hashing releases the GIL, so bulk hashing runs on one thread per core
+password_hashing_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="password-hash")
+
+def set_refresh_token_store(store):
+    """Set the store of JWT refresh tokens."""
+    global refresh_token_store
+    refresh_token_store = store
+
+def set_session_store(store):
+    """Set the store backing session authentication (see middleware.session_interface)."""
+    global session_store
+    session_store = store
 
 # --- User Management ---
 def is_username_taken(username):
@@ -40,41 +110,84 @@ def validate_credentials(username, password):
 
 # --- Token Management ---
 def generate_refresh_token(username):
-    """Create and store a new refresh token for a user"""
-    refresh_token = secrets.token_hex(32)
-    refresh_tokens[refresh_token] = username
-    return refresh_token
-
-def validate_refresh_token(refresh_token):
-    """Check if refresh token is valid and return associated username"""
-    return refresh_tokens.get(refresh_token)
+    """Create and store a new refresh token for a user, starting a new token family"""
+    return refresh_token_store.issue(username)
 
 def blacklist_token(token):
     """Invalidate an access token"""
     blacklisted_tokens.add(token)
 
+def generate_access_token(username):
+    """Generate a new JWT access token, signed with the active key of the keyring"""
+    return get_jwt_keyring().sign({
+        "sub": username,
+        "iat": datetime.datetime.utcnow(),
+        "exp": datetime.datetime.utcnow() + datetime.timedelta(minutes=15)
+    })
+
+def verify_access_token(token):
+    """Verify a JWT access token and return its claims.
+
+    Raises:
+        jwt.InvalidTokenError: If the token is invalid or expired
+    """
+    keyring = get_jwt_keyring()
+    if keyring is None:
+        raise jwt.InvalidTokenError("JWT authentication is not configured")
+    return keyring.verify(token)
+
+def rotate_jwt_key(algorithm=None):
+    """Sign new access tokens with a new key; the previous key keeps verifying during the overlap window"""
+    keyring = get_jwt_keyring()
+    if keyring is None:
+        return error_response("auth_method_unsupported", "Key rotation is only available with JWT authentication")
+
+    try:
+        key = keyring.rotate(algorithm)
+    except ValueError as e:
+        return error_response("invalid_jwt_algorithm", str(e))
+    return jsonify({"message": "Signing key rotated", "kid": key.kid, "keys": keyring.describe()}), 200
+
+def get_jwt_keys():
+    """List the keys currently accepted for access tokens"""
+    keyring = get_jwt_keyring()
+    if keyring is None:
+        return error_response("jwt_not_configured")
+    return jsonify({"keys": keyring.describe()}), 200
+
 def generate_jwt_token(username):
     """Generate a new JWT access token and refresh token pair"""
-    access_token = jwt.encode(
-        {
-            "sub": username,
-            "iat": datetime.datetime.utcnow(),
-            "exp": datetime.datetime.utcnow() + datetime.timedelta(minutes=15)
-        },
-        auth_config.jwt_secret,
-        algorithm="HS256"
-    )
-    refresh_token = generate_refresh_token(username)
-    return access_token, refresh_token
+    return generate_access_token(username), generate_refresh_token(username)
+
+def refresh_jwt(refresh_token):
+    """Rotate a refresh token and issue a new access token.
+
+    The presented refresh token is used up. Presenting it again revokes every
+    refresh token issued since the login it came from.
+    """
+    if not refresh_token:
+        return error_response("refresh_token_required")
+
+    try:
+        username, new_refresh_token = refresh_token_store.rotate(refresh_token)
+    except RefreshTokenReused:
+        return error_response("refresh_token_reused")
+    if not username:
+        return error_response("invalid_refresh_token")
+
+    return jsonify({
+        "access_token": generate_access_token(username),
+        "refresh_token": new_refresh_token
+    }), 200
 
 # --- Authentication Operations ---
 def signup_user(data):
     """Register a new user with username and password"""
     if not data or "username" not in data or "password" not in data:
-        return jsonify({"error": "Username and password are required"}), 400
+        return error_response("credentials_required")
 
     if is_username_taken(data["username"]):
-        return jsonify({"error": "Username already exists"}), 400
+        return error_response("username_taken")
 
     add_user(data["username"], data["password"])
     return jsonify({"message": "Signup successful. Please log in to continue."}), 201
@@ -83,7 +196,7 @@ def login_jwt(username, password):
     """Authenticate user and return JWT tokens if valid"""
     user = validate_credentials(username, password)
     if not user:
-        return jsonify({"error": "Invalid username or password"}), 401
+        return error_response("invalid_credentials")
 
     access_token, refresh_token = generate_jwt_token(username)
     return jsonify({
@@ -96,8 +209,9 @@ def login_session(username, password):
     """Authenticate user and create session if valid"""
     user = validate_credentials(username, password)
     if not user:
-        return jsonify({"error": "Invalid username or password"}), 401
+        return error_response("invalid_credentials")
 
+    session.regenerate()  # Never reuse a session id from before the login
     session["authenticated"] = True
     session["username"] = username
     return jsonify({"message": "Login successful"})
@@ -105,51 +219,74 @@ def login_session(username, password):
 def logout_jwt(access_token, refresh_token):
     """Invalidate JWT access and refresh tokens"""
     if not access_token or not refresh_token:
-        return jsonify({"error": "Both access token and refresh token are required"}), 400
+        return error_response("tokens_required")
 
     blacklist_token(access_token)
-    if refresh_token in refresh_tokens:
-        del refresh_tokens[refresh_token]
+    refresh_token_store.revoke(refresh_token)
 
     return jsonify({"message": "Logout successful"})
 
 def logout_session():
     """Clear user session if authenticated and invalidate the session cookie"""
     if not session.get("authenticated"):
-        return jsonify({"error": "Not authenticated"}), 401
+        return error_response("not_authenticated")
 
-    response = jsonify({"message": "Logout successful"})
+    # Clearing the session deletes it from the session store and expires the cookie
+    session.clear()
+    return jsonify({"message": "Logout successful"})
 
-    # Add current session ID to invalidated sessions set
-    if request.cookies.get('session'):
-        invalidated_sessions.add(request.cookies.get('session'))
+def logout_all_sessions():
+    """Revoke every session of the current user, on all devices"""
+    if not session.get("authenticated"):
+        return error_response("not_authenticated")
 
+    revoked = session_store.delete_user(session.get("username"))
     session.clear()
-    # Set the session cookie to expire immediately
-    response.set_cookie('session', '', expires=0)
-    return response
+    return jsonify({"message": "Logged out of all sessions", "sessions_revoked": revoked})
+
+def logout_all_jwt(access_token):
+    """Revoke every refresh token of the user owning the access token"""
+    try:
+        payload = verify_access_token(access_token)
+    except jwt.InvalidTokenError as e:
+        return error_response("invalid_token", f"Invalid JWT token: {str(e)}")
+
+    blacklist_token(access_token)
+    revoked = refresh_token_store.revoke_user(payload.get("sub"))
+    return jsonify({"message": "Logged out of all sessions", "refresh_tokens_revoked": revoked})
 
-def reset_auth_service(new_config: AuthConfig):
-    """Reset the auth service with new configuration.
+def revoke_user_credentials(username):
+    """Revoke all refresh tokens and sessions of a user"""
+    refresh_token_store.revoke_user(username)
+    session_store.delete_user(username)
+
+def reset_auth_service(old_config, new_snapshot):
+    """Apply a new auth configuration to the auth service.
 
     This function:
-    1. Updates the global auth_config
-    2. Clears all existing tokens and sessions for security
-    3. Re-initializes the auth service
+    1. If JWT authentication stays enabled, rotates to the new secret and
+       keeps existing tokens: tokens signed with the previous key remain
+       valid during the keyring's overlap window
+    2. Otherwise clears all existing tokens and sessions for security and
+       syncs the keyring to the new method
 
     Args:
-        new_config: New AuthConfig instance
+        old_config (AuthConfig): The auth config being replaced
+        new_snapshot (ConfigSnapshot): The published snapshot
     """
-    global auth_config
-    auth_config = new_config
+    new_config = new_snapshot.auth
+    if old_config.auth_method == AuthMethod.JWT and new_config.auth_method == AuthMethod.JWT:
+        sync_jwt_keyring(new_snapshot)
+        return
 
     # Clear all existing authentication tokens and sessions for security
     # This ensures that after a config change, users need to re-authenticate
-    refresh_tokens.clear()
+    refresh_token_store.clear()
     blacklisted_tokens.clear()
-    invalidated_sessions.clear()
+    session_store.clear()
+    sync_jwt_keyring(new_snapshot)
 
-    print(f"Auth service reset with new configuration: {auth_config.auth_method.value}")
+    print(f"Auth service reset with new configuration: {new_config.auth_method.value}")
 
 def reset_users(file_content):
     """Reset users with new data from uploaded JSON file.
@@ -157,8 +294,10 @@ def reset_users(file_content):
     This method:
     1. Parses the JSON file content
     2. Validates the file format and user data
-    3. Clears all existing users and their tokens/sessions
-    4. Loads new users from the file data
+    3. Checks and hashes the passwords in parallel
+    4. Replaces the users, revoking the refresh tokens and sessions of
+       users that are removed or whose password changed
+    5. Keeps the tokens and sessions of unchanged users
 
     Args:
         file_content (str): JSON file content as string
@@ -173,54 +312,65 @@ def reset_users(file_content):
     try:
         data = json.loads(file_content)
     except json.JSONDecodeError as e:
-        return jsonify({"error": f"Invalid JSON format: {str(e)}"}), 400
+        return error_response("invalid_json", f"Invalid JSON format: {str(e)}")
 
     # Validate file structure - expect {"data": [...]} format (same as initial_users.json)
     if not isinstance(data, dict) or 'data' not in data:
-        return jsonify({"error": "Invalid file format. Expected JSON with 'data' array field."}), 400
+        return error_response("invalid_data", "Invalid file format. Expected JSON with 'data' array field.")
 
     new_users_data = data['data']
 
     # Validate the users data
     if not isinstance(new_users_data, list):
-        return jsonify({"error": "Invalid users format. Expected an array of user objects."}), 400
+        return error_response("invalid_data", "Invalid users format. Expected an array of user objects.")
 
     # Validate each user item
     for i, user_data in enumerate(new_users_data):
         if not isinstance(user_data, dict):
-            return jsonify({"error": f"Invalid user at index {i}. Expected an object."}), 400
+            return error_response("invalid_data", f"Invalid user at index {i}. Expected an object.")
 
         required_fields = ['username', 'password']
         for field in required_fields:
             if field not in user_data:
-                return jsonify({"error": f"Missing required field '{field}' in user at index {i}."}), 400
+                return error_response("invalid_data", f"Missing required field '{field}' in user at index {i}.")
 
         # Validate field types
         if not isinstance(user_data['username'], str):
-            return jsonify({"error": f"Invalid 'username' type in user at index {i}. Expected string."}), 400
+            return error_response("invalid_data", f"Invalid 'username' type in user at index {i}. Expected string.")
         if not isinstance(user_data['password'], str):
-            return jsonify({"error": f"Invalid 'password' type in user at index {i}. Expected string."}), 400
+            return error_response("invalid_data", f"Invalid 'password' type in user at index {i}. Expected string.")
 
         # Validate username is not empty
         if not user_data['username'].strip():
-            return jsonify({"error": f"Empty username in user at index {i}."}), 400
+            return error_response("invalid_data", f"Empty username in user at index {i}.")
         if not user_data['password'].strip():
-            return jsonify({"error": f"Empty password in user at index {i}."}), 400
+            return error_response("invalid_data", f"Empty password in user at index {i}.")
 
     # Check for duplicate usernames
     usernames = [user['username'] for user in new_users_data]
     if len(usernames) != len(set(usernames)):
-        return jsonify({"error": "Duplicate usernames found in the data."}), 400
-
-    # Clear existing users and all authentication data for security
-    users.clear()
-    refresh_tokens.clear()
-    blacklisted_tokens.clear()
-    invalidated_sessions.clear()
-
-    # Load new users
-    for user_data in new_users_data:
-        users.append(User(user_data['username'], user_data['password']))
+        return error_response("invalid_data", "Duplicate usernames found in the data.")
+
+    # Keep users whose credentials are unchanged; for security, users that are
+    # removed or get a new password lose their refresh tokens and sessions
+    existing_users = {user.username: user for user in users}
+
+    def load_user(user_data):
+        user = existing_users.get(user_data['username'])
+        if user is not None and user.check_password(user_data['password']):
+            return user
+        return User(user_data['username'], user_data['password'])
+
+    new_users = []
+    for i, user in enumerate(password_hashing_pool.map(load_user, new_users_data)):
+        existing = existing_users.pop(user.username, None)
+        if existing is not None and existing is not user:
+            revoke_user_credentials(user.username)
+        new_users.append(user)
+        report_progress(i + 1, len(new_users_data))
+    for username in existing_users:
+        revoke_user_credentials(username)
+    users[:] = new_users
 
     return jsonify({
         "message": f"Users reset successfully. Loaded {len(new_users_data)} users.",
@@ -0,0 +1,67 @@
+import json
+import threading
+from collections import deque
+
+class ChangeFeed:
+    """Bounded, sequence-numbered log of todo store changes.
+
+    Every create/update/delete/reset gets the next sequence number and is kept
+    in a ring buffer of `capacity` entries. Clients ask for the changes after
+    the last sequence number they saw; if those changes were already evicted
+    (or the number is from a previous server run) they must re-fetch the full
+    listing and continue from `last_seq`.
+    """
+
+    def __init__(self, capacity=1000):
+        self.entries = deque(maxlen=capacity)
+        self.last_seq = 0
+        self._condition = threading.Condition()
+        self._listeners = set()  # Callables notified (from the writer's thread) after each change
+
+    def record(self, op, todo_id=None, todo=None):
+        """Append a change and wake up every waiting client.
+
+        Args:
+            op (str): One of 'create', 'update', 'delete' or 'reset'
+            todo_id (int, optional): ID of the affected todo
+            todo (dict, optional): State of the todo after the change
+        """
+        with self._condition:
+            self.last_seq += 1
+            self.entries.append({"seq": self.last_seq, "op": op, "id": todo_id, "todo": todo})
+            self._condition.notify_all()
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener()
+
+    def changes_since(self, since):
+        """Return the changes after sequence number `since`.
+
+        Returns:
+            list: Change entries, or None if `since` is no longer (or not yet) covered
+        """
+        with self._condition:
+            if since > self.last_seq:
+                return None
+            first_seq = self.entries[0]["seq"] if self.entries else self.last_seq + 1
+            if since < first_seq - 1:
+                return None
+            return [entry for entry in self.entries if entry["seq"] > since]
+
+    def wait(self, since, timeout):
+        """Block until there is a change after `since` or `timeout` seconds pass."""
+        with self._condition:
+            return self._condition.wait_for(lambda: self.last_seq != since, timeout)
+
+    def add_listener(self, listener):
+        with self._condition:
+            self._listeners.add(listener)
+
+    def remove_listener(self, listener):
+        with self._condition:
+            self._listeners.discard(listener)
+
+    @staticmethod
+    def format_event(entry):
+        """Encode a change entry as a Server-Sent Event."""
+        return f"id: {entry['seq']}\nevent: {entry['op']}\ndata: {json.dumps(entry)}\n\n"
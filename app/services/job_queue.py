@@ -0,0 +1,223 @@
+import json
+import secrets
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import request, jsonify, g
+
+class Job:
+    """A background operation and, once it finished, its response."""
+
+    def __init__(self, job_id, kind, owner, status="queued", created_at=None):
+        self.id = job_id
+        self.kind = kind
+        self.owner = owner  # Identity that submitted the job
+        self.status = status  # queued, running, succeeded or failed
+        self.progress = 0.0
+        self.result = None  # {"status": HTTP status, "body": response body} of the operation
+        self.error = None
+        self.created_at = created_at or time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in ("succeeded", "failed")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+class JobQueue:
+    """Run heavy operations on a bounded thread pool and keep track of them.
+
+    Operations are view-like functions returning (response, status). They
+    run in an application context with the submitter's identity, so they can
+    use the same services as a request. Finished jobs are kept for
+    `retention_seconds` so clients can poll their result.
+    """
+
+    def __init__(self, app, workers=4, retention_seconds=86400):
+        self.app = app
+        self.retention = retention_seconds
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self.jobs = {}  # Maps job ids to Job objects, oldest first
+        self._lock = threading.Lock()
+
+    def submit(self, kind, owner, func, *args):
+        """Queue func(*args) as a job.
+
+        Args:
+            kind (str): Name of the operation, e.g. "todos_reset"
+            owner (str): Identity allowed to see the job, or None for anyone with its id
+            func: Function returning a (response, status) tuple
+
+        Returns:
+            Job: The queued job
+        """
+        job = Job(secrets.token_hex(16), kind, owner)
+        with self._lock:
+            self._expire(time.time())
+            self.jobs[job.id] = job
+            self._persist(job)
+        self.executor.submit(self._run, job, func, args)
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def _run(self, job, func, args):
+        self._update(job, status="running", started_at=time.time())
+        try:
+            with self.app.app_context():
+                g.identity = job.owner
+                g.job = job
+                response, status = func(*args)
+                result = {"status": status, "body": response.get_json()}
+            self._update(job, status="succeeded" if status < 400 else "failed",
+                         progress=1.0, result=result, finished_at=time.time())
+        except Exception as e:
+            print(f"Job {job.id} ({job.kind}) failed: {e}")
+            self._update(job, status="failed", error=str(e), finished_at=time.time())
+
+    def _update(self, job, **fields):
+        with self._lock:
+            for name, value in fields.items():
+                setattr(job, name, value)
+            self._persist(job)
+
+    def _expire(self, now):
+        """Forget finished jobs past their retention. Called with the lock held."""
+        expired = [job_id for job_id, job in self.jobs.items()
+                   if job.finished and job.finished_at + self.retention <= now]
+        for job_id in expired:
+            del self.jobs[job_id]
+        if expired:
+            self._unpersist(expired)
+
+    # Persistence hooks, no-ops for the in-memory queue
+    def _persist(self, job):
+        pass
+
+    def _unpersist(self, job_ids):
+        pass
+
+class SQLiteJobQueue(JobQueue):
+    """JobQueue that writes its job table through to SQLite.
+
+    Job results survive restarts. Jobs that were queued or running when the
+    process stopped are marked as failed on startup, since their work is lost.
+    """
+
+    COLUMNS = ("id", "kind", "owner", "status", "progress", "result", "error",
+               "created_at", "started_at", "finished_at")
+
+    def __init__(self, app, path, workers=4, retention_seconds=86400):
+        super().__init__(app, workers, retention_seconds)
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, owner TEXT, status TEXT NOT NULL, progress REAL, "
+            "result TEXT, error TEXT, created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        now = time.time()
+        self.db.execute(
+            "UPDATE jobs SET status = 'failed', error = 'Interrupted by a restart', finished_at = ? "
+            "WHERE status IN ('queued', 'running')", (now,)
+        )
+        self.db.execute("DELETE FROM jobs WHERE finished_at <= ?", (now - self.retention,))
+        rows = self.db.execute(f"SELECT {', '.join(self.COLUMNS)} FROM jobs ORDER BY created_at")
+        for row in rows:
+            values = dict(zip(self.COLUMNS, row))
+            job = Job(values["id"], values["kind"], values["owner"], values["status"], values["created_at"])
+            job.progress = values["progress"]
+            job.result = json.loads(values["result"]) if values["result"] else None
+            job.error = values["error"]
+            job.started_at = values["started_at"]
+            job.finished_at = values["finished_at"]
+            self.jobs[job.id] = job
+
+    def _persist(self, job):
+        self.db.execute(
+            f"INSERT OR REPLACE INTO jobs ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' * len(self.COLUMNS))})",
+            (job.id, job.kind, job.owner, job.status, job.progress,
+             json.dumps(job.result) if job.result is not None else None, job.error,
+             job.created_at, job.started_at, job.finished_at)
+        )
+
+    def _unpersist(self, job_ids):
+        self.db.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in job_ids])
+
+def create_job_queue(app, settings=None):
+    """Create the job queue described by the optional `jobs` settings section.
+
+    Args:
+        app: The Flask application jobs run in
+        settings (dict, optional): 'workers', 'retention_seconds', 'backend'
+            ('memory' or 'sqlite') and 'path' of the SQLite database
+
+    Returns:
+        JobQueue: The configured queue
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    settings = settings or {}
+    workers = settings.get('workers', 4)
+    retention_seconds = settings.get('retention_seconds', 86400)
+    backend = settings.get('backend', 'memory')
+    if backend == 'sqlite':
+        return SQLiteJobQueue(app, settings.get('path', 'jobs.db'), workers, retention_seconds)
+    if backend != 'memory':
+        raise ValueError(f"Invalid job backend: {backend}. Must be one of: ['memory', 'sqlite']")
+    return JobQueue(app, workers, retention_seconds)
+
+def wants_async():
+    """Whether the client asked to run the request as a job (?async=1)."""
+    return request.args.get("async", "").lower() in ("1", "true")
+
+def submit_job(kind, owner, func, *args):
+    """Submit an operation as a job and describe it in a 202 response.
+
+    Returns:
+        tuple: (Response, 202), with a Location header pointing to the job
+    """
+    job = get_job_queue_instance().submit(kind, owner, func, *args)
+    response = jsonify(job.to_dict())
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return response, 202
+
+def report_progress(done, total):
+    """Report the progress of the job running in this thread, if any."""
+    job = g.get('job')
+    if job is not None and total:
+        job.progress = round(done / total, 4)
+
+# Global job queue instance
+_global_job_queue_instance = None
+
+def get_job_queue_instance():
+    """Get the global job queue instance."""
+    return _global_job_queue_instance
+
+def set_job_queue_instance(instance):
+    """Set the global job queue instance."""
+    global _global_job_queue_instance
+    _global_job_queue_instance = instance
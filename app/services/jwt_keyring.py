@@ -0,0 +1,141 @@
+import hashlib
+import secrets
+import threading
+import time
+import jwt
+
+try:
+    from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+except ImportError:  # cryptography is optional; only HS256 is available without it
+    ed25519 = rsa = None
+
+SUPPORTED_ALGORITHMS = ("HS256", "RS256", "EdDSA")
+
+class SigningKey:
+    """One JWT key, identified in token headers by its kid."""
+
+    def __init__(self, kid, algorithm, signing_key, verification_key):
+        self.kid = kid
+        self.algorithm = algorithm
+        # Both keys are prepared once, so signing and verifying skip key parsing
+        algorithm_impl = jwt.get_algorithm_by_name(algorithm)
+        self.signing_key = algorithm_impl.prepare_key(signing_key)
+        self.verification_key = algorithm_impl.prepare_key(verification_key)
+        self.created_at = time.time()
+        self.retires_at = None  # Set when another key takes over signing
+
+    def to_dict(self, active_kid):
+        return {
+            "kid": self.kid,
+            "algorithm": self.algorithm,
+            "active": self.kid == active_kid,
+            "created_at": self.created_at,
+            "retires_at": self.retires_at,
+        }
+
+def check_algorithm(algorithm):
+    """Check that keys for an algorithm can be created.
+
+    Raises:
+        ValueError: If the algorithm is unsupported or needs the missing
+            cryptography package
+    """
+    if algorithm not in SUPPORTED_ALGORITHMS:
+        raise ValueError(f"Invalid JWT algorithm: {algorithm}. Must be one of: {list(SUPPORTED_ALGORITHMS)}")
+    if algorithm != "HS256" and rsa is None:
+        raise ValueError(f"The {algorithm} algorithm requires the 'cryptography' package (see requirements.txt)")
+
+def generate_key(algorithm, secret=None):
+    """Create a signing key for an algorithm.
+
+    HS256 keys use `secret` when given (their kid is derived from it, so it
+    is stable across restarts); all other keys are generated locally.
+
+    Raises:
+        ValueError: If the algorithm is unsupported or needs the missing
+            cryptography package
+    """
+    check_algorithm(algorithm)
+
+    if algorithm == "HS256":
+        secret = secret or secrets.token_hex(32)
+        kid = "hs-" + hashlib.sha256(secret.encode()).hexdigest()[:12]
+        return SigningKey(kid, algorithm, secret, secret)
+
+    if algorithm == "RS256":
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    kid = algorithm.lower()[:2] + "-" + secrets.token_hex(6)
+    return SigningKey(kid, algorithm, private_key, private_key.public_key())
+
+class JWTKeyring:
+    """The keys that sign and verify access tokens.
+
+    One key signs new tokens. After a rotation the previous keys stay valid
+    for verification during an overlap window (at least the access token
+    lifetime), so tokens issued before the rotation keep working until they
+    expire and clients do not all have to log in again at once. Each key's
+    algorithm is pinned, so a token cannot choose how it is verified.
+    """
+
+    def __init__(self, secret=None, algorithm="HS256", overlap_seconds=900):
+        self.overlap = overlap_seconds
+        self._lock = threading.Lock()
+        key = generate_key(algorithm, secret)
+        self.keys = {key.kid: key}  # Maps kids to the keys accepted for verification
+        self.active = key
+
+    def sign(self, payload):
+        key = self.active
+        return jwt.encode(payload, key.signing_key, algorithm=key.algorithm, headers={"kid": key.kid})
+
+    def verify(self, token):
+        """Verify a token with the key named by its kid.
+
+        Returns:
+            dict: The token's claims
+
+        Raises:
+            jwt.InvalidTokenError: If the token is invalid, expired or signed
+                by an unknown or retired key
+        """
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self.keys.get(kid)
+        if key is None or (key.retires_at is not None and key.retires_at <= time.time()):
+            raise jwt.InvalidTokenError("Unknown or retired signing key")
+        return jwt.decode(token, key.verification_key, algorithms=[key.algorithm])
+
+    def rotate(self, algorithm=None, secret=None):
+        """Sign new tokens with a new key, retiring the current one after the overlap window.
+
+        Args:
+            algorithm (str, optional): Algorithm of the new key; defaults to the current one
+            secret (str, optional): Secret of a new HS256 key
+
+        Returns:
+            SigningKey: The new active key
+
+        Raises:
+            ValueError: If the algorithm is unsupported
+        """
+        key = generate_key(algorithm or self.active.algorithm, secret)
+        now = time.time()
+        with self._lock:
+            if key.kid == self.active.kid:
+                return self.active  # Same HS256 secret as the active key
+            # Rebuild rather than mutate the map, so concurrent verify() calls never see it change
+            keys = {kid: old for kid, old in self.keys.items()
+                    if old.retires_at is None or old.retires_at > now}
+            self.active.retires_at = now + self.overlap
+            keys[key.kid] = key
+            self.keys = keys
+            self.active = key
+        return key
+
+    def describe(self):
+        """List the keys accepted for verification."""
+        now = time.time()
+        active_kid = self.active.kid
+        return [key.to_dict(active_kid) for key in self.keys.values()
+                if key.retires_at is None or key.retires_at > now]
@@ -0,0 +1,139 @@
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+class ReadWriteLock:
+    """A lock shared by readers and held exclusively by a writer.
+
+    Waiting writers block new readers, so a steady stream of downloads
+    cannot starve an upload or delete.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+class NoteLocks:
+    """Per-note read/write locks, kept only while a note is in use."""
+
+    def __init__(self):
+        self._locks = {}  # Maps note names to [ReadWriteLock, number of users]
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _acquire(self, note_name):
+        with self._lock:
+            entry = self._locks.setdefault(note_name, [ReadWriteLock(), 0])
+            entry[1] += 1
+        try:
+            yield entry[0]
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[note_name]
+
+    @contextmanager
+    def read(self, note_name):
+        """Hold the note's lock shared with other readers."""
+        with self._acquire(note_name) as lock, lock.read():
+            yield
+
+    @contextmanager
+    def write(self, note_name):
+        """Hold the note's lock exclusively."""
+        with self._acquire(note_name) as lock, lock.write():
+            yield
+
+class NoteIO:
+    """Run note disk operations on a bounded thread pool.
+
+    Request threads hand their file operations to `workers` I/O threads and
+    wait for the result, so however many requests touch notes at once, at
+    most `workers` disk operations are in flight.
+    """
+
+    def __init__(self, workers=4):
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="note-io")
+
+    def run(self, func, *args):
+        """Run func(*args) on an I/O thread and return its result (or raise its exception)."""
+        return self.executor.submit(func, *args).result()
+
+SHARD_LEVELS = 2  # Directory levels between the notes directory and a note
+SHARD_WIDTH = 2  # Hex digits per level, so each level fans out to 256 directories
+
+def shard_dir(note_name):
+    """Relative directory of a note in the sharded layout, e.g. 'a3/5f'.
+
+    Derived from a hash of the name, so notes spread evenly over 65536
+    directories and each directory stays small however many notes exist.
+    """
+    digest = hashlib.sha256(note_name.encode('utf-8')).hexdigest()
+    return os.path.join(*(digest[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH] for i in range(SHARD_LEVELS)))
+
+def atomic_write(path, data):
+    """Write data to a temporary file in the same directory and rename it over path.
+
+    Readers see either the previous or the new content, never a partial
+    write, and files opened before the rename keep their content.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.', suffix='.tmp')
+    try:
+        os.fchmod(fd, 0o644)  # mkstemp creates files only the owner can read
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+# Global note I/O instance
+_global_note_io_instance = None
+
+def get_note_io_instance():
+    """Get the global note I/O instance."""
+    return _global_note_io_instance
+
+def set_note_io_instance(instance):
+    """Set the global note I/O instance."""
+    global _global_note_io_instance
+    _global_note_io_instance = instance
@@ -1,28 +1,130 @@
 import os
-from flask import send_file, jsonify, current_app
+from array import array
+from flask import Response, request, send_file, jsonify, current_app
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
 from werkzeug.utils import secure_filename
+from services.job_queue import submit_job
+from services.note_io import NoteLocks, atomic_write, shard_dir, get_note_io_instance
+from utils.auth import get_current_identity
+from utils.errors import error_response
 
 class NoteService:
     NOTES_DIR = 'data/notes'  # Path relative to app directory
     MAX_NOTE_SIZE = 1024 * 1024  # 1MB max size for notes
+    INDEX_DIR = '.index'  # Line-offset indexes, inside the notes directory
+    OFFSET = array('Q').itemsize
+    _locks = NoteLocks()  # Uploads and deletes of a note exclude its readers
     
     @classmethod
     def _get_notes_path(cls):
         """Get absolute path to notes directory"""
         return os.path.join(current_app.root_path, cls.NOTES_DIR)
+
+    @classmethod
+    def _get_note_path(cls, note_name):
+        """Get absolute path to a note in its shard directory (see shard_dir)"""
+        return os.path.join(cls._get_notes_path(), shard_dir(note_name), note_name)
+
+    @classmethod
+    def _get_note_paths(cls, note_name):
+        """Get the paths a note may be at: its shard, then the flat legacy layout.
+
+        Notes saved before the directory was sharded stay readable until
+        scripts/migrate_notes.py moves them (or they are uploaded again).
+        """
+        return cls._get_note_path(note_name), os.path.join(cls._get_notes_path(), note_name)
+
+    @classmethod
+    def _get_index_path(cls, note_name):
+        """Get absolute path to the line-offset index of a note"""
+        return os.path.join(cls._get_notes_path(), cls.INDEX_DIR, shard_dir(note_name), note_name + '.lines')
+
+    @staticmethod
+    def _open_note(note_paths):
+        """Open the first existing note of note_paths.
+
+        Raises:
+            FileNotFoundError: If the note is at none of them
+        """
+        for note_path in note_paths:
+            try:
+                return open(note_path, 'rb')
+            except (FileNotFoundError, IsADirectoryError):
+                pass  # The flat path of a note named like a shard directory is that directory
+        raise FileNotFoundError(note_paths[0])
+
+    @staticmethod
+    def _remove_legacy_note(legacy_path):
+        """Remove a note from the flat layout if it is there.
+
+        The notes directory also holds the shard directories, whose names
+        are valid note names, so only regular files are removed.
+
+        Returns:
+            bool: True if a note was removed
+        """
+        if not os.path.isfile(legacy_path):
+            return False
+        try:
+            os.remove(legacy_path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    @staticmethod
+    def _line_offsets(content):
+        """Byte offsets of the start of each line of content, followed by its length"""
+        offsets = array('Q', [0])
+        newline = content.find(b'\n')
+        while newline != -1:
+            offsets.append(newline + 1)
+            newline = content.find(b'\n', newline + 1)
+        if offsets[-1] != len(content):
+            offsets.append(len(content))
+        return offsets
+
+    @classmethod
+    def _write_index(cls, index_path, content):
+        """Write the line-offset index of a note's content"""
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        atomic_write(index_path, cls._line_offsets(content).tobytes())
+
+    @classmethod
+    def _open_index(cls, note_file, index_path):
+        """Open a note's line-offset index, rebuilding it if it is missing or stale.
+
+        Notes saved before indexes existed (or replaced outside the API) are
+        indexed by the first partial read.
+        """
+        try:
+            if os.path.getmtime(index_path) >= os.fstat(note_file.fileno()).st_mtime:
+                return open(index_path, 'rb')
+        except FileNotFoundError:
+            pass
+        cls._write_index(index_path, note_file.read())
+        return open(index_path, 'rb')
+
+    @classmethod
+    def _read_offsets(cls, index, *lines):
+        """Read the start offsets of the given 0-based lines from an open index"""
+        offsets = []
+        for line in lines:
+            index.seek(line * cls.OFFSET)
+            offsets.append(array('Q', index.read(cls.OFFSET))[0])
+        return offsets
     
     @classmethod
-    def upload_note(cls, request):
-        """Handle note upload"""
+    def upload_note(cls, request, background=False):
+        """Handle note upload; with background, the note is written by a job"""
         if 'file' not in request.files:
-            return jsonify({'error': 'No note file was provided'}), 400
+            return error_response("note_file_required")
             
         note_file = request.files['file']
         if note_file.filename == '':
-            return jsonify({'error': 'No note file was selected'}), 400
+            return error_response("note_file_not_selected")
             
         if not note_file.filename.endswith('.txt'):
-            return jsonify({'error': 'Notes must be in .txt format'}), 400
+            return error_response("invalid_note_type")
         
         # Check file size
         note_file.seek(0, os.SEEK_END)
@@ -30,55 +132,210 @@ class NoteService:
         note_file.seek(0)
         
         if size > cls.MAX_NOTE_SIZE:
-            return jsonify({'error': 'Note is too large. Maximum size is 1MB'}), 400
+            return error_response("note_too_large")
         
         # Validate content is text
         try:
-            content = note_file.read().decode('utf-8')
-            if not content.strip():
-                return jsonify({'error': 'Note cannot be empty'}), 400
+            content = note_file.read()
+            if not content.decode('utf-8').strip():
+                return error_response("note_empty")
         except UnicodeDecodeError:
-            return jsonify({'error': 'Note must contain valid text'}), 400
-        finally:
-            note_file.seek(0)
+            return error_response("invalid_note_text")
         
         note_name = secure_filename(note_file.filename)
-        note_path = os.path.join(cls._get_notes_path(), note_name)
-        note_file.save(note_path)
+        if background:
+            return submit_job("note_upload", get_current_identity(), cls.save_note, note_name, content)
+        return cls.save_note(note_name, content)
+
+    @classmethod
+    def save_note(cls, note_name, content):
+        """Write the content of a validated note.
+
+        The note and its index replace the previous ones through renames,
+        under the note's write lock, so readers see the old or the new note
+        and index, never a partial write or a mix of both.
+        """
+        note_path, legacy_path = cls._get_note_paths(note_name)
+        index_path = cls._get_index_path(note_name)
+        with cls._locks.write(note_name):
+            get_note_io_instance().run(cls._write_note, note_path, legacy_path, index_path, content)
         
         return jsonify({
             'message': 'Note saved successfully',
             'note_name': note_name
         }), 201
+
+    @classmethod
+    def _write_note(cls, note_path, legacy_path, index_path, content):
+        os.makedirs(os.path.dirname(note_path), exist_ok=True)
+        atomic_write(note_path, content)
+        cls._remove_legacy_note(legacy_path)  # Replaced by the sharded copy
+        cls._write_index(index_path, content)  # After the note, so the index is not stale
     
     @classmethod
     def download_note(cls, note_name):
-        """Handle note download"""
-        note_path = os.path.join(cls._get_notes_path(), secure_filename(note_name))
-            
-        if not os.path.exists(note_path):
-            return jsonify({'error': 'Note not found'}), 404
+        """Handle note download
+
+        The file is opened under the note's read lock; an upload or delete
+        that follows does not affect the open file, so the download is
+        consistent without holding the lock while it is sent.
+        """
+        note_name = secure_filename(note_name)
+
+        try:
+            with cls._locks.read(note_name):
+                note_file = get_note_io_instance().run(cls._open_note, cls._get_note_paths(note_name))
+        except FileNotFoundError:
+            return error_response("note_not_found")
+        except OSError as e:
+            return error_response("note_read_failed")
             
         try:
-            return send_file(
-                note_path,
+            stat = os.fstat(note_file.fileno())
+            response = send_file(
+                note_file,
                 mimetype='text/plain',
                 as_attachment=True,
-                download_name=note_name
+                download_name=note_name,
+                conditional=False,
+                etag=f"{stat.st_mtime_ns}-{stat.st_size}",
+                last_modified=stat.st_mtime
             )
+            # send_file only knows the size of paths; with it, conditional
+            # and Range requests work as for a path
+            response.content_length = stat.st_size
+            return response.make_conditional(request, accept_ranges=True, complete_length=stat.st_size)
+        except RequestedRangeNotSatisfiable:
+            note_file.close()
+            response, status = error_response("range_not_satisfiable")
+            response.headers['Content-Range'] = f"bytes */{stat.st_size}"
+            return response, status
         except Exception as e:
-            return jsonify({'error': 'Failed to retrieve note'}), 500
+            note_file.close()
+            return error_response("note_read_failed")
+
+    @staticmethod
+    def _parse_line_range(args):
+        """Parse ?lines=a-b (1-based, inclusive; 'a-' reads to the end) or ?head=N.
+
+        Returns:
+            tuple: (first, last) line numbers, last None for the end of the note
+
+        Raises:
+            ValueError: If the range is malformed or empty
+        """
+        if 'head' in args:
+            head = args['head']
+            if not head.isdigit() or int(head) < 1:
+                raise ValueError("'head' must be a positive number of lines")
+            return 1, int(head)
+        first, separator, last = args['lines'].partition('-')
+        if not first.isdigit() or (last and not last.isdigit()):
+            raise ValueError("'lines' must be a line number or a range a-b of line numbers")
+        first = int(first)
+        last = (int(last) if last else None) if separator else first
+        if first < 1 or (last is not None and last < first):
+            raise ValueError("'lines' must be a range a-b with 1 <= a <= b")
+        return first, last
+
+    @classmethod
+    def read_note_lines(cls, note_name, args):
+        """Return a range of lines of a note without reading the whole file.
+
+        The range is located with the note's line-offset index, so only the
+        requested bytes of the note are read. The X-Total-Lines header has the
+        number of lines of the note and X-Lines the range returned (empty if it
+        starts past the end).
+        """
+        note_name = secure_filename(note_name)
+        try:
+            first, last = cls._parse_line_range(args)
+        except ValueError as e:
+            return error_response("invalid_line_range", str(e))
+
+        try:
+            with cls._locks.read(note_name):
+                content, total, last = get_note_io_instance().run(
+                    cls._read_lines, cls._get_note_paths(note_name), cls._get_index_path(note_name), first, last)
+        except FileNotFoundError:
+            return error_response("note_not_found")
+        except Exception as e:
+            return error_response("note_read_failed")
+
+        return Response(content, mimetype='text/plain', headers={
+            'X-Total-Lines': str(total),
+            'X-Lines': f"{first}-{last}" if first <= last else ''
+        })
+
+    @classmethod
+    def _read_lines(cls, note_paths, index_path, first, last):
+        """Read lines first to last (None for the end) of a note.
+
+        Returns:
+            tuple: (content, number of lines of the note, last line read)
+        """
+        with cls._open_note(note_paths) as note_file, cls._open_index(note_file, index_path) as index:
+            total = os.fstat(index.fileno()).st_size // cls.OFFSET - 1
+            last = total if last is None else min(last, total)
+            if first > last:
+                return b'', total, last
+            start, end = cls._read_offsets(index, first - 1, last)
+            note_file.seek(start)
+            return note_file.read(end - start), total, last
+
+    @classmethod
+    def get_note_metadata(cls, note_name):
+        """Return a note's size, line count and modification time"""
+        note_name = secure_filename(note_name)
+
+        try:
+            with cls._locks.read(note_name):
+                stat, lines = get_note_io_instance().run(
+                    cls._stat_note, cls._get_note_paths(note_name), cls._get_index_path(note_name))
+        except FileNotFoundError:
+            return error_response("note_not_found")
+        except Exception as e:
+            return error_response("note_read_failed")
+
+        return jsonify({
+            'note_name': note_name,
+            'size': stat.st_size,
+            'lines': lines,
+            'modified_at': stat.st_mtime
+        }), 200
+
+    @classmethod
+    def _stat_note(cls, note_paths, index_path):
+        with cls._open_note(note_paths) as note_file, cls._open_index(note_file, index_path) as index:
+            return os.fstat(note_file.fileno()), os.fstat(index.fileno()).st_size // cls.OFFSET - 1
             
     @classmethod
     def delete_note(cls, note_name):
         """Delete a note"""
-        note_path = os.path.join(cls._get_notes_path(), secure_filename(note_name))
-        
-        if not os.path.exists(note_path):
-            return jsonify({'error': 'Note not found'}), 404
+        note_name = secure_filename(note_name)
             
         try:
-            os.remove(note_path)
+            with cls._locks.write(note_name):
+                get_note_io_instance().run(cls._remove_note, cls._get_note_paths(note_name), cls._get_index_path(note_name))
             return '', 204
+        except FileNotFoundError:
+            return error_response("note_not_found")
         except Exception as e:
-            return jsonify({'error': 'Failed to delete note'}), 500 
\ No newline at end of file
+            return error_response("note_delete_failed")
+
+    @classmethod
+    def _remove_note(cls, note_paths, index_path):
+        note_path, legacy_path = note_paths
+        try:
+            os.remove(note_path)
+            removed = True
+        except FileNotFoundError:
+            removed = False
+        if cls._remove_legacy_note(legacy_path):
+            removed = True
+        if not removed:
+            raise FileNotFoundError(note_paths[0])
+        try:
+            os.remove(index_path)
+        except FileNotFoundError:
+            pass  # Never read partially 
\ No newline at end of file
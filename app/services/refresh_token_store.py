@@ -0,0 +1,138 @@
+import heapq
+import secrets
+import threading
+import time
+
+class RefreshTokenReused(Exception):
+    """Raised when an already rotated refresh token is presented again."""
+
+class RefreshTokenStore:
+    """Refresh tokens with expiry, rotation and reuse detection.
+
+    Every login starts a token family. Refreshing rotates the token: the
+    presented token is marked as used and a new token of the same family is
+    issued. Presenting a used token again means it was copied, so the whole
+    family is revoked. Tokens are indexed by family and by username, so
+    revoking a login or a user only touches that family's or user's tokens.
+    """
+
+    def __init__(self, ttl_seconds=30 * 24 * 3600):
+        self.ttl = ttl_seconds
+        self.tokens = {}  # Maps tokens to [username, family, expires_at, used], oldest first
+        self.expiry = []  # Heap of (expires_at, token); tokens revoked early are skipped when popped
+        self.families = {}  # Maps family ids to the set of their tokens
+        self.user_tokens = {}  # Maps usernames to the set of their tokens
+        self._lock = threading.Lock()
+
+    def issue(self, username, family=None):
+        """Issue a refresh token, starting a new family unless one is given.
+
+        Returns:
+            str: The new refresh token
+        """
+        with self._lock:
+            return self._issue(username, family or secrets.token_hex(8), time.time())
+
+    def rotate(self, token):
+        """Exchange a refresh token for a new one of the same family.
+
+        Returns:
+            tuple: (username, new_token), or (None, None) if the token is
+                   unknown or expired
+
+        Raises:
+            RefreshTokenReused: If the token was already rotated; its family is revoked
+        """
+        with self._lock:
+            now = time.time()
+            entry = self.tokens.get(token)
+            if entry is None or entry[2] <= now:
+                return None, None
+            username, family, _, used = entry
+            if used:
+                self._revoke_family(family)
+                raise RefreshTokenReused(f"Refresh token reuse detected for user '{username}'")
+            entry[3] = True  # Kept until it expires so that reuse can be detected
+            # Issued under the same lock, so a concurrent revocation of the family cannot be missed
+            return username, self._issue(username, family, now)
+
+    def revoke(self, token):
+        """Revoke a token and the rest of its family (logout).
+
+        Returns:
+            bool: False if the token is unknown
+        """
+        with self._lock:
+            entry = self.tokens.get(token)
+            if entry is None:
+                return False
+            self._revoke_family(entry[1])
+        return True
+
+    def revoke_user(self, username):
+        """Revoke every token of a user.
+
+        Returns:
+            int: Number of live (unused) tokens revoked
+        """
+        with self._lock:
+            revoked = 0
+            for token in self.user_tokens.pop(username, set()):
+                _, family, _, used = self.tokens.pop(token)
+                revoked += not used
+                self._discard(self.families, family, token)
+        return revoked
+
+    def clear(self):
+        with self._lock:
+            self.tokens.clear()
+            self.expiry.clear()
+            self.families.clear()
+            self.user_tokens.clear()
+
+    def count(self, username=None):
+        """Count stored tokens (including used ones kept for reuse detection)."""
+        if username is not None:
+            return len(self.user_tokens.get(username, ()))
+        return len(self.tokens)
+
+    def _issue(self, username, family, now):
+        """Add a new token to a family. Called with the lock held."""
+        self._expire(now)
+        token = secrets.token_hex(32)
+        self.tokens[token] = [username, family, now + self.ttl, False]
+        heapq.heappush(self.expiry, (now + self.ttl, token))
+        self.families.setdefault(family, set()).add(token)
+        self.user_tokens.setdefault(username, set()).add(token)
+        return token
+
+    def _revoke_family(self, family):
+        """Delete all tokens of a family. Called with the lock held."""
+        for token in self.families.pop(family, set()):
+            username = self.tokens.pop(token)[0]
+            self._discard(self.user_tokens, username, token)
+
+    def _expire(self, now):
+        """Drop expired tokens, earliest expiry first. Called with the lock held.
+
+        The heap keeps this correct when a reload changes the lifetime of new
+        tokens, which makes insertion order differ from expiry order.
+        """
+        while self.expiry and self.expiry[0][0] <= now:
+            _, token = heapq.heappop(self.expiry)
+            entry = self.tokens.pop(token, None)
+            if entry is not None:
+                username, family, _, _ = entry
+                self._discard(self.families, family, token)
+                self._discard(self.user_tokens, username, token)
+        if len(self.expiry) > 2 * len(self.tokens) + 64:  # Mostly tokens revoked early; rebuild
+            self.expiry = [(entry[2], token) for token, entry in self.tokens.items()]
+            heapq.heapify(self.expiry)
+
+    @staticmethod
+    def _discard(index, key, token):
+        tokens = index.get(key)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del index[key]
@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+
+class ResponseCache:
+    """Bounded LRU cache of encoded responses, partitioned by tenant.
+
+    Keys include the version of the tenant's store, so an entry can never be
+    served after a write. Writes additionally call invalidate() to drop the
+    tenant's now unreachable entries right away instead of waiting for them
+    to be evicted.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # Maps (tenant, key) to (body, headers), least recently used first
+        self.tenant_keys = {}  # Maps tenants to the set of their cache keys
+        self.size = 0  # Total body size in bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def get(self, tenant, key):
+        """Return the cached (body, headers) pair, or None."""
+        with self._lock:
+            entry = self.entries.get((tenant, key))
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end((tenant, key))
+            self.hits += 1
+            return entry
+
+    def put(self, tenant, key, body, headers=None):
+        if self.max_entries <= 0 or len(body) > self.max_bytes:
+            return
+        with self._lock:
+            self._remove((tenant, key))
+            self.entries[(tenant, key)] = (body, headers or {})
+            self.tenant_keys.setdefault(tenant, set()).add(key)
+            self.size += len(body)
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def invalidate(self, tenant):
+        """Drop every entry of a tenant."""
+        with self._lock:
+            for key in self.tenant_keys.pop(tenant, ()):
+                entry = self.entries.pop((tenant, key), None)
+                if entry is not None:
+                    self.size -= len(entry[0])
+                    self.invalidations += 1
+
+    def _remove(self, full_key):
+        entry = self.entries.pop(full_key, None)
+        if entry is None:
+            return
+        self.size -= len(entry[0])
+        tenant, key = full_key
+        keys = self.tenant_keys.get(tenant)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.tenant_keys[tenant]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.size,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,197 @@
+import heapq
+import json
+import secrets
+import sqlite3
+import threading
+import time
+
+class SessionStore:
+    """Server-side sessions keyed by a short random session id.
+
+    Sessions expire a fixed time after creation. A heap of expiry times
+    lets expired sessions be swept as new ones are created without a scan,
+    also after a reload changed the lifetime of new sessions. A per-user
+    index lets all sessions of a user be revoked without a scan.
+    """
+
+    def __init__(self, ttl_seconds=86400):
+        self.ttl = ttl_seconds
+        self.sessions = {}  # Maps session ids to [username, data, expires_at], oldest first
+        self.expiry = []  # Heap of (expires_at, session id); ids deleted early are skipped when popped
+        self.user_sessions = {}  # Maps usernames to the set of their session ids
+        self._lock = threading.Lock()
+
+    def create(self, data):
+        """Store a new session.
+
+        Args:
+            data (dict): Session data; its 'username' key is indexed
+
+        Returns:
+            str: The new session id
+        """
+        sid = secrets.token_urlsafe(16)
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            entry = [data.get("username"), dict(data), now + self.ttl]
+            self.sessions[sid] = entry
+            heapq.heappush(self.expiry, (entry[2], sid))
+            self._index(sid, entry[0])
+            self._persist(sid, entry)
+        return sid
+
+    def get(self, sid):
+        """Return a copy of the data of a live session, or None."""
+        entry = self.sessions.get(sid)
+        if entry is None or entry[2] <= time.time():
+            return None
+        return dict(entry[1])
+
+    def save(self, sid, data):
+        """Replace the data of an existing session, keeping its expiry.
+
+        Returns:
+            bool: False if the session no longer exists
+        """
+        with self._lock:
+            entry = self.sessions.get(sid)
+            if entry is None:
+                return False
+            username = data.get("username")
+            if username != entry[0]:
+                self._unindex(sid, entry[0])
+                self._index(sid, username)
+            entry[0], entry[1] = username, dict(data)
+            self._persist(sid, entry)
+        return True
+
+    def delete(self, sid):
+        """Revoke one session.
+
+        Returns:
+            bool: False if the session did not exist
+        """
+        with self._lock:
+            entry = self.sessions.pop(sid, None)
+            if entry is None:
+                return False
+            self._unindex(sid, entry[0])
+            self._unpersist([sid])
+        return True
+
+    def delete_user(self, username):
+        """Revoke every session of a user.
+
+        Returns:
+            int: Number of sessions revoked
+        """
+        with self._lock:
+            sids = self.user_sessions.pop(username, set())
+            for sid in sids:
+                del self.sessions[sid]
+            self._unpersist(sids)
+        return len(sids)
+
+    def clear(self):
+        with self._lock:
+            self.sessions.clear()
+            self.expiry.clear()
+            self.user_sessions.clear()
+            self._unpersist_all()
+
+    def count(self, username=None):
+        """Count stored sessions, optionally only those of one user."""
+        if username is not None:
+            return len(self.user_sessions.get(username, ()))
+        return len(self.sessions)
+
+    def _expire(self, now):
+        """Drop expired sessions, earliest expiry first. Called with the lock held."""
+        expired = []
+        while self.expiry and self.expiry[0][0] <= now:
+            _, sid = heapq.heappop(self.expiry)
+            entry = self.sessions.pop(sid, None)
+            if entry is not None:
+                self._unindex(sid, entry[0])
+                expired.append(sid)
+        if len(self.expiry) > 2 * len(self.sessions) + 64:  # Mostly sessions deleted early; rebuild
+            self.expiry = [(entry[2], sid) for sid, entry in self.sessions.items()]
+            heapq.heapify(self.expiry)
+        if expired:
+            self._unpersist(expired)
+
+    def _index(self, sid, username):
+        if username is not None:
+            self.user_sessions.setdefault(username, set()).add(sid)
+
+    def _unindex(self, sid, username):
+        sids = self.user_sessions.get(username)
+        if sids is not None:
+            sids.discard(sid)
+            if not sids:
+                del self.user_sessions[username]
+
+    # Persistence hooks, called with the lock held; no-ops for the in-memory store
+    def _persist(self, sid, entry):
+        pass
+
+    def _unpersist(self, sids):
+        pass
+
+    def _unpersist_all(self):
+        pass
+
+class SQLiteSessionStore(SessionStore):
+    """SessionStore that writes through to SQLite so sessions survive restarts.
+
+    Reads are still served from memory; the database is only read on startup.
+    """
+
+    def __init__(self, path, ttl_seconds=86400):
+        super().__init__(ttl_seconds)
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "sid TEXT PRIMARY KEY, username TEXT, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self.db.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+        rows = self.db.execute("SELECT sid, username, data, expires_at FROM sessions ORDER BY expires_at")
+        for sid, username, data, expires_at in rows:
+            self.sessions[sid] = [username, json.loads(data), expires_at]
+            self.expiry.append((expires_at, sid))  # Rows are in expiry order, which is a valid heap
+            self._index(sid, username)
+
+    def _persist(self, sid, entry):
+        self.db.execute(
+            "INSERT OR REPLACE INTO sessions (sid, username, data, expires_at) VALUES (?, ?, ?, ?)",
+            (sid, entry[0], json.dumps(entry[1]), entry[2])
+        )
+
+    def _unpersist(self, sids):
+        self.db.executemany("DELETE FROM sessions WHERE sid = ?", [(sid,) for sid in sids])
+
+    def _unpersist_all(self):
+        self.db.execute("DELETE FROM sessions")
+
+def create_session_store(settings=None):
+    """Create the session store described by the optional `sessions` settings section.
+
+    Args:
+        settings (dict, optional): 'backend' ('memory' or 'sqlite'), 'path'
+            of the SQLite database and 'ttl_seconds'
+
+    Returns:
+        SessionStore: The configured store
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    settings = settings or {}
+    ttl_seconds = settings.get('ttl_seconds', 86400)
+    backend = settings.get('backend', 'memory')
+    if backend == 'sqlite':
+        return SQLiteSessionStore(settings.get('path', 'sessions.db'), ttl_seconds)
+    if backend != 'memory':
+        raise ValueError(f"Invalid session backend: {backend}. Must be one of: ['memory', 'sqlite']")
+    return SessionStore(ttl_seconds)
@@ -0,0 +1,69 @@
+import threading
+
+class _Call:
+    """A computation in progress, shared by everyone asking for its key."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one computation.
+
+    The first caller for a key runs the function; callers arriving while it
+    runs wait for it and receive the same result (or exception) instead of
+    repeating the work. Nothing is kept once the call finishes, so this
+    complements rather than replaces a cache.
+    """
+
+    def __init__(self):
+        self._calls = {}  # Maps keys to the _Call in progress
+        self._lock = threading.Lock()
+        self.leaders = 0  # Calls that ran the function
+        self.followers = 0  # Calls that shared another call's result
+
+    def do(self, key, func):
+        """Run func(), or wait for a concurrent call with the same key.
+
+        Args:
+            key: Hashable identity of the computation
+            func: Function computing the result
+
+        Returns:
+            tuple: (result, shared) where shared is True if the result was
+                   computed by a concurrent call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "computed": self.leaders,
+                "shared": self.followers,
+            }
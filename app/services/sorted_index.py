@@ -0,0 +1,50 @@
+from bisect import bisect_left, insort
+
+class SortedIndex:
+    """Todo IDs kept ordered by a sort key.
+
+    Entries are (key, todo_id) tuples held in a sorted list, so ordered and
+    range scans need no per-request sorting. Insertions and removals are
+    binary searches plus a list shift.
+    """
+
+    def __init__(self, key_func):
+        self.key_func = key_func  # Maps a Todo to its sort key
+        self.entries = []
+
+    def rebuild(self, todos):
+        self.entries = sorted((self.key_func(todo), todo.id) for todo in todos)
+
+    def add(self, todo):
+        insort(self.entries, (self.key_func(todo), todo.id))
+
+    def remove(self, todo, key=None):
+        """Remove a todo, optionally by the key it was indexed under."""
+        entry = (self.key_func(todo) if key is None else key, todo.id)
+        position = bisect_left(self.entries, entry)
+        if position < len(self.entries) and self.entries[position] == entry:
+            del self.entries[position]
+
+    def ids(self, reverse=False, lo=None, hi=None):
+        """Iterate todo IDs in key order.
+
+        Args:
+            reverse (bool): Iterate in descending order
+            lo: Only include keys >= lo
+            hi: Only include keys < hi
+
+        Yields:
+            int: Todo IDs
+        """
+        start = bisect_left(self.entries, (lo,)) if lo is not None else 0
+        stop = bisect_left(self.entries, (hi,)) if hi is not None else len(self.entries)
+        positions = range(stop - 1, start - 1, -1) if reverse else range(start, stop)
+        entries = self.entries
+        for position in positions:
+            yield entries[position][1]
+
+    def count(self, lo=None, hi=None):
+        """Count the entries with lo <= key < hi."""
+        start = bisect_left(self.entries, (lo,)) if lo is not None else 0
+        stop = bisect_left(self.entries, (hi,)) if hi is not None else len(self.entries)
+        return max(0, stop - start)
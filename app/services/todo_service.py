@@ -1,10 +1,68 @@
-from flask import jsonify, request, current_app
+from flask import jsonify, request, current_app, Response
 from models.todo import Todo
+from services.change_feed import ChangeFeed
+from services.response_cache import ResponseCache
+from services.single_flight import SingleFlight
+from services.todo_store import TodoStore, TodoQuotaExceeded, SORT_KEYS, title_key
+from utils.auth import get_current_identity
+from utils.json_provider import wants_pretty
+from utils.errors import error_response
 import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+def parse_timestamp(value):
+    """Parse a Unix timestamp or an ISO 8601 date/time (UTC unless it has an offset).
+
+    Raises:
+        ValueError: If the value is neither
+    """
+    try:
+        timestamp = float(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+    if not math.isfinite(timestamp):
+        raise ValueError(f"Invalid timestamp: {value}")
+    return timestamp
+
+MAX_TAGS = 20  # Per todo
+MAX_TAG_LENGTH = 50
+
+def parse_tags(value):
+    """Validate the tags of a todo, given as a list or a comma-separated string.
+
+    Tags are stripped, and duplicates are dropped keeping the first occurrence.
+
+    Returns:
+        tuple: The tags
+
+    Raises:
+        ValueError: If the value is not a list of strings, or a tag is empty,
+            too long or contains a comma or control character
+    """
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, list) or not all(isinstance(tag, str) for tag in value):
+        raise ValueError("Invalid 'tags'. Expected an array of strings.")
+    tags = tuple(dict.fromkeys(tag.strip() for tag in value))
+    if len(tags) > MAX_TAGS:
+        raise ValueError(f"Too many tags. Maximum is {MAX_TAGS}.")
+    for tag in tags:
+        if not tag or len(tag) > MAX_TAG_LENGTH or "," in tag or any(ord(c) < 32 or ord(c) == 127 for c in tag):
+            raise ValueError(f"Invalid tag '{tag}'. Tags must be 1 to {MAX_TAG_LENGTH} characters "
+                             "without commas or control characters.")
+    return tags
 
 class TodoService:
     _instance = None
     _initialized = False
+    _lock = threading.RLock()  # Guards singleton creation and the tenant map
 
     def __new__(cls):
         if cls._instance is None:
@@ -13,132 +71,365 @@ class TodoService:
 
     def __init__(self):
         if not TodoService._initialized:
-            self.todos = {}
-            self.next_id = 1
-            self._initialize_todos()
-            TodoService._initialized = True
-
-    def _initialize_todos(self):
-        """Initialize todos from the app config."""
-        initial_todos = current_app.config.get('initial_todos', [])
-        for todo_data in initial_todos:
-            todo_id = todo_data['id']
-            self.todos[todo_id] = Todo(
-                todo_id,
-                todo_data['title'],
-                todo_data['done'],
-                todo_data['description']
+            settings = current_app.config.get('settings', {})
+            self.initial_todos = current_app.config.get('initial_todos', [])
+            self.max_todos = settings.get('tenants', {}).get('max_todos')
+            self.max_tenants = settings.get('tenants', {}).get('max_tenants', 10000)
+            feed_settings = settings.get('change_feed', {})
+            self.feed_capacity = feed_settings.get('capacity', 1000)
+            # Each waiting WSGI long-poll or change stream holds a server thread, so their number is bounded
+            self.wait_slots = threading.BoundedSemaphore(feed_settings.get('max_waiting', 4))
+            self.stream_max_seconds = feed_settings.get('stream_max_seconds', 300)
+            cache_settings = settings.get('cache', {})
+            self.listing_cache = ResponseCache(
+                cache_settings.get('max_entries', 1024),
+                cache_settings.get('max_bytes', 64 * 1024 * 1024)
             )
-            # Update next_id to be greater than the highest existing id
-            self.next_id = max(self.next_id, todo_id + 1)
+            self.listing_flights = SingleFlight()  # Coalesces concurrent cache misses
+            self.stores = OrderedDict()  # Maps tenant identities to their TodoStore, least recently used first
+            TodoService._initialized = True
 
     @classmethod
     def get_instance(cls):
         """Get the singleton instance of TodoService."""
-        if cls._instance is None:
-            cls._instance = TodoService()
+        if not cls._initialized:
+            with cls._lock:
+                if not cls._initialized:
+                    cls._instance = TodoService()
         return cls._instance
 
+    @classmethod
+    def apply_settings(cls, settings):
+        """Apply reloaded quota and cache settings to the service and existing stores.
+
+        A lowered `tenants.max_tenants` evicts tenants as new ones are created.
+        """
+        if not cls._initialized:
+            return  # Read from the settings on first use
+        service = cls.get_instance()
+        with cls._lock:
+            service.max_todos = settings.get('tenants', {}).get('max_todos')
+            service.max_tenants = settings.get('tenants', {}).get('max_tenants', 10000)
+            for store in service.stores.values():
+                store.max_todos = service.max_todos
+        cache_settings = settings.get('cache', {})
+        service.listing_cache.max_entries = cache_settings.get('max_entries', 1024)
+        service.listing_cache.max_bytes = cache_settings.get('max_bytes', 64 * 1024 * 1024)
+
+    @staticmethod
+    def get_store(tenant=None):
+        """Get the todo store of a tenant, creating it from the initial todos on first use.
+
+        At most `tenants.max_tenants` stores are kept. Creating one more evicts
+        the least recently used tenant, whose todos start again from the
+        initial todos on its next request.
+
+        Args:
+            tenant (str, optional): Tenant identity. Defaults to the identity
+                resolved by AuthMiddleware for the current request.
+
+        Returns:
+            TodoStore: The tenant's store
+        """
+        service = TodoService.get_instance()
+        tenant = tenant or get_current_identity()
+        with TodoService._lock:
+            store = service.stores.get(tenant)
+            if store is not None:
+                service.stores.move_to_end(tenant)
+                return store
+            while len(service.stores) >= service.max_tenants:
+                evicted, _ = service.stores.popitem(last=False)
+                service.listing_cache.invalidate(evicted)
+            store = TodoStore(tenant, service.initial_todos, service.max_todos, service.feed_capacity)
+            # Drop cached listings as soon as the tenant's todos change
+            store.changes.add_listener(lambda: service.listing_cache.invalidate(tenant))
+            service.stores[tenant] = store
+        return store
+
     @staticmethod
     def get_all_todos(request):
-        """Get all todos with optional filtering and pagination.
+        """Get all todos with optional filtering, sorting, projection and pagination.
 
         Query Parameters:
             done (str, optional): Filter by completion status ('true' or 'false')
             title (str, optional): Filter todos by title prefix (case-insensitive)
+            sort (str, optional): Order by 'id', 'title', 'done', 'created_at' or
+                'updated_at'; prefix with '-' for descending order. Defaults to
+                creation order (id order when filtering by time).
+            fields (str, optional): Comma-separated fields to return
+                (any of 'id', 'title', 'done', 'description', 'created_at', 'updated_at')
+            created_since, created_before, updated_since, updated_before (str, optional):
+                Time range filters (since inclusive, before exclusive) as Unix
+                timestamps or ISO 8601 dates, answered from the time indexes
+            tags (str, optional): Comma-separated tags todos must all have
+            any_tags (str, optional): Comma-separated tags todos must have at least one of
             page (int, optional): Page number for pagination (starts at 1)
             limit (int, optional): Number of items per page
 
+        Encoded responses are cached per query and store version until the
+        next write to the tenant's todos (X-Cache: HIT/MISS). Concurrent
+        identical requests that miss the cache share a single computation.
+
         Returns:
-            tuple: JSON response containing list of todos and HTTP status code
+            tuple: JSON response containing list of todos and HTTP status code.
+                   Paginated responses carry the number of matching todos in
+                   the X-Total-Count header.
 
         Examples:
             GET /todos - Returns all todos
             GET /todos?done=true - Returns all completed todos
             GET /todos?title=buy - Returns todos with titles starting with 'buy'
             GET /todos?page=1&limit=10 - Returns first 10 todos
+            GET /todos?done=false&sort=title&fields=id,title&page=1&limit=20
+                - Returns ids and titles of the first 20 incomplete todos by title
+            GET /todos?updated_since=1760000000&sort=updated_at
+                - Returns the todos changed since a sync, oldest change first
+            GET /todos?tags=work&any_tags=urgent,today&done=false
+                - Returns open work todos tagged urgent or today
         """
-        service = TodoService.get_instance()
+        store = TodoService.get_store()
         done = request.args.get("done", type=str)
         title_prefix = request.args.get("title", type=str)
+        sort = request.args.get("sort", type=str)
+        fields = request.args.get("fields", type=str)
         page = request.args.get("page", type=int)
         limit = request.args.get("limit", type=int)
 
         if done is not None:
             done = done.lower() == 'true'
 
-        results = list(service.todos.values())
+        reverse = False
+        if sort:
+            reverse = sort.startswith('-')
+            sort = sort.lstrip('-')
+            if sort not in SORT_KEYS:
+                return error_response("invalid_sort", f"Invalid sort field '{sort}'. Must be one of: {list(SORT_KEYS)}")
+        else:
+            sort = None
 
-        if done is not None:
-            results = [todo for todo in results if todo.done == done]
+        try:
+            created, updated = TodoService._time_ranges(request.args)
+        except ValueError as e:
+            return error_response("invalid_time", str(e))
 
-        if title_prefix:
-            results = [todo for todo in results if todo.title.lower().startswith(title_prefix.lower())]
+        try:
+            tags, any_tags = (tuple(sorted(parse_tags(request.args[name]))) if request.args.get(name) else None
+                              for name in ("tags", "any_tags"))
+        except ValueError as e:
+            return error_response("invalid_tags", str(e))
+
+        if fields:
+            fields = [field.strip() for field in fields.split(',') if field.strip()]
+            invalid = [field for field in fields if field not in Todo.FIELDS]
+            if invalid:
+                return error_response("invalid_fields", f"Invalid field '{invalid[0]}'. Must be any of: {list(Todo.FIELDS)}")
+        else:
+            fields = None
 
         # Apply pagination only if both page and limit parameters are provided
+        offset, page_size = 0, None
         if page is not None and limit is not None:
-            start_idx = (page - 1) * limit
-            end_idx = start_idx + limit
-            results = results[start_idx:end_idx]
+            if page < 1 or limit < 1:
+                return jsonify([]), 200, {"X-Total-Count": str(store.count(done, title_prefix, created, updated, tags, any_tags))}
+            offset, page_size = (page - 1) * limit, limit
+
+        service = TodoService.get_instance()
+        with store.lock:
+            key = (store.version, done, title_key(title_prefix) if title_prefix else None,
+                   sort, reverse, tuple(fields) if fields else None, offset, page_size, created, updated, tags, any_tags, wants_pretty())
+            cached = service.listing_cache.get(store.tenant, key)
+
+        if cached is not None:
+            body, headers = cached
+            return Response(body, mimetype="application/json", headers=dict(headers, **{"X-Cache": "HIT"})), 200
+
+        # Concurrent identical misses share one query and one encoded body
+        (body, headers), _ = service.listing_flights.do(
+            (store.tenant, key),
+            lambda: TodoService._encode_todos(store, key, done, title_prefix, sort, reverse, fields, offset, page_size,
+                                              created, updated, tags, any_tags)
+        )
+        return Response(body, mimetype="application/json", headers=dict(headers, **{"X-Cache": "MISS"})), 200
+
+    @staticmethod
+    def _encode_todos(store, key, done, title_prefix, sort, reverse, fields, offset, page_size, created, updated,
+                      tags, any_tags):
+        """Query and encode one GET /todos response, caching it under `key`.
+
+        Returns:
+            tuple: (body, headers)
+        """
+        with store.lock:
+            version = store.version
+            results = store.query(done, title_prefix, sort, reverse, offset, page_size, created, updated, tags, any_tags)
+            headers = {}
+            if page_size is not None:
+                headers["X-Total-Count"] = str(store.count(done, title_prefix, created, updated, tags, any_tags))
+            if fields is None and not key[-1]:
+                # Join the todos' cached encodings (read under the lock, so none is stale)
+                fragments = [todo.to_json() for todo in results]
+
+        if fields is None and not key[-1]:
+            body = b"[" + b",".join(fragments) + b"]\n"
+        else:
+            body = jsonify([todo.to_dict(fields) for todo in results]).get_data()
+        # Only cache under the key's version if no write happened in between
+        if version == key[0]:
+            TodoService.get_instance().listing_cache.put(store.tenant, key, body, headers)
+        return body, headers
+
+    @staticmethod
+    def _time_ranges(args):
+        """Parse the time range filters of a GET /todos query.
 
-        return jsonify([todo.to_dict() for todo in results]), 200
+        Returns:
+            tuple: ((created_since, created_before), (updated_since, updated_before)),
+                   as Unix timestamps or None
+
+        Raises:
+            ValueError: If a value is not a timestamp or ISO 8601 date
+        """
+        bounds = []
+        for name in ("created_since", "created_before", "updated_since", "updated_before"):
+            value = args.get(name)
+            if value is not None:
+                try:
+                    value = parse_timestamp(value)
+                except ValueError:
+                    raise ValueError(f"Invalid '{name}' value '{value}'. Expected a Unix timestamp or an ISO 8601 date.") from None
+            bounds.append(value)
+        return tuple(bounds[:2]), tuple(bounds[2:])
+
+    @staticmethod
+    def get_stats(request):
+        """Get todo counts without listing the todos.
+
+        Counts come from id sets and index ranges maintained by the store's
+        mutators, so the cost does not depend on the number of todos.
+
+        Query Parameters:
+            prefix (str, optional, repeatable): Title prefixes to count (case-insensitive)
+            tag (str, optional, repeatable): Tags to count
+
+        Returns:
+            tuple: JSON response with total/done/pending counts and HTTP status code
+
+        Examples:
+            GET /todos/stats - Returns {"total": 4, "done": 1, "pending": 3}
+            GET /todos/stats?prefix=buy&prefix=call - Also returns counts per prefix
+            GET /todos/stats?tag=work - Also returns counts per tag
+        """
+        store = TodoService.get_store()
+        with store.lock:
+            total = store.count()
+            done = store.count(done=True)
+            stats = {"total": total, "done": done, "pending": total - done}
+
+            prefixes = request.args.getlist("prefix")
+            if prefixes:
+                stats["prefixes"] = {}
+                for prefix in prefixes:
+                    prefix_total = store.count(title_prefix=prefix)
+                    prefix_done = store.count(done=True, title_prefix=prefix)
+                    stats["prefixes"][prefix] = {
+                        "total": prefix_total,
+                        "done": prefix_done,
+                        "pending": prefix_total - prefix_done
+                    }
+
+            tags = request.args.getlist("tag")
+            if tags:
+                stats["tags"] = {}
+                for tag in tags:
+                    tag_total = store.count(tags=(tag,))
+                    tag_done = store.count(done=True, tags=(tag,))
+                    stats["tags"][tag] = {
+                        "total": tag_total,
+                        "done": tag_done,
+                        "pending": tag_total - tag_done
+                    }
+        return jsonify(stats), 200
 
     @staticmethod
     def get_todo(todo_id):
-        service = TodoService.get_instance()
-        todo = service.todos.get(todo_id)
+        todo = TodoService.get_store().todos.get(todo_id)
         if todo is None:
-            return jsonify({"error": "Todo not found"}), 404
+            return error_response("todo_not_found")
         return jsonify(todo.to_dict()), 200
 
     @staticmethod
     def add_todo(request):
-        service = TodoService.get_instance()
+        store = TodoService.get_store()
         data = request.get_json()
         if not data or "title" not in data:
-            return jsonify({"error": "Invalid request. 'title' is required."}), 400
+            return error_response("title_required")
+        # done feeds the done counts and filters, which compare it as a boolean
+        if not isinstance(data.get("done", False), bool):
+            return error_response("invalid_done")
 
-        todo = Todo(service.next_id, data["title"], data.get("done", False), data.get("description"))
-        service.todos[service.next_id] = todo
-        service.next_id += 1
+        try:
+            tags = parse_tags(data.get("tags", []))
+        except ValueError as e:
+            return error_response("invalid_tags", str(e))
+
+        try:
+            todo = store.add(data["title"], data.get("done", False), data.get("description"), tags)
+        except TodoQuotaExceeded as e:
+            return error_response("todo_quota_exceeded", str(e))
         return jsonify(todo.to_dict()), 201
 
     @staticmethod
     def edit_todo(todo_id, request):
-        service = TodoService.get_instance()
+        store = TodoService.get_store()
         data = request.get_json()
-        todo = service.todos.get(todo_id)
-        if todo is None:
-            return jsonify({"error": "Todo not found"}), 404
+        if todo_id not in store.todos:
+            return error_response("todo_not_found")
         if not data or "title" not in data or "done" not in data or "description" not in data:
-            return jsonify({"error": "Invalid request. 'title', 'done', and 'description' fields are required."}), 400
-
-        todo.title = data["title"]
-        todo.done = data["done"]
-        todo.description = data["description"]
+            return error_response("invalid_request", "Invalid request. 'title', 'done', and 'description' fields are required.")
+        if not isinstance(data["done"], bool):
+            return error_response("invalid_done")
+
+        # Tags are optional for clients that predate them; omitting them keeps the current tags
+        fields = {"title": data["title"], "done": data["done"], "description": data["description"]}
+        if "tags" in data:
+            try:
+                fields["tags"] = parse_tags(data["tags"])
+            except ValueError as e:
+                return error_response("invalid_tags", str(e))
+
+        todo = store.update(todo_id, **fields)
+        if todo is None:
+            return error_response("todo_not_found")  # Deleted since the check above
         return jsonify(todo.to_dict()), 200
 
     @staticmethod
     def patch_todo(todo_id, request):
-        service = TodoService.get_instance()
+        store = TodoService.get_store()
         data = request.get_json()
-        todo = service.todos.get(todo_id)
-        if todo is None:
-            return jsonify({"error": "Todo not found"}), 404
+        if todo_id not in store.todos:
+            return error_response("todo_not_found")
         if not data:
-            return jsonify({"error": "Invalid request."}), 400
-
-        todo.title = data.get("title", todo.title)
-        todo.done = data.get("done", todo.done)
-        todo.description = data.get("description", todo.description)
+            return error_response("invalid_request")
+
+        fields = {field: data[field] for field in ("title", "done", "description", "tags") if field in data}
+        if not isinstance(fields.get("done", False), bool):
+            return error_response("invalid_done")
+        if "tags" in fields:
+            try:
+                fields["tags"] = parse_tags(fields["tags"])
+            except ValueError as e:
+                return error_response("invalid_tags", str(e))
+
+        todo = store.update(todo_id, **fields)
+        if todo is None:
+            return error_response("todo_not_found")  # Deleted since the check above
         return jsonify(todo.to_dict()), 200
 
     @staticmethod
     def delete_todo(todo_id):
-        service = TodoService.get_instance()
-        if todo_id not in service.todos:
-            return jsonify({"error": "Todo not found"}), 404
-        del service.todos[todo_id]
+        if not TodoService.get_store().delete(todo_id):
+            return error_response("todo_not_found")
         return '', 204
 
     @staticmethod
@@ -148,7 +439,7 @@ class TodoService:
         This method:
         1. Parses the JSON file content
         2. Validates the file format and todo data
-        3. Clears all existing todos
+        3. Clears all existing todos of the current tenant
         4. Loads new todos from the file data
         5. Updates the next_id counter appropriately
 
@@ -159,67 +450,177 @@ class TodoService:
             tuple: JSON response and status code
         """
 
-        service = TodoService.get_instance()
+        store = TodoService.get_store()
 
         # Parse JSON content
         try:
             data = json.loads(file_content)
         except json.JSONDecodeError as e:
-            return jsonify({"error": f"Invalid JSON format: {str(e)}"}), 400
+            return error_response("invalid_json", f"Invalid JSON format: {str(e)}")
 
         # Validate file structure - expect {"todos": [...]} format
         if not isinstance(data, dict) or 'todos' not in data:
-            return jsonify({"error": "Invalid file format. Expected JSON with 'todos' array field."}), 400
+            return error_response("invalid_data", "Invalid file format. Expected JSON with 'todos' array field.")
 
         new_todos_data = data['todos']
 
         # Validate the todos data
         if not isinstance(new_todos_data, list):
-            return jsonify({"error": "Invalid todos format. Expected an array of todo objects."}), 400
+            return error_response("invalid_data", "Invalid todos format. Expected an array of todo objects.")
 
         # Validate each todo item
         for i, todo_data in enumerate(new_todos_data):
             if not isinstance(todo_data, dict):
-                return jsonify({"error": f"Invalid todo at index {i}. Expected an object."}), 400
+                return error_response("invalid_data", f"Invalid todo at index {i}. Expected an object.")
 
             required_fields = ['id', 'title', 'done']
             for field in required_fields:
                 if field not in todo_data:
-                    return jsonify({"error": f"Missing required field '{field}' in todo at index {i}."}), 400
+                    return error_response("invalid_data", f"Missing required field '{field}' in todo at index {i}.")
 
             # Validate field types
             if not isinstance(todo_data['id'], int):
-                return jsonify({"error": f"Invalid 'id' type in todo at index {i}. Expected integer."}), 400
+                return error_response("invalid_data", f"Invalid 'id' type in todo at index {i}. Expected integer.")
             if not isinstance(todo_data['title'], str):
-                return jsonify({"error": f"Invalid 'title' type in todo at index {i}. Expected string."}), 400
+                return error_response("invalid_data", f"Invalid 'title' type in todo at index {i}. Expected string.")
             if not isinstance(todo_data['done'], bool):
-                return jsonify({"error": f"Invalid 'done' type in todo at index {i}. Expected boolean."}), 400
+                return error_response("invalid_data", f"Invalid 'done' type in todo at index {i}. Expected boolean.")
             if 'description' in todo_data and not isinstance(todo_data['description'], str):
-                return jsonify({"error": f"Invalid 'description' type in todo at index {i}. Expected string."}), 400
+                return error_response("invalid_data", f"Invalid 'description' type in todo at index {i}. Expected string.")
+            for field in ('created_at', 'updated_at'):
+                value = todo_data.get(field)
+                if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))
+                                          or not math.isfinite(value)):
+                    return error_response("invalid_data", f"Invalid '{field}' type in todo at index {i}. Expected a Unix timestamp.")
+            if 'tags' in todo_data:
+                try:
+                    todo_data['tags'] = parse_tags(todo_data['tags'])
+                except ValueError as e:
+                    return error_response("invalid_data", f"{e} (todo at index {i})")
 
         # Check for duplicate IDs
         ids = [todo['id'] for todo in new_todos_data]
         if len(ids) != len(set(ids)):
-            return jsonify({"error": "Duplicate todo IDs found in the data."}), 400
-
-        # Clear existing todos
-        service.todos.clear()
-        service.next_id = 1
-
-        # Load new todos
-        for todo_data in new_todos_data:
-            todo_id = todo_data['id']
-            service.todos[todo_id] = Todo(
-                todo_id,
-                todo_data['title'],
-                todo_data['done'],
-                todo_data.get('description', '')
-            )
-            # Update next_id to be greater than the highest existing id
-            service.next_id = max(service.next_id, todo_id + 1)
+            return error_response("invalid_data", "Duplicate todo IDs found in the data.")
+
+        # Replace the tenant's todos
+        try:
+            store.reset(new_todos_data)
+        except TodoQuotaExceeded as e:
+            return error_response("invalid_data", str(e))
 
         return jsonify({
             "message": f"Todos reset successfully. Loaded {len(new_todos_data)} todos.",
             "todos_count": len(new_todos_data),
-            "next_id": service.next_id
+            "next_id": store.next_id
         }), 200
+
+    # --- Change feed ---
+    DEFAULT_POLL_TIMEOUT = 25  # Seconds a long-poll waits for changes
+    MAX_POLL_TIMEOUT = 60
+    KEEPALIVE_INTERVAL = 15  # Seconds between SSE keep-alive comments
+
+    @staticmethod
+    def get_change_feed():
+        """Get the change feed of the current tenant's todo store."""
+        return TodoService.get_store().changes
+
+    @staticmethod
+    def get_changes(request):
+        """Long-poll for todo changes after a sequence number.
+
+        Query Parameters:
+            since (int, optional): Last sequence number the client has seen.
+                When omitted, returns immediately with the current last_seq.
+            timeout (float, optional): Seconds to wait for a change (default 25, max 60)
+
+        A waiting long-poll holds a server thread, so it takes one of the
+        `change_feed.max_waiting` slots it shares with change streams. When
+        all are taken, it answers immediately as if timeout were 0, with a
+        Retry-After header.
+
+        Returns:
+            tuple: JSON response with 'changes' and 'last_seq', or 410 if the
+                   client must re-fetch the full listing
+        """
+        feed = TodoService.get_change_feed()
+        since = request.args.get("since", type=int)
+        timeout = request.args.get("timeout", TodoService.DEFAULT_POLL_TIMEOUT, type=float)
+        timeout = max(0, min(timeout, TodoService.MAX_POLL_TIMEOUT))
+
+        if since is None:
+            return jsonify({"changes": [], "last_seq": feed.last_seq}), 200
+
+        changes = feed.changes_since(since)
+        busy = False
+        if changes == [] and timeout > 0:
+            wait_slots = TodoService.get_instance().wait_slots
+            if wait_slots.acquire(blocking=False):
+                try:
+                    feed.wait(since, timeout)
+                finally:
+                    wait_slots.release()
+                changes = feed.changes_since(since)
+            else:
+                busy = True
+
+        if changes is None:
+            return error_response("changes_expired", last_seq=feed.last_seq)
+        response = jsonify({"changes": changes, "last_seq": changes[-1]["seq"] if changes else since})
+        if busy:
+            response.headers["Retry-After"] = str(TodoService.KEEPALIVE_INTERVAL)
+        return response, 200
+
+    @staticmethod
+    def stream_changes(request):
+        """Stream todo changes as Server-Sent Events.
+
+        The starting point is the `Last-Event-ID` header sent by reconnecting
+        EventSource clients, the `since` query parameter, or the current
+        last_seq. If the starting point is no longer covered, a single 'reset'
+        event tells the client to re-fetch the full listing.
+
+        A stream holds a server thread for as long as it is open, so streams
+        and waiting long-polls share `change_feed.max_waiting` slots (further
+        streams get 503), and each stream ends after
+        `change_feed.stream_max_seconds`; EventSource clients then reconnect
+        and resume from their Last-Event-ID.
+
+        Returns:
+            Response: text/event-stream response, or 503 if all stream slots are taken
+        """
+        service = TodoService.get_instance()
+        feed = TodoService.get_change_feed()
+        since = request.headers.get("Last-Event-ID", type=int)
+        if since is None:
+            since = request.args.get("since", feed.last_seq, type=int)
+        if not service.wait_slots.acquire(blocking=False):
+            response, status = error_response("too_many_streams")
+            response.headers["Retry-After"] = str(TodoService.KEEPALIVE_INTERVAL)
+            return response, status
+        deadline = time.monotonic() + service.stream_max_seconds
+
+        def generate(since):
+            yield "retry: 3000\n\n"
+            while True:
+                changes = feed.changes_since(since)
+                if changes is None:
+                    since = feed.last_seq
+                    yield ChangeFeed.format_event({"seq": since, "op": "reset", "id": None, "todo": None})
+                    continue
+                for entry in changes:
+                    yield ChangeFeed.format_event(entry)
+                    since = entry["seq"]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return  # The client reconnects after the retry delay
+                if not changes and not feed.wait(since, min(TodoService.KEEPALIVE_INTERVAL, remaining)):
+                    yield ": keep-alive\n\n"
+
+        response = Response(generate(since), mimetype="text/event-stream", headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        })
+        # Runs when the server closes the response, whether or not the stream was read
+        response.call_on_close(service.wait_slots.release)
+        return response
@@ -0,0 +1,203 @@
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+MAGIC = b"TODOSNAP"
+VERSION = 2
+TAG_SEPARATOR = "\x1f"  # Joins a todo's tags, which cannot contain control characters
+
+# Columns in file order, with their array typecodes. Titles, descriptions and
+# joined tags are UTF-8 strings in one blob, located by (count + 1) offsets each.
+COLUMNS = (
+    ("ids", "q"),
+    ("done", "B"),
+    ("created_at", "d"),  # NaN when unset
+    ("updated_at", "d"),  # NaN when unset
+    ("has_description", "B"),  # 0 when the description is null
+    ("title_offsets", "Q"),
+    ("description_offsets", "Q"),
+    ("tag_offsets", "Q"),
+    ("strings", "B"),
+)
+
+# magic, version, byte order ('<' or '>'), count, then (offset, length) per column
+HEADER = struct.Struct("<8sIcxxxQ" + "QQ" * len(COLUMNS))
+BYTE_ORDER = b"<" if sys.byteorder == "little" else b">"
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+def write_snapshot(path, todos):
+    """Write todos to a snapshot file.
+
+    The file is written next to `path` and renamed over it, so readers that
+    have the previous snapshot mapped keep a consistent view.
+
+    Args:
+        path (str): Destination file
+        todos (iterable): Todo dicts (as in initial_todos.json) or Todo objects
+
+    Returns:
+        int: Number of todos written
+
+    Raises:
+        ValueError: If a todo has a missing or mistyped field
+    """
+    columns = {name: array(typecode) for name, typecode in COLUMNS}
+    strings = bytearray()
+    descriptions = []
+    joined_tags = []
+    columns["title_offsets"].append(0)
+
+    for i, todo in enumerate(todos):
+        if not isinstance(todo, dict):
+            todo = todo.to_dict()
+        try:
+            todo_id, title, done = todo["id"], todo["title"], todo["done"]
+        except KeyError as e:
+            raise ValueError(f"Missing required field {e} in todo at index {i}.") from None
+        description = todo.get("description", "")  # Missing descriptions load as "" like the JSON file
+        if not isinstance(todo_id, int) or not isinstance(title, str) or not isinstance(done, bool):
+            raise ValueError(f"Invalid 'id', 'title' or 'done' type in todo at index {i}.")
+        if description is not None and not isinstance(description, str):
+            raise ValueError(f"Invalid 'description' type in todo at index {i}. Expected string.")
+        tags = todo.get("tags", ())
+        if not all(isinstance(tag, str) and tag and TAG_SEPARATOR not in tag for tag in tags):
+            raise ValueError(f"Invalid 'tags' in todo at index {i}. Expected non-empty strings.")
+
+        columns["ids"].append(todo_id)
+        columns["done"].append(done)
+        for field in ("created_at", "updated_at"):
+            value = todo.get(field)
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))
+                                      or not math.isfinite(value)):
+                raise ValueError(f"Invalid '{field}' in todo at index {i}. Expected a Unix timestamp.")
+            columns[field].append(math.nan if value is None else float(value))
+        columns["has_description"].append(description is not None)
+        strings += title.encode("utf-8")
+        columns["title_offsets"].append(len(strings))
+        descriptions.append(description or "")
+        joined_tags.append(TAG_SEPARATOR.join(tags))
+
+    # Descriptions, then tags, follow all titles in the string blob
+    for name, values in (("description_offsets", descriptions), ("tag_offsets", joined_tags)):
+        columns[name].append(len(strings))
+        for value in values:
+            strings += value.encode("utf-8")
+            columns[name].append(len(strings))
+    columns["strings"] = strings
+
+    sections = []
+    offset = _align(HEADER.size)
+    for name, _ in COLUMNS:
+        data = memoryview(columns[name]).cast("B")
+        sections.append((offset, len(data), data))
+        offset = _align(offset + len(data))
+
+    count = len(columns["ids"])
+    header = HEADER.pack(MAGIC, VERSION, BYTE_ORDER, count,
+                         *[value for offset, length, _ in sections for value in (offset, length)])
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        for offset, _, data in sections:
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(data)
+    os.replace(tmp_path, path)
+    return count
+
+class TodoSnapshot:
+    """A read-only, memory-mapped snapshot of todos.
+
+    Opening a snapshot only maps the file and checks its header; columns are
+    views into the mapping and strings are decoded when a todo is read, so
+    opening costs the same for any number of todos, and processes mapping
+    the same file share its pages. Iterating yields todo dicts, like the list
+    loaded from initial_todos.json. A TodoStore loading the snapshot still
+    copies every row into its own Todo objects.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        if len(view) < HEADER.size:
+            raise ValueError(f"{self.path} is not a todo snapshot")
+        magic, version, byte_order, self.count, *bounds = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a todo snapshot")
+        if version != VERSION:
+            raise ValueError(f"Unsupported todo snapshot version {version} in {self.path}")
+        if byte_order != BYTE_ORDER:
+            raise ValueError(f"{self.path} was written on a machine with a different byte order")
+
+        for (name, typecode), offset, length in zip(COLUMNS, bounds[::2], bounds[1::2]):
+            if offset + length > len(view) or length % array(typecode).itemsize:
+                raise ValueError(f"Truncated or corrupt column '{name}' in {self.path}")
+            setattr(self, name, view[offset:offset + length].cast(typecode))
+        if any(len(getattr(self, name)) != self.count for name in ("ids", "done", "created_at", "updated_at", "has_description")) \
+                or any(len(getattr(self, name)) != self.count + 1
+                       for name in ("title_offsets", "description_offsets", "tag_offsets")) \
+                or self.tag_offsets[-1] > len(self.strings):
+            raise ValueError(f"Inconsistent columns in {self.path}")
+
+    def __len__(self):
+        return self.count
+
+    def _string(self, offsets, i):
+        return str(self.strings[offsets[i]:offsets[i + 1]], "utf-8")
+
+    @staticmethod
+    def _split_tags(joined):
+        return tuple(joined.split(TAG_SEPARATOR)) if joined else ()
+
+    def row(self, i):
+        """Return todo i as (id, title, done, description, created_at, updated_at, tags).
+
+        Unset timestamps are None.
+        """
+        created_at, updated_at = self.created_at[i], self.updated_at[i]
+        return (
+            self.ids[i],
+            self._string(self.title_offsets, i),
+            bool(self.done[i]),
+            self._string(self.description_offsets, i) if self.has_description[i] else None,
+            None if math.isnan(created_at) else created_at,
+            None if math.isnan(updated_at) else updated_at,
+            self._split_tags(self._string(self.tag_offsets, i)),
+        )
+
+    def rows(self):
+        """Iterate over all todos as row() tuples."""
+        strings, title_offsets, description_offsets = self.strings, self.title_offsets, self.description_offsets
+        tag_offsets, split_tags = self.tag_offsets, self._split_tags
+        isnan = math.isnan
+        columns = zip(self.ids, self.done, self.created_at, self.updated_at, self.has_description)
+        for i, (todo_id, done, created_at, updated_at, has_description) in enumerate(columns):
+            yield (
+                todo_id,
+                str(strings[title_offsets[i]:title_offsets[i + 1]], "utf-8"),
+                bool(done),
+                str(strings[description_offsets[i]:description_offsets[i + 1]], "utf-8") if has_description else None,
+                None if isnan(created_at) else created_at,
+                None if isnan(updated_at) else updated_at,
+                split_tags(str(strings[tag_offsets[i]:tag_offsets[i + 1]], "utf-8")),
+            )
+
+    def __getitem__(self, i):
+        if not -self.count <= i < self.count:
+            raise IndexError("todo snapshot index out of range")
+        todo_id, title, done, description, created_at, updated_at, tags = self.row(i % self.count)
+        todo = {"id": todo_id, "title": title, "done": done, "description": description, "tags": list(tags)}
+        if created_at is not None:
+            todo["created_at"] = created_at
+        if updated_at is not None:
+            todo["updated_at"] = updated_at
+        return todo
+
+    def __iter__(self):
+        return (self[i] for i in range(self.count))
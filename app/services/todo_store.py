@@ -0,0 +1,360 @@
+import threading
+import time
+from models.todo import Todo
+from services.change_feed import ChangeFeed
+from services.sorted_index import SortedIndex
+from services.todo_snapshot import TodoSnapshot
+
+def title_key(title):
+    """Case-insensitive sort and prefix-match key of a title."""
+    return str(title).lower()
+
+PREFIX_END = "\U0010ffff"  # Appended to a prefix to get the exclusive upper bound of its range
+
+# Orderings kept up to date by every store mutation (see GET /todos?sort=)
+SORT_KEYS = {
+    "id": lambda todo: todo.id,
+    "title": lambda todo: title_key(todo.title),
+    "done": lambda todo: bool(todo.done),
+    "created_at": lambda todo: todo.created_at,
+    "updated_at": lambda todo: todo.updated_at,
+}
+
+TIME_FIELDS = ("created_at", "updated_at")  # Fields that can be filtered by time range
+
+EMPTY_IDS = frozenset()  # Id set of tags no todo carries
+
+# All maintained indexes; "done_title" answers done + title prefix queries with one range
+INDEX_KEYS = dict(SORT_KEYS, done_title=lambda todo: (bool(todo.done), title_key(todo.title)))
+
+def time_filters(created=None, updated=None):
+    """List the time range filters that are set.
+
+    Args:
+        created (tuple, optional): (since, before) bounds of created_at; either may be None
+        updated (tuple, optional): (since, before) bounds of updated_at; either may be None
+
+    Returns:
+        list: (field, since, before) tuples
+    """
+    return [(field, bounds[0], bounds[1]) for field, bounds in zip(TIME_FIELDS, (created, updated))
+            if bounds is not None and bounds != (None, None)]
+
+def in_time_ranges(todo, filters):
+    """Whether a todo is within since <= value < before for every filter."""
+    for field, since, before in filters:
+        value = getattr(todo, field)
+        if (since is not None and value < since) or (before is not None and value >= before):
+            return False
+    return True
+
+class TodoQuotaExceeded(Exception):
+    """Raised when a write would take a tenant over its todo quota."""
+
+class TodoStore:
+    """The todos of a single tenant.
+
+    Each tenant has its own id sequence, lock, change feed, sorted indexes
+    and id sets (per tag and of done todos), so the cost of reading or
+    writing a store depends only on that tenant's data and writers never
+    block other tenants. All mutations go
+    through the methods below, which keep the store's derived state in sync.
+    """
+
+    def __init__(self, tenant, initial_todos=(), max_todos=None, feed_capacity=1000):
+        self.tenant = tenant
+        self.max_todos = max_todos
+        self.todos = {}  # Maps todo IDs to Todo objects, in insertion order
+        self.next_id = 1
+        self.lock = threading.RLock()
+        self.changes = ChangeFeed(feed_capacity)
+        self.indexes = {name: SortedIndex(key_func) for name, key_func in INDEX_KEYS.items()}
+        self.tag_ids = {}  # Maps tags to the set of IDs of the todos carrying them
+        self.done_ids = set()  # IDs of done todos
+        self.version = 0  # Incremented by every mutation
+        self._load(initial_todos)
+
+    def _load(self, todos_data):
+        """Replace the contents of the store with already validated todo data.
+
+        The quota is not checked here: a new store always starts from the
+        initial todos, even when they exceed `max_todos`.
+
+        Args:
+            todos_data: List of todo dicts, or a TodoSnapshot whose rows are
+                read directly without building intermediate dicts
+        """
+        self.todos.clear()
+        self.next_id = 1
+        now = time.time()
+        if isinstance(todos_data, TodoSnapshot):
+            rows = todos_data.rows()
+        else:
+            rows = ((todo_data['id'], todo_data['title'], todo_data['done'], todo_data.get('description', ''),
+                     todo_data.get('created_at'), todo_data.get('updated_at'), todo_data.get('tags', ()))
+                    for todo_data in todos_data)
+        for todo_id, title, done, description, created_at, updated_at, tags in rows:
+            self.todos[todo_id] = Todo(todo_id, title, done, description,
+                                       now if created_at is None else created_at, updated_at, tags)
+        # Update next_id to be greater than the highest existing id
+        self.next_id = max(self.todos, default=0) + 1
+
+        for index in self.indexes.values():
+            index.rebuild(self.todos.values())
+        self.tag_ids = {}
+        for todo in self.todos.values():
+            self._tag(todo.id, todo.tags)
+        self.done_ids = {todo.id for todo in self.todos.values() if todo.done}
+
+    def _tag(self, todo_id, tags):
+        """Add a todo to the id sets of its tags. Called with the lock held."""
+        for tag in tags:
+            self.tag_ids.setdefault(tag, set()).add(todo_id)
+
+    def _untag(self, todo_id, tags):
+        """Remove a todo from the id sets of its tags. Called with the lock held."""
+        for tag in tags:
+            ids = self.tag_ids.get(tag)
+            if ids is not None:
+                ids.discard(todo_id)
+                if not ids:
+                    del self.tag_ids[tag]
+
+    def _changed(self, op, todo_id=None, todo=None):
+        """Bump the store version and publish the change. Called with the lock held."""
+        self.version += 1
+        self.changes.record(op, todo_id, todo)
+
+    def add(self, title, done=False, description=None, tags=()):
+        with self.lock:
+            if self.max_todos is not None and len(self.todos) >= self.max_todos:
+                raise TodoQuotaExceeded(f"Todo quota exceeded. Maximum is {self.max_todos} todos.")
+            todo = Todo(self.next_id, title, done, description, tags=tags)
+            self.todos[todo.id] = todo
+            self.next_id += 1
+            for index in self.indexes.values():
+                index.add(todo)
+            self._tag(todo.id, todo.tags)
+            if todo.done:
+                self.done_ids.add(todo.id)
+            self._changed("create", todo.id, todo.to_dict())
+        return todo
+
+    def update(self, todo_id, **fields):
+        """Set the given fields (title, done, description, tags) on a todo and bump its updated_at.
+
+        Returns:
+            Todo: The updated todo, or None if it does not exist (for
+                example because a concurrent delete or reset removed it)
+        """
+        with self.lock:
+            todo = self.todos.get(todo_id)
+            if todo is None:
+                return None
+            old_keys = {name: index.key_func(todo) for name, index in self.indexes.items()}
+            if "tags" in fields:
+                self._untag(todo.id, todo.tags)
+                fields["tags"] = tuple(fields["tags"])
+            for name, value in fields.items():
+                setattr(todo, name, value)
+            todo.updated_at = time.time()
+            if "tags" in fields:
+                self._tag(todo.id, todo.tags)
+            if todo.done:
+                self.done_ids.add(todo.id)
+            else:
+                self.done_ids.discard(todo.id)
+            for name, index in self.indexes.items():
+                if index.key_func(todo) != old_keys[name]:
+                    index.remove(todo, old_keys[name])
+                    index.add(todo)
+            self._changed("update", todo.id, todo.to_dict())
+        return todo
+
+    def delete(self, todo_id):
+        """Delete a todo.
+
+        Returns:
+            bool: False if the todo does not exist
+        """
+        with self.lock:
+            todo = self.todos.pop(todo_id, None)
+            if todo is None:
+                return False
+            for index in self.indexes.values():
+                index.remove(todo)
+            self._untag(todo_id, todo.tags)
+            self.done_ids.discard(todo_id)
+            self._changed("delete", todo_id)
+        return True
+
+    def reset(self, todos_data):
+        """Replace all todos with validated todo data.
+
+        Raises:
+            TodoQuotaExceeded: If the data has more todos than the quota allows
+        """
+        if self.max_todos is not None and len(todos_data) > self.max_todos:
+            raise TodoQuotaExceeded(f"Todo quota exceeded. Maximum is {self.max_todos} todos.")
+        with self.lock:
+            self._load(todos_data)
+            self._changed("reset")
+
+    def query(self, done=None, title_prefix=None, sort=None, reverse=False, offset=0, limit=None,
+              created=None, updated=None, tags=None, any_tags=None):
+        """Return one page of matching todos.
+
+        Candidates are read in the order of a maintained index (or insertion
+        order when `sort` is None) and filtered lazily, so only the requested
+        page is materialized. Sorting by title with a title prefix scans just
+        the matching range of the title index. Time range filters scan just
+        the matching range of a time index, so incremental sync queries cost
+        O(log n + k) for k matching todos. Tag filters are intersections and
+        unions of the per-tag id sets (and the set of done todos).
+
+        Args:
+            done (bool, optional): Only include todos with this completion status
+            title_prefix (str, optional): Only include titles with this prefix (case-insensitive)
+            sort (str, optional): Name of a SORT_KEYS ordering
+            reverse (bool): Sort in descending order
+            offset (int): Number of matching todos to skip
+            limit (int, optional): Maximum number of todos to return
+            created (tuple, optional): (since, before) bounds of created_at
+            updated (tuple, optional): (since, before) bounds of updated_at
+            tags (iterable, optional): Only include todos with all of these tags
+            any_tags (iterable, optional): Only include todos with at least one of these tags
+
+        Returns:
+            list: Matching Todo objects
+        """
+        prefix = title_key(title_prefix) if title_prefix else None
+        filters = time_filters(created, updated)
+        with self.lock:
+            ids = self._tagged(tags, any_tags, done)
+            if ids is not None:
+                candidates = self._ordered(ids, sort, reverse)
+                done = None  # The id sets only hold matching todos
+            elif filters:
+                candidates, filters = self._time_range(filters, sort, reverse)
+            elif sort == "title" and done is not None:
+                lo = (done, prefix or "")
+                candidates = self.indexes["done_title"].ids(reverse, lo=lo, hi=(done, lo[1] + PREFIX_END))
+                done = prefix = None  # The index range only holds matching todos
+            elif sort == "title" and prefix:
+                candidates = self.indexes["title"].ids(reverse, lo=prefix, hi=prefix + PREFIX_END)
+                prefix = None  # The index range only holds matching titles
+            elif sort is not None:
+                candidates = self.indexes[sort].ids(reverse)
+            else:
+                candidates = iter(self.todos)
+
+            todos = self.todos
+            results = []
+            for todo_id in candidates:
+                todo = todos[todo_id]
+                if done is not None and todo.done != done:
+                    continue
+                if prefix and not title_key(todo.title).startswith(prefix):
+                    continue
+                if filters and not in_time_ranges(todo, filters):
+                    continue
+                if offset:
+                    offset -= 1
+                    continue
+                results.append(todo)
+                if limit is not None and len(results) >= limit:
+                    break
+            return results
+
+    def count(self, done=None, title_prefix=None, created=None, updated=None, tags=None, any_tags=None):
+        """Count matching todos from the id sets and index ranges, without scanning.
+
+        With time range filters, only the todos within a time index range
+        are scanned, unless that range is the only filter. With tag filters,
+        only the todos in the combined tag sets are scanned, unless tags and
+        done are the only filters.
+
+        Args:
+            done (bool, optional): Only count todos with this completion status
+            title_prefix (str, optional): Only count titles with this prefix (case-insensitive)
+            created (tuple, optional): (since, before) bounds of created_at
+            updated (tuple, optional): (since, before) bounds of updated_at
+            tags (iterable, optional): Only count todos with all of these tags
+            any_tags (iterable, optional): Only count todos with at least one of these tags
+
+        Returns:
+            int: Number of matching todos
+        """
+        prefix = title_key(title_prefix) if title_prefix else None
+        filters = time_filters(created, updated)
+        with self.lock:
+            if tags or any_tags:
+                if prefix or filters:
+                    return len(self.query(done, title_prefix, created=created, updated=updated,
+                                          tags=tags, any_tags=any_tags))
+                return len(self._tagged(tags, any_tags, done))
+            if len(filters) == 1 and done is None and not prefix:
+                field, since, before = filters[0]
+                return self.indexes[field].count(lo=since, hi=before)
+            if filters:
+                return len(self.query(done, title_prefix, created=created, updated=updated))
+            if prefix and done is not None:
+                return self.indexes["done_title"].count(lo=(done, prefix), hi=(done, prefix + PREFIX_END))
+            if prefix:
+                return self.indexes["title"].count(lo=prefix, hi=prefix + PREFIX_END)
+            if done is not None:
+                return len(self.done_ids) if done else len(self.todos) - len(self.done_ids)
+            return len(self.todos)
+
+    def _time_range(self, filters, sort, reverse):
+        """Pick the time index range to scan for a time filtered query. Called with the lock held.
+
+        The range of the sort field is used when it is filtered, so results
+        stream in order; otherwise the range's k todos are sorted.
+
+        Returns:
+            tuple: (iterable of todo IDs, time filters still to be checked per todo)
+        """
+        chosen = next((f for f in filters if f[0] == sort), filters[-1])
+        field, since, before = chosen
+        remaining = [f for f in filters if f is not chosen]
+        if sort == field:
+            return self.indexes[field].ids(reverse, lo=since, hi=before), remaining
+        return self._sorted(self.indexes[field].ids(lo=since, hi=before), sort, reverse), remaining
+
+    def _tagged(self, tags, any_tags, done):
+        """Combine the id sets of a tag filtered query. Called with the lock held.
+
+        Returns:
+            set: IDs of the todos with all `tags`, at least one of `any_tags`
+                 and the given done status, or None without tag filters
+        """
+        if not tags and not any_tags:
+            return None
+        sets = [self.tag_ids.get(tag, EMPTY_IDS) for tag in tags or ()]
+        if any_tags:
+            sets.append(set().union(*(self.tag_ids.get(tag, EMPTY_IDS) for tag in any_tags)))
+        sets.sort(key=len)  # Intersect starting from the smallest set
+        ids = sets[0].intersection(*sets[1:])
+        if done is True:
+            ids &= self.done_ids
+        elif done is False:
+            ids -= self.done_ids
+        return ids
+
+    def _ordered(self, ids, sort, reverse):
+        """Order a set of todo IDs for a query. Called with the lock held.
+
+        Sets holding a large part of the store are read in index order,
+        skipping other todos; smaller sets are sorted. Without a sort field
+        the todos are in id order.
+        """
+        if len(ids) * 4 > len(self.todos):
+            return (todo_id for todo_id in self.indexes[sort or "id"].ids(reverse) if todo_id in ids)
+        return self._sorted(ids, sort, reverse)
+
+    def _sorted(self, ids, sort, reverse):
+        """Sort todo IDs by a SORT_KEYS ordering (id order when `sort` is None)."""
+        todos = self.todos
+        key_func = SORT_KEYS[sort or "id"]
+        return sorted(ids, key=lambda todo_id: (key_func(todos[todo_id]), todo_id), reverse=reverse)
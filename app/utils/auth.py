@@ -1,5 +1,9 @@
+import hashlib
+from flask import g
 from config.auth_config import AuthConfig
 
+DEFAULT_IDENTITY = "default"  # Tenant used when authentication is disabled
+
 def setup_auth_config(auth_method, secret=None):
     """Configure authentication based on the specified method."""
     auth_config = AuthConfig()
@@ -22,4 +26,17 @@ def setup_auth_config(auth_method, secret=None):
     else:
         raise ValueError(f"Invalid authentication method: {auth_method}")
     
-    return auth_config 
\ No newline at end of file
+    return auth_config
+
+def api_key_identity(api_key):
+    """Derive a stable tenant identity from an API key without storing the key."""
+    return "api_key:" + hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+def get_current_identity():
+    """Return the identity AuthMiddleware resolved for the current request.
+
+    Returns:
+        str: "user:<username>" for JWT and session auth, "api_key:<digest>"
+             for API key auth, or DEFAULT_IDENTITY when auth is disabled
+    """
+    return g.get('identity') or DEFAULT_IDENTITY
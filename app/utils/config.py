@@ -3,14 +3,21 @@ import os
 import json
 from pathlib import Path
 from typing import List
+from services.todo_snapshot import TodoSnapshot
 
 INITIAL_USERS_FILE = "initial_users.json"
 INITIAL_TODOS_FILE = "initial_todos.json"
+INITIAL_TODOS_SNAPSHOT = "initial_todos.snap"  # Built by scripts/build_snapshot.py
+
+
+def get_config_path():
+    """Return the absolute path of auth_config.yml."""
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'auth_config.yml')
 
 
 def load_config():
     """Load configuration from auth_config.yml file."""
-    config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'auth_config.yml')
+    config_path = get_config_path()
     
     if not os.path.exists(config_path):
         print(f"Warning: auth_config.yml not found at {config_path}, using default configuration (no auth)")
@@ -45,9 +52,44 @@ def load_config():
         return "none", None
 
 
+def load_settings():
+    """Load the optional, non-auth sections of auth_config.yml.
+
+    Returns:
+        dict: Top-level sections (e.g. 'profiling') other than 'auth'.
+              Missing or unreadable files yield an empty dict.
+    """
+    config_path = get_config_path()
+
+    if not os.path.exists(config_path):
+        return {}
+
+    try:
+        with open(config_path, 'r') as f:
+            config = yaml.safe_load(f) or {}
+    except Exception as e:
+        print(f"Error loading settings from auth_config.yml: {e}")
+        return {}
+
+    return {key: value for key, value in config.items() if key != 'auth' and isinstance(value, dict)}
+
+
 def load_initial_todos():
-    """Load initial todos from the configuration file."""
+    """Load initial todos from the configuration file.
+
+    A binary snapshot of the file, if one was built and is up to date, is
+    memory-mapped instead of parsing the JSON (see services/todo_snapshot.py).
+    """
     path = Path(__file__).resolve().parents[2] / INITIAL_TODOS_FILE
+    snapshot_path = path.with_name(INITIAL_TODOS_SNAPSHOT)
+    if snapshot_path.exists():
+        if path.exists() and path.stat().st_mtime > snapshot_path.stat().st_mtime:
+            print(f"Warning: {INITIAL_TODOS_SNAPSHOT} is older than {INITIAL_TODOS_FILE}, loading the JSON file")
+        else:
+            try:
+                return TodoSnapshot(snapshot_path)
+            except (OSError, ValueError) as e:
+                print(f"Error loading {INITIAL_TODOS_SNAPSHOT}: {e}")
     return load_initial_data(path, "todos")
 
 def load_initial_users() -> List:
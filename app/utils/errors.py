@@ -0,0 +1,107 @@
+from flask import Response, current_app
+from werkzeug.exceptions import BadRequest, NotFound, RequestEntityTooLarge, InternalServerError
+from utils.json_provider import encode, wants_pretty
+
+# Stable error codes, mapped to their HTTP status and default message.
+# Clients should branch on "code"; the "error" message may change.
+ERRORS = {
+    # Generic HTTP errors (see routes/errors.py)
+    "bad_request": (400, str(BadRequest())),
+    "not_found": (404, str(NotFound())),
+    "request_too_large": (413, str(RequestEntityTooLarge())),
+    "internal_error": (500, str(InternalServerError())),
+
+    # Authentication
+    "api_key_required": (401, "API key is required"),
+    "invalid_api_key": (401, "Invalid API key"),
+    "token_required": (401, "JWT token is required"),
+    "access_token_required": (401, "Access token is required in Authorization header"),
+    "token_revoked": (401, "You have been logged out. Please log in again."),
+    "token_expired": (401, "Token has expired"),
+    "invalid_token": (401, "Invalid JWT token"),
+    "session_required": (401, "Valid session required"),
+    "not_authenticated": (401, "Not authenticated"),
+    "invalid_credentials": (401, "Invalid username or password"),
+    "credentials_required": (400, "Username and password are required"),
+    "username_taken": (400, "Username already exists"),
+    "tokens_required": (400, "Both access token and refresh token are required"),
+    "refresh_token_required": (400, "Refresh token is required in request body"),
+    "invalid_refresh_token": (401, "Invalid refresh token"),
+    "refresh_token_reused": (401, "Refresh token has already been used. Please log in again."),
+    "auth_method_unsupported": (400, "Not available with the current authentication method"),
+    "jwt_not_configured": (400, "JWT authentication is not configured"),
+    "invalid_jwt_algorithm": (400, "Invalid JWT algorithm"),
+    "json_required": (415, "Request must be JSON"),
+    "invalid_config": (400, "Invalid configuration"),
+    "admin_disabled": (403, "Admin endpoints are disabled; set admin.token in auth_config.yml to enable them"),
+    "admin_token_required": (401, "Admin token is required in the X-Admin-Token header"),
+    "invalid_admin_token": (401, "Invalid admin token"),
+    "config_update_failed": (500, "Failed to update configuration"),
+
+    # Todos
+    "todo_not_found": (404, "Todo not found"),
+    "title_required": (400, "Invalid request. 'title' is required."),
+    "invalid_request": (400, "Invalid request."),
+    "invalid_sort": (400, "Invalid sort field"),
+    "invalid_fields": (400, "Invalid field"),
+    "invalid_time": (400, "Invalid timestamp"),
+    "invalid_tags": (400, "Invalid tags"),
+    "invalid_done": (400, "Invalid 'done'. Expected a boolean."),
+    "todo_quota_exceeded": (403, "Todo quota exceeded"),
+    "changes_expired": (410, "Changes since the given sequence number are no longer available. Re-fetch /todos."),
+    "too_many_streams": (503, "Too many clients are waiting for changes; retry later"),
+
+    # File uploads (POST /todos/reset, POST /auth/reset-users)
+    "file_required": (400, "No file provided. Please upload a JSON file."),
+    "file_not_selected": (400, "No file selected. Please select a JSON file."),
+    "invalid_file_type": (400, "Invalid file type. Please upload a JSON file."),
+    "invalid_file_encoding": (400, "Invalid file encoding. Please ensure the file is UTF-8 encoded."),
+    "invalid_json": (400, "Invalid JSON format"),
+    "invalid_data": (400, "Invalid data"),
+    "file_processing_failed": (500, "Failed to process file"),
+
+    # Notes
+    "note_file_required": (400, "No note file was provided"),
+    "note_file_not_selected": (400, "No note file was selected"),
+    "invalid_note_type": (400, "Notes must be in .txt format"),
+    "note_too_large": (400, "Note is too large. Maximum size is 1MB"),
+    "note_empty": (400, "Note cannot be empty"),
+    "invalid_note_text": (400, "Note must contain valid text"),
+    "invalid_line_range": (400, "Invalid line range"),
+    "note_not_found": (404, "Note not found"),
+    "range_not_satisfiable": (416, "Requested range not satisfiable"),
+    "note_read_failed": (500, "Failed to retrieve note"),
+    "note_delete_failed": (500, "Failed to delete note"),
+
+    # Background jobs
+    "job_not_found": (404, "Job not found"),
+
+    # Idempotency keys
+    "idempotency_key_too_long": (400, "Idempotency-Key is too long"),
+    "idempotency_key_in_progress": (409, "A request with this Idempotency-Key is still being processed"),
+    "idempotency_key_reused": (422, "Idempotency-Key was already used with a different request"),
+}
+
+# Encoded bodies of the default messages, so common errors are not re-encoded per request
+ENCODED_ERRORS = {code: encode({"code": code, "error": message}) + b"\n" for code, (_, message) in ERRORS.items()}
+
+def error_response(code, message=None, **extra):
+    """Build the response of an error code.
+
+    Errors with their default message and no extra fields reuse a
+    pre-encoded body; others are encoded on demand. Either way the body has
+    the stable "code" and the human-readable "error" message.
+
+    Args:
+        code (str): Key of ERRORS
+        message (str, optional): Message replacing the default one
+        **extra: Additional fields of the body
+
+    Returns:
+        tuple: (Response, status code)
+    """
+    status, default_message = ERRORS[code]
+    if message is None and not extra and not wants_pretty():
+        return Response(ENCODED_ERRORS[code], status=status, mimetype="application/json"), status
+    body = dict(extra, code=code, error=message if message is not None else default_message)
+    return current_app.json.response(body), status
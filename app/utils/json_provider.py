@@ -0,0 +1,74 @@
+import json
+from flask import request, has_request_context
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library
+    orjson = None
+
+def wants_pretty():
+    """Return True if the current request asked for indented output (?pretty=1)."""
+    return (has_request_context() and b"pretty" in request.query_string
+            and request.args.get("pretty", "").lower() in ("1", "true"))
+
+def encode(obj):
+    """Encode an object as compact JSON bytes with sorted keys.
+
+    This is the byte-for-byte format of compact API responses, so encoded
+    fragments (see Todo.to_json) can be joined into a response body.
+    Objects orjson cannot encode (e.g. integers beyond 64 bits) go through
+    the standard library encoder.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider that uses orjson when it is installed.
+
+    Responses are compact unless the request asks for ?pretty=1. Calls with
+    options orjson does not support, and objects it cannot encode, go
+    through the standard library encoder.
+    """
+
+    ensure_ascii = False
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None:
+            option = self._orjson_option(kwargs)
+            if option is not None:
+                try:
+                    return orjson.dumps(obj, default=self.default, option=option).decode("utf-8")
+                except TypeError:
+                    pass  # e.g. non-string keys; let the standard library handle it
+        kwargs.setdefault("separators", (",", ":") if kwargs.get("indent") is None else None)
+        return super().dumps(obj, **kwargs)
+
+    @staticmethod
+    def _orjson_option(kwargs):
+        """Translate json.dumps keyword arguments to orjson options, or None if unsupported."""
+        option = 0
+        for name, value in kwargs.items():
+            if name == "sort_keys":
+                option |= orjson.OPT_SORT_KEYS if value else 0
+            elif name == "indent":
+                if value not in (None, 2):
+                    return None
+                option |= orjson.OPT_INDENT_2 if value else 0
+            elif name == "separators":
+                if value not in (None, (",", ":")):
+                    return None
+            elif name != "ensure_ascii":
+                return None
+        if "sort_keys" not in kwargs:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = self.dumps(obj, indent=2 if wants_pretty() else None)
+        return self._app.response_class(f"{body}\n", mimetype=self.mimetype)
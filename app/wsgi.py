@@ -0,0 +1,9 @@
+"""Production WSGI entry point.
+
+Run with gunicorn using the bundled configuration:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from main import build_app
+
+app = build_app()
@@ -0,0 +1,415 @@
+"""Load-test and micro-benchmark driver for the Todo API.
+
+Drives the Flask app either in-process through the test client or over real
+HTTP (against a server started in a background thread, or an external --url),
+with a configurable store size, authentication method and request mix.
+Reports throughput, p50/p95/p99 latency and RSS, and can save the results as
+a named baseline or compare them against one.
+
+Examples:
+    python bench/benchmark.py
+    python bench/benchmark.py --mode http --auth jwt --store-size 10000 --concurrency 8
+    python bench/benchmark.py --mix list=80,get=20 --save-baseline list-heavy
+    python bench/benchmark.py --mix list=80,get=20 --compare list-heavy
+"""
+import argparse
+import http.client
+import io
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'app')
+BASELINE_DIR = os.path.join(BENCH_DIR, 'baselines')
+sys.path.insert(0, APP_DIR)
+
+AUTH_METHODS = ['none', 'api_key', 'jwt', 'session']
+BENCH_USER = {"username": "bench-user", "password": "bench-password"}
+BENCH_SECRET = "bench-secret"
+BENCH_NOTE = "bench-note.txt"
+
+DEFAULT_MIX = "list=40,list_filtered=20,get=20,create=5,patch=5,docs=5,note_download=5"
+
+# --- Request mix ---
+# Operations draw from the worker's rng, so a run is reproducible for a given --seed
+def _op_list(ctx, rng):
+    return "GET", "/todos", None
+
+def _op_list_filtered(ctx, rng):
+    return "GET", "/todos?done=false&title=todo&page=1&limit=20", None
+
+def _op_get(ctx, rng):
+    return "GET", f"/todos/{rng.randint(1, ctx['store_size'] or 1)}", None
+
+def _op_create(ctx, rng):
+    return "POST", "/todos", {"title": "bench todo", "description": "created by benchmark"}
+
+def _op_patch(ctx, rng):
+    return "PATCH", f"/todos/{rng.randint(1, ctx['store_size'] or 1)}", {"done": rng.random() < 0.5}
+
+def _op_docs(ctx, rng):
+    return "GET", "/docs", None
+
+def _op_note_download(ctx, rng):
+    return "GET", f"/notes/{BENCH_NOTE}", None
+
+OPERATIONS = {
+    "list": _op_list,
+    "list_filtered": _op_list_filtered,
+    "get": _op_get,
+    "create": _op_create,
+    "patch": _op_patch,
+    "docs": _op_docs,
+    "note_download": _op_note_download,
+}
+
+def parse_mix(mix):
+    """Parse "op=weight,op=weight" into a list of (operation, weight) pairs."""
+    pairs = []
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{name}'. Must be one of: {sorted(OPERATIONS)}")
+        pairs.append((name, float(weight or 1)))
+    return pairs
+
+def generate_todos(size):
+    """Build a reset payload containing `size` todos."""
+    return {
+        "todos": [
+            {
+                "id": i,
+                "title": f"Todo {i} {'alpha' if i % 3 else 'beta'}",
+                "done": i % 2 == 0,
+                "description": f"Benchmark todo number {i}"
+            }
+            for i in range(1, size + 1)
+        ]
+    }
+
+# --- Clients ---
+class InProcessClient:
+    """Issue requests through the Flask test client."""
+    def __init__(self, app, headers):
+        self.client = app.test_client()
+        self.headers = dict(headers)
+
+    def request(self, method, path, body=None, files=None):
+        kwargs = {"headers": self.headers}
+        if files is not None:
+            kwargs["data"] = {"file": (io.BytesIO(files[1]), files[0])}
+            kwargs["content_type"] = "multipart/form-data"
+        elif body is not None:
+            kwargs["json"] = body
+        response = self.client.open(path, method=method, **kwargs)
+        return response.status_code, response.get_data(), response.headers
+
+class HttpClient:
+    """Issue requests over a persistent HTTP connection."""
+    def __init__(self, base_url, headers):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.headers = dict(headers)
+        self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+
+    def request(self, method, path, body=None, files=None):
+        headers = dict(self.headers)
+        payload = None
+        if files is not None:
+            boundary = "bench-boundary"
+            payload = (
+                f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{files[0]}\"\r\n"
+                f"Content-Type: application/octet-stream\r\n\r\n"
+            ).encode() + files[1] + f"\r\n--{boundary}--\r\n".encode()
+            headers["Content-Type"] = f"multipart/form-data; boundary={boundary}"
+        elif body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        try:
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+        except (http.client.HTTPException, ConnectionError):
+            # The server closed the connection (e.g. HTTP/1.0); reconnect once
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+        data = response.read()
+        return response.status, data, response.headers
+
+def _quiet_request_handler():
+    from werkzeug.serving import WSGIRequestHandler
+
+    class QuietRequestHandler(WSGIRequestHandler):
+        protocol_version = "HTTP/1.1"  # Allow keep-alive connections
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    return QuietRequestHandler
+
+# --- Setup ---
+def build_app(auth_method):
+    """Create the application the same way main.py does."""
+    from main import create_app
+    from utils.auth import setup_auth_config
+    from services.auth_service import add_user
+
+    auth_config = setup_auth_config(auth_method, BENCH_SECRET)
+    add_user(BENCH_USER["username"], BENCH_USER["password"])
+    return create_app(auth_config)
+
+def authenticate(client, auth_method):
+    """Return the headers needed to authenticate as the benchmark user."""
+    if auth_method == 'api_key':
+        return {"X-API-Key": BENCH_SECRET}
+    if auth_method == 'none':
+        return {}
+
+    client.request("POST", "/auth/signup", BENCH_USER)
+    status, data, headers = client.request("POST", "/auth/login", BENCH_USER)
+    if status != 200:
+        raise RuntimeError(f"Benchmark login failed with status {status}: {data[:200]!r}")
+    if auth_method == 'jwt':
+        return {"Authorization": f"Bearer {json.loads(data)['access_token']}"}
+
+    if isinstance(client, InProcessClient):
+        return {}  # The test client keeps the session cookie itself
+    cookie = headers.get("Set-Cookie", "").split(';', 1)[0]
+    return {"Cookie": cookie}
+
+def prepare_store(client, store_size):
+    """Load the todo store and the benchmark note."""
+    payload = json.dumps(generate_todos(store_size)).encode()
+    status, data, _ = client.request("POST", "/todos/reset", files=("bench.json", payload))
+    if status != 200:
+        raise RuntimeError(f"Failed to load {store_size} todos: {status} {data[:200]!r}")
+    note = ("benchmark note line\n" * 2000).encode()
+    client.request("POST", "/notes", files=(BENCH_NOTE, note))
+
+def current_rss_mb(pid=None):
+    """Return the resident set size in MB of `pid` (defaults to this process)."""
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if pid is None:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss / (1024 * 1024) if sys.platform == 'darwin' else maxrss / 1024
+    return None
+
+# --- Measurement ---
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def summarize(latencies):
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+    }
+
+def run_load(make_client, auth_headers, mix, total_requests, concurrency, warmup, store_size, seed=1):
+    """Run the request mix and collect per-operation latencies.
+
+    Each worker has its own random generator derived from `seed`, so the
+    request sequence of every worker is the same from run to run.
+    """
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    ctx = {"store_size": store_size}
+    per_thread = [total_requests // concurrency + (1 if i < total_requests % concurrency else 0)
+                  for i in range(concurrency)]
+    results = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+    barrier = threading.Barrier(concurrency + 1)
+
+    def worker(index):
+        client = make_client(auth_headers)
+        rng = random.Random(f"{seed}:{index}")
+        for _ in range(warmup):
+            method, path, body = OPERATIONS[rng.choices(names, weights)[0]](ctx, rng)
+            client.request(method, path, body)
+        barrier.wait()
+        for _ in range(per_thread[index]):
+            name = rng.choices(names, weights)[0]
+            method, path, body = OPERATIONS[name](ctx, rng)
+            started = time.perf_counter()
+            status, _, _ = client.request(method, path, body)
+            results[index].append((name, time.perf_counter() - started))
+            if status >= 400:
+                errors[index] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    samples = [sample for thread_results in results for sample in thread_results]
+    by_operation = {}
+    for name, latency in samples:
+        by_operation.setdefault(name, []).append(latency)
+
+    return {
+        "requests": len(samples),
+        "errors": sum(errors),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "latency": summarize([latency for _, latency in samples]),
+        "operations": {name: summarize(values) for name, values in sorted(by_operation.items())},
+    }
+
+# --- Baselines ---
+def baseline_path(name):
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+def save_baseline(name, report):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    with open(baseline_path(name), 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"Saved baseline '{name}' to {baseline_path(name)}")
+
+def compare_baseline(name, report, tolerance):
+    """Print the difference against a saved baseline.
+
+    Returns:
+        bool: True if throughput and p95 latency are within `tolerance`
+    """
+    with open(baseline_path(name)) as f:
+        baseline = json.load(f)
+
+    if baseline["config"] != report["config"]:
+        print(f"Warning: baseline '{name}' was recorded with a different configuration")
+
+    checks = [
+        ("throughput_rps", baseline["throughput_rps"], report["throughput_rps"], True),
+        ("p95_ms", baseline["latency"]["p95_ms"], report["latency"]["p95_ms"], False),
+        ("p99_ms", baseline["latency"]["p99_ms"], report["latency"]["p99_ms"], False),
+    ]
+    ok = True
+    print(f"\nComparison against baseline '{name}' (tolerance {tolerance:.0%}):")
+    for metric, old, new, higher_is_better in checks:
+        change = (new - old) / old if old else 0.0
+        regressed = change < -tolerance if higher_is_better else change > tolerance
+        ok = ok and not regressed
+        flag = "REGRESSION" if regressed else "ok"
+        print(f"  {metric:<16} {old:>12.3f} -> {new:>12.3f} ({change:+.1%}) {flag}")
+    return ok
+
+def print_report(report):
+    config = report["config"]
+    print(f"\nmode={config['mode']} auth={config['auth']} store_size={config['store_size']} "
+          f"concurrency={config['concurrency']} mix={config['mix']}")
+    print(f"requests={report['requests']} errors={report['errors']} elapsed={report['elapsed_s']}s "
+          f"throughput={report['throughput_rps']} req/s rss={report['rss_mb']} MB")
+    print(f"{'operation':<16}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    rows = list(report["operations"].items()) + [("all", report["latency"])]
+    for name, stats in rows:
+        print(f"{name:<16}{stats['count']:>8}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Todo API")
+    parser.add_argument("--mode", choices=["inprocess", "http"], default="inprocess",
+                        help="Drive the app through the Flask test client or over HTTP")
+    parser.add_argument("--url", help="Benchmark an already running server instead of starting one (http mode)")
+    parser.add_argument("--server-pid", type=int, help="PID of the --url server, used to report its RSS")
+    parser.add_argument("--auth", choices=AUTH_METHODS, default="none", help="Authentication method")
+    parser.add_argument("--store-size", type=int, default=1000, help="Number of todos loaded before the run")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weighted request mix (default: {DEFAULT_MIX})")
+    parser.add_argument("--requests", type=int, default=2000, help="Total number of measured requests")
+    parser.add_argument("--concurrency", type=int, default=1, help="Number of concurrent clients")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per client")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for reproducible request sequences")
+    parser.add_argument("--save-baseline", metavar="NAME", help="Store the results as a named baseline")
+    parser.add_argument("--compare", metavar="NAME", help="Compare the results against a named baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression (default: 0.10)")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    server = None
+
+    if args.mode == "http" and args.url:
+        base_url = args.url.rstrip('/')
+        make_client = lambda headers: HttpClient(base_url, headers)
+        rss_pid = args.server_pid
+    else:
+        app = build_app(args.auth)
+        rss_pid = None
+        if args.mode == "http":
+            from werkzeug.serving import make_server
+            server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=_quiet_request_handler())
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f"http://127.0.0.1:{server.server_port}"
+            make_client = lambda headers: HttpClient(base_url, headers)
+        else:
+            make_client = lambda headers: InProcessClient(app, headers)
+
+    setup_client = make_client({})
+    auth_headers = authenticate(setup_client, args.auth)
+    setup_client.headers.update(auth_headers)
+    prepare_store(setup_client, args.store_size)
+
+    if args.mode == "inprocess" and args.auth == "session":
+        # Test clients keep their own cookie jar, so every worker logs in itself
+        make_client = lambda headers: _logged_in_client(app, headers)
+
+    try:
+        report = run_load(make_client, auth_headers, mix, args.requests, args.concurrency,
+                          args.warmup, args.store_size, args.seed)
+    finally:
+        setup_client.request("DELETE", f"/notes/{BENCH_NOTE}")
+        if server is not None:
+            server.shutdown()
+
+    rss_mb = current_rss_mb(rss_pid)
+    report["rss_mb"] = round(rss_mb, 1) if rss_mb is not None else None
+    report["config"] = {
+        "mode": args.mode,
+        "auth": args.auth,
+        "store_size": args.store_size,
+        "mix": args.mix,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2, sort_keys=True))
+    else:
+        print_report(report)
+
+    if args.save_baseline:
+        save_baseline(args.save_baseline, report)
+    if args.compare and not compare_baseline(args.compare, report, args.tolerance):
+        return 1
+    return 0
+
+def _logged_in_client(app, headers):
+    """Create a test client holding its own authenticated session."""
+    client = InProcessClient(app, headers)
+    authenticate(client, "session")
+    return client
+
+if __name__ == "__main__":
+    sys.exit(main())
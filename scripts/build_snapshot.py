@@ -0,0 +1,63 @@
+"""Build the binary snapshot the API loads instead of initial_todos.json.
+
+The snapshot (see app/services/todo_snapshot.py) is memory-mapped at
+startup, so even very large initial data sets load without parsing JSON.
+Rebuild it after editing initial_todos.json; a snapshot older than the JSON
+file is ignored.
+
+Examples:
+    python scripts/build_snapshot.py
+    python scripts/build_snapshot.py big_todos.json initial_todos.snap
+    python scripts/build_snapshot.py --info initial_todos.snap
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'app'))
+
+from services.todo_snapshot import TodoSnapshot, write_snapshot
+from utils.config import INITIAL_TODOS_FILE, INITIAL_TODOS_SNAPSHOT
+
+def build(source, destination):
+    started = time.perf_counter()
+    with open(source, 'r') as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not isinstance(data.get('todos'), list):
+        raise ValueError("Invalid file format. Expected JSON with 'todos' array field.")
+    count = write_snapshot(destination, data['todos'])
+    elapsed = time.perf_counter() - started
+    print(f"Wrote {count} todos to {destination} ({os.path.getsize(destination)} bytes) in {elapsed:.2f}s")
+
+def info(path):
+    started = time.perf_counter()
+    snapshot = TodoSnapshot(path)
+    elapsed = time.perf_counter() - started
+    print(f"{path}: {len(snapshot)} todos, {os.path.getsize(path)} bytes, opened in {elapsed * 1000:.2f}ms")
+    for todo in (snapshot[0], snapshot[-1]) if len(snapshot) else ():
+        print(json.dumps(todo))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', nargs='?', default=os.path.join(ROOT_DIR, INITIAL_TODOS_FILE),
+                        help="JSON file with a 'todos' array (default: initial_todos.json)")
+    parser.add_argument('destination', nargs='?', default=os.path.join(ROOT_DIR, INITIAL_TODOS_SNAPSHOT),
+                        help="Snapshot file to write (default: initial_todos.snap)")
+    parser.add_argument('--info', metavar='SNAPSHOT', help="Describe an existing snapshot instead of building one")
+    args = parser.parse_args()
+
+    try:
+        if args.info:
+            info(args.info)
+        else:
+            build(args.source, args.destination)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Move notes from the flat notes directory into the sharded layout.
+
+Notes are stored in two levels of hashed subdirectories (see shard_dir in
+app/services/note_io.py). The API still reads notes left in the flat
+layout, but every lookup of such a note first misses its shard; run this
+once after upgrading to move them. Moves are renames within the notes
+directory, so no note is ever partially copied, and running the script
+again only moves what is left. Run it while the API is stopped, or a note
+read at the moment it is moved may be reported missing.
+
+Examples:
+    python scripts/migrate_notes.py
+    python scripts/migrate_notes.py --dry-run
+    python scripts/migrate_notes.py /var/lib/todo-api/notes
+"""
+import argparse
+import os
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'app'))
+
+from services.note_io import shard_dir
+from services.note_service import NoteService
+
+def migrate(notes_dir, dry_run=False):
+    index_dir = os.path.join(notes_dir, NoteService.INDEX_DIR)
+    moved = 0
+    with os.scandir(notes_dir) as entries:
+        for entry in entries:
+            # Shard and index directories are directories; temporary files start with '.'
+            if not entry.is_file(follow_symlinks=False) or entry.name.startswith('.'):
+                continue
+            destination = os.path.join(notes_dir, shard_dir(entry.name), entry.name)
+            if dry_run:
+                print(f"{entry.name} -> {os.path.relpath(destination, notes_dir)}")
+            else:
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                if os.path.exists(destination):
+                    os.remove(entry.path)  # Uploaded again since the upgrade; the sharded copy is newer
+                else:
+                    os.replace(entry.path, destination)
+                try:
+                    os.remove(os.path.join(index_dir, entry.name + '.lines'))  # Rebuilt on the next partial read
+                except FileNotFoundError:
+                    pass
+            moved += 1
+    action = "Would move" if dry_run else "Moved"
+    print(f"{action} {moved} notes into {notes_dir}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('notes_dir', nargs='?', default=os.path.join(ROOT_DIR, 'app', NoteService.NOTES_DIR),
+                        help="Notes directory (default: app/data/notes)")
+    parser.add_argument('--dry-run', action='store_true', help="List the moves without making them")
+    args = parser.parse_args()
+
+    try:
+        migrate(args.notes_dir, args.dry_run)
+    except OSError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()